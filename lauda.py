@@ -2,7 +2,11 @@
 #LaudaRegler/lauda.py
 
 '''This module provides lauda entry point script'''
+import multiprocessing
+
 import lauda.main
 
 if __name__ == "__main__":
+    # Die Prozesse des Lauf-Katalogs (lauda/catalog.py) starten in der PyInstaller-exe sonst das GUI erneut
+    multiprocessing.freeze_support()
     lauda.main.main()
@@ -0,0 +1,384 @@
+# -*- coding :utf-8 -*-
+# lauda/acquisition.py
+'''
+This module provides the acquisition workers for the LAUDA thermostat and the pressure transducer,
+the merger that combines their latest values and the compact Sample record handed to the plot,
+the CSV writer and the pressure check. Samples are stamped in the acquisition threads with a
+monotonic clock mapped to wall time, not when the Qt signal is delivered.
+'''
+import time
+from concurrent.futures import CancelledError
+
+import numpy as np
+import serial
+from PyQt6.QtCore import QThread, QObject, QTimer, pyqtSignal
+
+from lauda.devices import LAUDA, PRESSURE
+from lauda.parser import CycleParser, FRESH, INVALID, STALE, SPECS
+from lauda.polling import PollScheduler, channels_for, EMIT_ORDER, FLAG_BITS, LAUDA_FAST_CHANNELS
+from lauda.safety import PressureWatchdog
+
+# Nach dieser Zeit ohne neuen Wert gelten die schnellen Kanäle eines Geräts als veraltet
+STALE_AFTER = 2.0
+
+
+class AcquisitionClock:
+    """Monotonic clock mapped to wall time once, shared by all acquisition workers.
+
+    Wall time jumps (NTP, daylight saving) do not disturb the spacing of the samples."""
+
+    def __init__(self):
+        self.sync()
+
+    def sync(self):
+        self.offset = time.time() - time.monotonic()
+
+    def now(self):
+        return time.monotonic() + self.offset
+
+
+class Sample:
+    """One merged acquisition record with a fixed layout.
+
+    t is the wall time (seconds since the epoch) of the reading that produced the sample.
+    flags has one bit per channel (in EMIT_ORDER) that is set if the value is not fresh,
+    i.e. stale or invalid and carried over from an earlier cycle."""
+    __slots__ = ('t', 'Ti', 'T1', 'Ts', 'p', 'status_sign', 'Tu', 'To', 'Xp', 'Tn', 'Tv', 'flags')
+
+    BITS = FLAG_BITS
+
+    def __init__(self, t, Ti, T1, Ts, p, status_sign, Tu, To, Xp, Tn, Tv, flags=0):
+        self.t = t
+        self.Ti = Ti
+        self.T1 = T1
+        self.Ts = Ts
+        self.p = p
+        self.status_sign = status_sign
+        self.Tu = Tu
+        self.To = To
+        self.Xp = Xp
+        self.Tn = Tn
+        self.Tv = Tv
+        self.flags = flags
+
+    @classmethod
+    def from_values(cls, t, values, states=None):
+        flags = 0
+        if states:
+            for name, state in states.items():
+                if state != FRESH:
+                    flags |= cls.BITS[name]
+        return cls(t, *(values[name] for name in EMIT_ORDER), flags)
+
+    def fresh(self, name):
+        return not self.flags & self.BITS[name]
+
+    def values(self):
+        """The ten values in the order of the dataReceived signal."""
+        return (self.Ti, self.T1, self.Ts, self.p, self.status_sign, self.Tu, self.To, self.Xp, self.Tn, self.Tv)
+
+    def __repr__(self):
+        return f"Sample(t={self.t:.3f}, Ti={self.Ti}, T1={self.T1}, Ts={self.Ts}, p={self.p})"
+
+
+class SampleBatch:
+    """Block of samples delivered to the GUI in one go, one NumPy column per numeric channel.
+
+    The columns t, Ti, T1, Ts, p, Tu, To, Xp, Tn and Tv are float64 arrays of equal length in
+    which values that are not fresh are NaN, status_sign is a list of strings and samples keeps
+    the original records."""
+    COLUMNS = ('t', 'Ti', 'T1', 'Ts', 'p', 'Tu', 'To', 'Xp', 'Tn', 'Tv')
+
+    def __init__(self, samples):
+        self.samples = samples
+        data = np.array([(s.t, s.Ti, s.T1, s.Ts, s.p, s.Tu, s.To, s.Xp, s.Tn, s.Tv) for s in samples],
+                        dtype=np.float64).reshape(len(samples), len(self.COLUMNS))
+        flags = np.array([s.flags for s in samples], dtype=np.int64)
+        for i, name in enumerate(self.COLUMNS):
+            column = data[:, i]
+            if name != 't':
+                column[(flags & Sample.BITS[name]) != 0] = np.nan
+            setattr(self, name, column)
+        self.status_sign = [s.status_sign for s in samples]
+
+    def __len__(self):
+        return len(self.samples)
+
+    def last(self):
+        return self.samples[-1]
+
+    def peak(self, name='p'):
+        """The sample with the highest fresh value of a channel (e.g. for the pressure check),
+        or None if the block contains no fresh value of it."""
+        column = getattr(self, name)
+        if np.isnan(column).all():
+            return None
+        return self.samples[int(np.nanargmax(column))]
+
+
+class SerialThread(QThread):
+    """Acquisition worker for the LAUDA thermostat."""
+    valuesReceived = pyqtSignal(dict, dict, float)
+    warning = pyqtSignal(str)
+
+    MAX_PIPELINE_FAILURES = 3
+
+    def __init__(self, devices, pipelined=False, clock=None):
+        super().__init__()
+
+        self.devices = devices
+        self.clock = clock or AcquisitionClock()
+        self.running = False
+        # Jeder Kanal hat eine eigene Abfragerate (siehe lauda/polling.py)
+        self.scheduler = PollScheduler(channels_for('lauda'))
+        # Werte gelten als veraltet, wenn sie deutlich länger als ihre Abfrageperiode nicht erneuert wurden
+        self.parser = CycleParser([channel.name for channel in self.scheduler.channels],
+                                  {channel.name: max(STALE_AFTER, 2 * channel.period)
+                                   for channel in self.scheduler.channels})
+        # Pipelined: alle fälligen Abfragen eines Zyklus werden ohne Warten hintereinander gesendet
+        self.pipelined = pipelined
+        self.pipeline_failures = 0
+
+    def query_channels(self, channels):
+        commands = [channel.command for channel in channels]
+        if self.pipelined and len(commands) > 1:
+            replies = self.devices.query_many(commands)
+            if replies is not None:
+                self.pipeline_failures = 0
+                return replies
+            # Antwort verloren: diesen Zyklus im Lock-Step-Betrieb wiederholen
+            self.pipeline_failures += 1
+            if self.pipeline_failures >= self.MAX_PIPELINE_FAILURES:
+                self.warning.emit("LAUDA Thermostat drops pipelined replies, falling back to lock-step mode.")
+                self.pipelined = False
+        return [self.devices.query(command) for command in commands]
+
+    def start(self):
+        # Schon beim Start setzen: ein sofort folgendes stop() darf nicht von run() überschrieben werden
+        self.running = True
+        super().start()
+
+    def run(self):
+
+        if not self.devices.is_connected(LAUDA):
+            print("Not connected to LAUDA Thermostat.")
+            self.running = False
+
+        self.scheduler.reset()
+        self.parser.reset()
+
+        while self.running:
+            now = time.monotonic()
+            channels = self.scheduler.due(now)
+            try:
+                replies = self.query_channels(channels)
+            except CancelledError:
+                # Gerät getrennt, während die Abfrage noch wartete
+                self.running = False
+                break
+            except (serial.SerialException, ConnectionError) as e:
+                print(f"Error reading LAUDA Thermostat: {e}")
+                time.sleep(1)
+                continue
+            # Zeitstempel beim Eintreffen der Antworten, nicht bei der Zustellung des Qt-Signals
+            stamp = self.clock.now()
+
+            names = [channel.name for channel in channels]
+            self.parser.parse(names, replies, now)
+            for name in names:
+                # Noch kein gültiger Wert vorhanden: im nächsten Zyklus erneut abfragen
+                if name in self.parser.values:
+                    self.scheduler.mark_polled(name, now)
+
+            if all(name in self.parser.values for name in LAUDA_FAST_CHANNELS):
+                self.valuesReceived.emit(dict(self.parser.values), dict(self.parser.states), stamp)
+
+    def stop(self):
+        self.running = False
+
+
+class PressureThread(QThread):
+    """Acquisition worker for the pressure transducer, independent of the thermostat.
+
+    Every fresh reading goes through the watchdog in this thread before it is emitted."""
+    pressureReceived = pyqtSignal(float, str, float)
+    tripped = pyqtSignal(object)
+
+    def __init__(self, devices, interval=0.2, clock=None, watchdog=None):
+        super().__init__()
+
+        self.devices = devices
+        self.watchdog = watchdog
+        self.clock = clock or AcquisitionClock()
+        self.running = False
+        self.interval = interval  # Abtastintervall in Sekunden
+        self.spec = SPECS['p']
+        self.p = float('nan')  # letzter gültiger Druck
+        self.errors = 0
+
+    def start(self):
+        self.running = True
+        super().start()
+
+    def run(self):
+
+        if not self.devices.is_connected(PRESSURE):
+            print("Not connected to Pressure transducer.")
+            self.running = False
+
+        while self.running:
+            started = time.monotonic()
+            try:
+                answer = self.devices.query(self.spec.command, PRESSURE)
+            except CancelledError:
+                self.running = False
+                break
+            except (serial.SerialException, ConnectionError) as e:
+                print(f"Error reading p: {e}")
+                answer = ''
+            received = time.monotonic()
+            stamp = self.clock.now()
+            p = self.spec.parse(answer)
+            if p is None:
+                self.errors += 1
+                self.pressureReceived.emit(self.p, INVALID, stamp)
+            else:
+                self.p = p
+                # Überdruckschutz direkt nach dem Lesen, unabhängig vom GUI-Thread
+                trip = self.watchdog.check(p, stamp, received) if self.watchdog is not None else None
+                if trip is not None:
+                    self.tripped.emit(trip)
+                self.pressureReceived.emit(p, FRESH, stamp)
+
+            remaining = self.interval - (time.monotonic() - started)
+            if remaining > 0:
+                time.sleep(remaining)
+
+    def stop(self):
+        self.running = False
+
+
+class Acquisition(QObject):
+    """Merges the latest values of the thermostat and pressure workers for the GUI.
+
+    Each worker runs in its own thread and stamps its samples itself, so a slow
+    thermostat reply no longer delays the pressure reading. Every merged state is
+    delivered as a Sample (sampleReceived) and, for existing consumers, as the ten
+    loose values of dataReceived.
+
+    With batch_interval (seconds) the samples are additionally collected and emitted as
+    one SampleBatch per interval (batchReceived), so the cost of the GUI no longer grows
+    with the sample rate.
+
+    The pressure watchdog runs in the pressure worker; tripped delivers its Trip after
+    STOP and OUT_30 have already been queued. stop() only asks the workers to stop; stopped
+    is emitted once both have finished their last cycle."""
+    dataReceived = pyqtSignal(float, float, float, float, str, float, float, float, float, float)
+    sampleReceived = pyqtSignal(object)
+    batchReceived = pyqtSignal(object)
+    tripped = pyqtSignal(object)
+    stopped = pyqtSignal()
+    warning = pyqtSignal(str)
+
+    def __init__(self, devices, pipelined=False, batch_interval=0.0, parent=None, watchdog=None):
+        super().__init__(parent)
+        self.devices = devices
+        self.pending = []
+        self.batch_timer = QTimer(self)
+        self.batch_timer.timeout.connect(self.flushBatch)
+        self.setBatchInterval(batch_interval)
+        self.clock = AcquisitionClock()
+        self.thermostat = SerialThread(devices, pipelined, self.clock)
+        self.watchdog = watchdog if watchdog is not None else PressureWatchdog(devices)
+        self.pressure = PressureThread(devices, clock=self.clock, watchdog=self.watchdog)
+        self.pressure.tripped.connect(self.tripped)
+        self.thermostat.warning.connect(self.warning)
+        self.scheduler = self.thermostat.scheduler
+        self.values = {}
+        self.states = {}
+        self.timestamps = {}  # Zeitstempel des letzten Werts je Gerät
+        self.last_t = float('-inf')  # Zeitstempel des zuletzt ausgegebenen Samples
+
+        self.thermostat.valuesReceived.connect(self.onThermostatValues)
+        self.pressure.pressureReceived.connect(self.onPressure)
+        self.thermostat.finished.connect(self.workerFinished)
+        self.pressure.finished.connect(self.workerFinished)
+
+    def setBatchInterval(self, seconds):
+        self.batch_interval = seconds
+        self.batch_timer.setInterval(int(seconds * 1000))
+
+    def start(self):
+        self.values = {}
+        self.states = {}
+        self.timestamps = {}
+        self.last_t = float('-inf')
+        self.pending = []
+        if not self.devices.is_connected(PRESSURE):
+            # Ohne Drucktransmitter: p bleibt NaN und als ungültig markiert, die Temperaturen kommen trotzdem
+            self.values['p'] = float('nan')
+            self.states['p'] = INVALID
+        self.clock.sync()
+        if self.batch_interval > 0:
+            self.batch_timer.start()
+        self.thermostat.start()
+        self.pressure.start()
+
+    def stop(self):
+        self.thermostat.stop()
+        self.pressure.stop()
+        self.batch_timer.stop()
+        self.flushBatch()
+
+    def workerFinished(self):
+        # Erst wenn beide Threads beendet sind; ein inzwischen erneuter Start hat Vorrang
+        if not self.isRunning():
+            # Werte des letzten Zyklus, die nach stop() noch eingetroffen sind
+            self.flushBatch()
+            self.stopped.emit()
+
+    def flushBatch(self):
+        if self.pending:
+            batch = SampleBatch(self.pending)
+            self.pending = []
+            self.batchReceived.emit(batch)
+
+    def isRunning(self):
+        return self.thermostat.isRunning() or self.pressure.isRunning()
+
+    def errorCounts(self):
+        """Number of invalid replies per channel since the workers were created."""
+        counts = dict(self.thermostat.parser.errors)
+        counts['p'] = self.pressure.errors
+        return counts
+
+    def onThermostatValues(self, values, states, timestamp):
+        self.values.update(values)
+        self.states.update(states)
+        self.timestamps[LAUDA] = timestamp
+        self.emitLatest(timestamp)
+
+    def onPressure(self, p, state, timestamp):
+        self.values['p'] = p
+        self.states['p'] = state
+        self.timestamps[PRESSURE] = timestamp
+        self.emitLatest(timestamp)
+
+    def emitLatest(self, timestamp):
+        if all(name in self.values for name in EMIT_ORDER):
+            # Die Werte beider Threads kommen als eingereihte Signale: ein älterer Zeitstempel kann
+            # nach einem neueren eintreffen, die Samples bleiben trotzdem zeitlich geordnet
+            timestamp = max(self.last_t, timestamp)
+            self.last_t = timestamp
+            states = dict(self.states)
+            # Schnelle Kanäle eines Geräts, das seit STALE_AFTER nichts geliefert hat, sind veraltet
+            for device, names in ((LAUDA, LAUDA_FAST_CHANNELS), (PRESSURE, ('p',))):
+                if device in self.timestamps and timestamp - self.timestamps[device] > STALE_AFTER:
+                    for name in names:
+                        if states[name] == FRESH:
+                            states[name] = STALE
+            sample = Sample.from_values(timestamp, self.values, states)
+            if self.batch_interval > 0:
+                self.pending.append(sample)
+            self.sampleReceived.emit(sample)
+            self.dataReceived.emit(*sample.values())
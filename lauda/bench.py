@@ -0,0 +1,493 @@
+# -*- coding :utf-8 -*-
+# lauda/bench.py
+'''
+This module provides the acquisition benchmark suite. It runs the real acquisition path
+(DeviceManager, SerialThread, PressureThread, Acquisition and MainWindow) headless against the
+simulated devices of lauda/simulator.py and reports:
+
+    - poll cycles per second (lock-step and pipelined)
+    - round-trip latency percentiles per command
+    - end-to-end latency from the serial read to update_batch and to a rendered frame
+    - CPU usage of the GUI thread
+    - number of invalid replies per channel
+    - cost of MainWindow.update_plot (with and without rendering) and saveSamples in isolation
+    - write and CSV export throughput of the binary run format
+    - replay of a recorded run through MainWindow as fast as possible, including the pressure trip
+    - reaction time of the pressure watchdog while the GUI thread is blocked
+    - several simulated reactors in one ReactorsWindow: frame time, event loop lag and CPU
+
+Usage:
+    python -m lauda.bench [--duration 10] [--latency 0.005] [--jitter 0.002] [--drop 0.0] [--adapter-latency 0.016]
+                          [--batch-interval 0.2] [--frame-rate 10] [--json]
+'''
+import argparse
+import collections
+import json
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt6.QtWidgets import QApplication
+
+from lauda.devices import DeviceManager, LAUDA, PRESSURE
+from lauda.simulator import simulated_ports
+from lauda.transport import FramedSerial
+
+
+def percentiles(values, points=(50, 90, 99)):
+    """Nearest-rank percentiles in milliseconds, plus the maximum."""
+    if not values:
+        return {}
+    ordered = sorted(values)
+    result = {f"p{point}": ordered[min(len(ordered) - 1, int(len(ordered) * point / 100))] * 1000
+              for point in points}
+    result['max'] = ordered[-1] * 1000
+    return result
+
+
+class TimedLink(FramedSerial):
+    """FramedSerial that records the round-trip time of every command."""
+
+    def __init__(self, port, **kwargs):
+        super().__init__(port, **kwargs)
+        self.round_trips = collections.defaultdict(list)
+
+    def query(self, command, timeout=None):
+        started = time.perf_counter()
+        reply = super().query(command, timeout)
+        self.round_trips[command.strip().decode()].append(time.perf_counter() - started)
+        return reply
+
+    def query_many(self, commands, timeout=None):
+        started = time.perf_counter()
+        replies = super().query_many(commands, timeout)
+        self.round_trips['burst'].append(time.perf_counter() - started)
+        return replies
+
+
+def connect_simulator(devices, latency, jitter, drop, adapter_latency=0.0):
+    link = dict(latency=latency, jitter=jitter, drop_rate=drop, adapter_latency=adapter_latency)
+    lauda_port, pressure_port, model = simulated_ports(lauda_link=link, pressure_link=link)
+    lauda = TimedLink(lauda_port)
+    pressure = TimedLink(pressure_port, encoding='ISO-8859-1')
+    devices.attach(LAUDA, lauda)
+    devices.attach(PRESSURE, pressure)
+    return lauda, pressure, model
+
+
+def spin(app, seconds):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.001)
+
+
+def bench_poll_rate(app, args, pipelined):
+    """Poll cycles per second of the thermostat worker alone."""
+    from lauda.acquisition import SerialThread
+
+    devices = DeviceManager()
+    # Der Gewinn des Pipelinings liegt in der Latenz des USB-Adapters, die ein Burst nur einmal zahlt
+    lauda, pressure, _ = connect_simulator(devices, args.latency, args.jitter, args.drop, args.adapter_latency)
+    thread = SerialThread(devices, pipelined=pipelined)
+    cycles = []
+    thread.valuesReceived.connect(lambda values, states, stamp: cycles.append(stamp))
+    thread.start()
+    spin(app, args.duration)
+    thread.stop()
+    thread.wait()
+    devices.disconnect()
+    return {
+        'cycles_per_s': len(cycles) / args.duration,
+        'round_trip_ms': {command: percentiles(times) for command, times in sorted(lauda.round_trips.items())},
+    }
+
+
+def bench_end_to_end(app, args):
+    """Full acquisition path into a headless MainWindow."""
+    from lauda.acquisition import SampleBatch
+    from lauda.views import MainWindow
+
+    window = MainWindow()
+    lauda, pressure, _ = connect_simulator(window.devices, args.latency, args.jitter, args.drop)
+    window.resize(1200, 700)
+    window.show()
+
+    to_update = []
+    to_render = []
+    update_cost = []
+    render_cost = []
+
+    samples = [0]
+    acquisition = window.acquisition
+    # Verbindungen von MainWindow durch zeitmessende Varianten ersetzen
+    if acquisition.batch_interval > 0:
+        acquisition.batchReceived.disconnect(window.update_batch)
+    else:
+        acquisition.sampleReceived.disconnect(window.update_data)
+    if args.batch_interval is not None:
+        acquisition.setBatchInterval(args.batch_interval)
+
+    unrendered = []  # Zeitstempel der Messwerte seit dem letzten gezeichneten Bild
+
+    def timed_update_batch(batch):
+        started = time.perf_counter()
+        window.update_batch(batch)
+        update_cost.append(time.perf_counter() - started)
+        to_update.extend(time.time() - batch.t)
+        unrendered.extend(batch.t)
+        samples[0] += len(batch)
+
+    def timed_render_frame():
+        if not window.frame_pending:
+            return
+        started = time.perf_counter()
+        window.renderFrame()
+        window.plot_widget.grab()  # Plot synchron rendern
+        render_cost.append(time.perf_counter() - started)
+        now = time.time()
+        to_render.extend(now - t for t in unrendered)
+        unrendered.clear()
+
+    window.render_timer.timeout.disconnect(window.renderFrame)
+    window.render_timer.timeout.connect(timed_render_frame)
+    if args.frame_rate is not None:
+        window.setFrameRate(args.frame_rate)
+
+    if acquisition.batch_interval > 0:
+        acquisition.batchReceived.connect(timed_update_batch)
+    else:
+        acquisition.sampleReceived.connect(lambda sample: timed_update_batch(SampleBatch([sample])))
+
+    window.no_program_radio_button.setChecked(True)
+    window.start_data_receiving()
+    cpu_started = time.thread_time()
+    wall_started = time.perf_counter()
+    spin(app, args.duration)
+    gui_cpu = (time.thread_time() - cpu_started) / (time.perf_counter() - wall_started)
+    window.stop_data_receiving()
+    while window.acquisition.isRunning():
+        app.processEvents()
+    window.devices.disconnect()
+    window.close()
+
+    return {
+        'samples_per_s': samples[0] / args.duration,
+        'gui_updates_per_s': len(update_cost) / args.duration,
+        'frames_per_s': len(render_cost) / args.duration,
+        'read_to_update_batch_ms': percentiles(to_update),
+        'read_to_rendered_plot_ms': percentiles(to_render),
+        'update_batch_ms': percentiles(update_cost),
+        'render_ms': percentiles(render_cost),
+        'gui_thread_cpu_percent': gui_cpu * 100,
+        'pressure_round_trip_ms': percentiles(pressure.round_trips.get('P', [])),
+        'parse_errors': acquisition.errorCounts(),
+    }
+
+
+def fill_plot_buffers(window, n):
+    """Replace the live plot buffer and the run history of a MainWindow by n synthetic samples."""
+    import numpy as np
+    from lauda.buffers import MinMaxPyramid, RingBuffer
+
+    i = np.arange(n, dtype=np.float64)
+    window.max_data_points = n
+    window.buffer = RingBuffer(n)
+    columns = {'t': time.time() + i, 'Ti': 20.0 + i % 100, 'T1': 20.0 + i % 50, 'Ts': 30.0,
+               'p': 1.0 + i % 10, 'Tu': -10.0, 'To': 280.0, 'Xp': 2.0, 'Tn': 25.0, 'Tv': 5.0}
+    window.buffer.extend_columns(columns)
+    window.history = MinMaxPyramid()
+    window.history.extend_columns(columns)
+
+
+def bench_update_plot(points=(2000, 200000), repeat=20):
+    """Cost of one MainWindow.update_plot call with full buffers (update) and of the
+    complete frame including the synchronous render of the plot widget (frame)."""
+    from lauda.views import MainWindow
+
+    results = {}
+    for n in points:
+        window = MainWindow()
+        window.resize(1200, 700)
+        fill_plot_buffers(window, n)
+        update = []
+        frame = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            window.update_plot()
+            updated = time.perf_counter()
+            window.plot_widget.grab()
+            update.append(updated - started)
+            frame.append(time.perf_counter() - started)
+        results[str(n)] = {'update': percentiles(update), 'frame': percentiles(frame)}
+        window.close()
+    return results
+
+
+def bench_save_csv(rows=2000):
+    """Cost per row of MainWindow.saveSamples on the GUI thread (the file is written by the CsvLogger)."""
+    from lauda.acquisition import Sample
+    from lauda.views import MainWindow
+
+    from lauda.recording import RunJournal
+
+    window = MainWindow()
+    with tempfile.TemporaryDirectory() as directory:
+        window.journal = RunJournal(os.path.join(directory, 'journal.json'))
+        window.catalog_path = os.path.join(directory, 'runs.sqlite')
+        path = os.path.join(directory, 'bench.csv')
+        times = []
+        for i in range(rows):
+            sample = Sample(time.time(), 25.0, 24.0, 30.0, 1.0, '0010010', -10.0, 280.0, 2.0, 25.0, 5.0)
+            started = time.perf_counter()
+            window.saveSamples([sample], path)
+            times.append(time.perf_counter() - started)
+        window.closeRecording(timeout=5.0)
+    window.close()
+    return percentiles(times)
+
+
+def bench_recording(rows=200000, block=10):
+    """Write time and size of the CSV and the binary run format, reload and CSV export time."""
+    import csv
+    from lauda.acquisition import Sample
+    from lauda.loader import load_run
+    from lauda.recording import BinaryRecorder, CsvLogger, export_csv, open_run
+
+    now = time.time()
+    samples = [Sample(now + i * 0.1, 25.0 + i % 100 * 0.1, 24.0, 30.0, 1.013, '0010010', -10.0, 280.0, 2.0, 25.0, 5.0)
+               for i in range(rows)]
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, cls, suffix in (('csv', CsvLogger, '.csv'), ('binary', BinaryRecorder, '.lrun')):
+            path = os.path.join(directory, 'bench' + suffix)
+            started = time.perf_counter()
+            recorder = cls(path)
+            for i in range(0, rows, block):
+                recorder.write(samples[i:i + block])
+            recorder.close()
+            recorder.join()
+            results[f'{name}_write_s'] = time.perf_counter() - started
+            results[f'{name}_bytes_per_row'] = os.path.getsize(path) / rows
+
+        started = time.perf_counter()
+        with open(os.path.join(directory, 'bench.csv'), newline='') as file:
+            p = [float(row[4]) for row in csv.reader(file)]
+        results['csv_load_s'] = time.perf_counter() - started
+        started = time.perf_counter()
+        load_run(os.path.join(directory, 'bench.csv'))
+        results['csv_open_run_s'] = time.perf_counter() - started
+        started = time.perf_counter()
+        _, records = open_run(os.path.join(directory, 'bench.lrun'))
+        p = records['p'].max()
+        results['binary_load_s'] = time.perf_counter() - started
+        del records
+        started = time.perf_counter()
+        load_run(os.path.join(directory, 'bench.lrun'))
+        results['binary_open_run_s'] = time.perf_counter() - started
+        started = time.perf_counter()
+        export_csv(os.path.join(directory, 'bench.lrun'), os.path.join(directory, 'export.csv'))
+        results['export_csv_s'] = time.perf_counter() - started
+    return results
+
+
+def bench_replay(app, rows=100000, trip_at=0.8):
+    """Replay a recorded run with a pressure spike through MainWindow (plot, pressure check)."""
+    from lauda.acquisition import Sample
+    from lauda.recording import CsvLogger, RunJournal
+    from lauda.views import MainWindow
+
+    now = time.time() - rows * 0.1
+    spike = int(rows * trip_at)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'run.csv')
+        logger = CsvLogger(source)
+        for i in range(0, rows, 1000):
+            logger.write([Sample(now + j * 0.1, 25.0 + j % 100 * 0.1, 24.0, 30.0, 55.0 if j == spike else 1.013,
+                                 '0010010', -10.0, 280.0, 2.0, 25.0, 5.0) for j in range(i, min(rows, i + 1000))])
+        logger.close()
+        logger.join()
+
+        window = MainWindow()
+        window.journal = RunJournal(os.path.join(directory, 'journal.json'))
+        window.catalog_path = os.path.join(directory, 'runs.sqlite')
+        # Datei eines vorangegangenen Laufs: die Wiedergabe darf nichts an sie anhängen
+        window.filepath = os.path.join(directory, 'previous.csv')
+        messages = []
+        window.display_message = messages.append
+        window.show()
+        started = time.perf_counter()
+        window.replayRun(source, speed=0)
+        replay = window.replay
+        trips = []
+        replay.tripped.connect(trips.append)
+        trip = None
+        while replay.position < len(replay) or window.receiving:
+            app.processEvents()
+            if trip is None and trips:
+                trip = replay.position
+        results['rows_per_s'] = rows / (time.perf_counter() - started)
+        results['tripped'] = float(trip is not None)
+        # Datensätze nach der Spitze, die vor dem Auslösen noch geliefert wurden (Rest des Blocks)
+        results['rows_after_spike_at_trip'] = trip - spike - 1 if trip is not None else float('nan')
+        spin(app, 0.5)
+        results['trip_detect_ms'] = trips[0].detect_ms if trips else float('nan')
+        if os.path.exists(window.filepath):
+            with open(window.filepath, 'rb') as file:
+                results['rows_recorded'] = sum(1 for _ in file)
+        else:
+            results['rows_recorded'] = 0
+        window.devices.disconnect()
+        window.close()
+    return results
+
+
+def bench_trip(app, args, block=2.0):
+    """Pressure trip while the GUI thread is blocked for block seconds (e.g. by a modal dialog).
+
+    The simulated pressure starts to rise just above the limit; the watchdog in the pressure
+    worker has to queue STOP and OUT_30 and get the reply without the GUI thread."""
+    from lauda.views import MainWindow
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        window = MainWindow()
+        _, _, model = connect_simulator(window.devices, args.latency, args.jitter, args.drop)
+        window.watchdog.log_path = os.path.join(directory, 'trips.csv')
+        window.display_message = lambda message: None
+        window.no_program_radio_button.setChecked(True)
+        window.start_data_receiving()
+        spin(app, 1.0)
+        window.watchdog.configure(limit=model.p + 0.5)
+        model.gas_rate = 10.0
+        # GUI-Thread blockieren, der Watchdog muss ohne ihn auslösen
+        time.sleep(block)
+        trips = list(window.watchdog.trips)
+        spin(app, 0.5)
+        results['tripped_while_blocked'] = float(bool(trips and trips[0].confirmed is not None))
+        if trips:
+            results['detect_ms'] = trips[0].detect_ms
+            results['reaction_ms'] = trips[0].reaction_ms if trips[0].reaction_ms is not None else float('nan')
+        results['gui_notified'] = float(window.pressure_exceeded)
+        model.gas_rate = 0.0
+        window.stop_data_receiving()
+        spin(app, 0.3)
+        window.devices.disconnect()
+        window.close()
+    return results
+
+
+def bench_reactors(app, args, count=8):
+    """count simulated reactors acquiring at once in the tiled ReactorsWindow."""
+    from PyQt6.QtCore import QTimer
+    from lauda.views import ReactorsWindow
+
+    window = ReactorsWindow()
+    window.resize(1600, 1000)
+    window.show()
+    links = []
+    for i in range(count):
+        reactor = window.addReactor(f"Bench {i + 1}")
+        links.append(connect_simulator(reactor.devices, args.latency, args.jitter, args.drop))
+    window.showTiled()
+
+    render_cost = []
+    samples = [0]
+    for reactor in window.reactors:
+        def timed_render_frame(reactor=reactor, render=reactor.renderFrame):
+            if not reactor.frame_pending:
+                return
+            started = time.perf_counter()
+            render()
+            reactor.plot_widget.grab()  # Plot synchron rendern
+            render_cost.append(time.perf_counter() - started)
+        # ReactorsWindow ruft renderFrame reihum auf
+        reactor.renderFrame = timed_render_frame
+        reactor.acquisition.batchReceived.connect(lambda batch: samples.__setitem__(0, samples[0] + len(batch)))
+        reactor.no_program_radio_button.setChecked(True)
+        reactor.start_data_receiving()
+
+    # Verspätung eines 20-ms-Timers als Maß für die Reaktionszeit der Ereignisschleife
+    lag = []
+    probe = QTimer()
+    probe.setInterval(20)
+    last = [time.perf_counter()]
+
+    def tick():
+        now = time.perf_counter()
+        lag.append(max(0.0, now - last[0] - 0.020))
+        last[0] = now
+    probe.timeout.connect(tick)
+    probe.start()
+
+    cpu_started = time.thread_time()
+    wall_started = time.perf_counter()
+    spin(app, args.duration)
+    gui_cpu = (time.thread_time() - cpu_started) / (time.perf_counter() - wall_started)
+    probe.stop()
+    for reactor in window.reactors:
+        reactor.stop_data_receiving()
+    spin(app, 0.5)
+    window.close()
+
+    return {
+        'reactors': count,
+        'samples_per_s_per_reactor': samples[0] / args.duration / count,
+        'frames_per_s_per_reactor': len(render_cost) / args.duration / count,
+        'render_ms': percentiles(render_cost),
+        'event_loop_lag_ms': percentiles(lag),
+        'gui_thread_cpu_percent': gui_cpu * 100,
+    }
+
+
+def print_report(report, indent=0):
+    for key, value in report.items():
+        if isinstance(value, dict):
+            print(' ' * indent + f"{key}:")
+            print_report(value, indent + 2)
+        else:
+            print(' ' * indent + f"{key:<28}{value:10.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="LAUDA acquisition benchmarks against the simulator")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds per acquisition benchmark")
+    parser.add_argument('--latency', type=float, default=0.005, help="simulated reply latency [s]")
+    parser.add_argument('--jitter', type=float, default=0.002, help="simulated reply jitter [s]")
+    parser.add_argument('--drop', type=float, default=0.0, help="probability of a dropped reply")
+    parser.add_argument('--adapter-latency', type=float, default=0.016,
+                        help="USB serial adapter latency per transfer in the poll rate benchmarks [s]")
+    parser.add_argument('--batch-interval', type=float, default=None,
+                        help="GUI batch interval [s], 0 = one update per sample (default: MainWindow setting)")
+    parser.add_argument('--frame-rate', type=float, default=None,
+                        help="plot frame rate [1/s] (default: MainWindow setting)")
+    parser.add_argument('--reactors', type=int, default=8, help="number of simulated reactors in the reactor benchmark")
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    report = {
+        'lock_step': bench_poll_rate(app, args, pipelined=False),
+        'pipelined': bench_poll_rate(app, args, pipelined=True),
+        'end_to_end': bench_end_to_end(app, args),
+        'update_plot_ms': bench_update_plot(),
+        'save_csv_ms': bench_save_csv(),
+        'recording': bench_recording(),
+        'replay': bench_replay(app),
+        'trip': bench_trip(app, args),
+        'reactors': bench_reactors(app, args, args.reactors),
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return report
+
+
+if __name__ == '__main__':
+    main()
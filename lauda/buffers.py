@@ -0,0 +1,260 @@
+# -*- coding :utf-8 -*-
+# lauda/buffers.py
+'''
+This module provides the buffers behind the plot:
+
+    - RingBuffer: preallocated NumPy ring buffer for the live time series. It holds the
+      timestamp and all numeric channels of SampleBatch in one float64 array. Every value is
+      written twice, at its slot and one capacity further, so the newest n values of a channel
+      are always a contiguous slice of the array: views() hands them to pyqtgraph without
+      copying, also when the buffer has wrapped around.
+    - MinMaxPyramid: min/max history of the whole run, built incrementally as samples arrive.
+      Level k keeps the minimum and maximum of factor**(k+1) samples, so a spike survives on
+      every level. select() picks the coarsest level that still fills the plot for the
+      visible time range and takes the raw values from the RingBuffer where it has them.
+    - StaticSeries: the complete columns of a recorded run with the read interface of
+      RingBuffer, so reopened runs go through the same plot and decimation path.
+'''
+import numpy as np
+
+from lauda.acquisition import SampleBatch
+
+
+class RingBuffer:
+    """Fixed-capacity buffer for the columns t, Ti, T1, Ts, p, Tu, To, Xp, Tn and Tv.
+
+    Memory use is 2 * capacity * 8 bytes per column."""
+    COLUMNS = SampleBatch.COLUMNS
+
+    def __init__(self, capacity, columns=COLUMNS):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.columns = tuple(columns)
+        self.index = {name: i for i, name in enumerate(self.columns)}
+        self.data = np.full((len(self.columns), 2 * capacity), np.nan)
+        self.head = 0  # nächster Schreibplatz
+        self.count = 0
+
+    @classmethod
+    def for_duration(cls, hours, samples_per_second, columns=COLUMNS):
+        """Buffer large enough for the given number of hours at the given sample rate."""
+        return cls(max(1, int(hours * 3600 * samples_per_second)), columns)
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+
+    def resize(self, capacity):
+        """Change the capacity, keeping the newest values."""
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        columns = {name: self.view(name).copy() for name in self.columns}
+        self.capacity = capacity
+        self.data = np.full((len(self.columns), 2 * capacity), np.nan)
+        self.clear()
+        self.extend_columns(columns)
+
+    def extend(self, batch):
+        """Append a SampleBatch."""
+        self.extend_columns({name: getattr(batch, name) for name in self.columns})
+
+    def extend_columns(self, columns):
+        """Append arrays of equal length given as a mapping of column name to values."""
+        n = len(columns[self.columns[0]])
+        if n == 0:
+            return
+        block = np.empty((len(self.columns), n))
+        for i, name in enumerate(self.columns):
+            block[i] = columns[name]
+        if n > self.capacity:
+            # Nur die neuesten Werte passen in den Puffer
+            block = block[:, -self.capacity:]
+            self.head = (self.head + n - self.capacity) % self.capacity
+            n = self.capacity
+
+        # Bis zu zwei zusammenhängende Abschnitte, jeweils an beiden Spiegelpositionen
+        first = min(n, self.capacity - self.head)
+        for start, part in ((self.head, block[:, :first]), (0, block[:, first:])):
+            width = part.shape[1]
+            if width:
+                self.data[:, start:start + width] = part
+                self.data[:, start + self.capacity:start + self.capacity + width] = part
+
+        self.head = (self.head + n) % self.capacity
+        self.count = min(self.capacity, self.count + n)
+
+    def view(self, name):
+        """The values of one column from oldest to newest, as a view into the buffer."""
+        start = (self.head - self.count) % self.capacity
+        return self.data[self.index[name], start:start + self.count]
+
+    def views(self, *names):
+        return [self.view(name) for name in names]
+
+    def last(self, name):
+        if not self.count:
+            return None
+        return self.data[self.index[name], (self.head - 1) % self.capacity]
+
+
+class StaticSeries:
+    """Fixed columns (e.g. of a reopened run) that can stand in for a RingBuffer in select()."""
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.count = len(columns['t'])
+
+    def __len__(self):
+        return self.count
+
+    def view(self, name):
+        return self.columns[name]
+
+    def last(self, name):
+        return self.columns[name][-1] if self.count else None
+
+
+class _Level:
+    """One level of MinMaxPyramid: bucket start times and per-column minima and maxima."""
+
+    def __init__(self, width, capacity=1024):
+        self.t = np.empty(capacity)
+        self.low = np.empty((width, capacity))
+        self.high = np.empty((width, capacity))
+        self.count = 0
+        self.reduced = 0  # Anzahl der Einträge, die bereits in die nächste Stufe eingegangen sind
+
+    def append(self, t, low, high):
+        n = len(t)
+        if self.count + n > len(self.t):
+            capacity = max(2 * len(self.t), self.count + n)
+            for name in ('t', 'low', 'high'):
+                old = getattr(self, name)
+                new = np.empty(old.shape[:-1] + (capacity,))
+                new[..., :self.count] = old[..., :self.count]
+                setattr(self, name, new)
+        self.t[self.count:self.count + n] = t
+        self.low[:, self.count:self.count + n] = low
+        self.high[:, self.count:self.count + n] = high
+        self.count += n
+
+
+class MinMaxPyramid:
+    """Multi-resolution min/max history of the plotted channels for a whole run.
+
+    NaN values (stale or invalid readings) are ignored by the reduction; a bucket without any
+    valid value stays NaN and is drawn as a gap."""
+    COLUMNS = ('Ti', 'T1', 'Ts', 'p')
+
+    def __init__(self, columns=COLUMNS, factor=4):
+        self.columns = tuple(columns)
+        self.factor = factor
+        self.clear()
+
+    def clear(self):
+        self.levels = []
+        self.pending_t = np.empty(0)  # Rohwerte, die noch keinen vollständigen Block der ersten Stufe bilden
+        self.pending = np.empty((len(self.columns), 0))
+        self.start = None
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def extend(self, batch):
+        """Append a SampleBatch."""
+        columns = {name: getattr(batch, name) for name in self.columns}
+        columns['t'] = batch.t
+        self.extend_columns(columns)
+
+    def extend_columns(self, columns):
+        """Append arrays of equal length given as a mapping of column name (and 't') to values."""
+        t = np.asarray(columns['t'], dtype=np.float64)
+        if not len(t):
+            return
+        if self.start is None:
+            self.start = t[0]
+        self.count += len(t)
+        block = np.empty((len(self.columns), len(t)))
+        for i, name in enumerate(self.columns):
+            block[i] = columns[name]
+        t = np.concatenate((self.pending_t, t))
+        block = np.concatenate((self.pending, block), axis=1)
+
+        n = len(t) // self.factor * self.factor
+        if n:
+            self._reduce(0, t[:n], block[:, :n], block[:, :n])
+        self.pending_t = t[n:]
+        self.pending = block[:, n:]
+
+    def _reduce(self, k, t, low, high):
+        """Combine factor consecutive entries into one entry of level k and cascade upwards."""
+        width = len(self.columns)
+        buckets = (width, len(t) // self.factor, self.factor)
+        if len(self.levels) <= k:
+            self.levels.append(_Level(width))
+        level = self.levels[k]
+        level.append(t[::self.factor],
+                     np.fmin.reduce(low.reshape(buckets), axis=2),
+                     np.fmax.reduce(high.reshape(buckets), axis=2))
+
+        available = (level.count - level.reduced) // self.factor * self.factor
+        if available:
+            part = slice(level.reduced, level.reduced + available)
+            level.reduced += available
+            self._reduce(k + 1, level.t[part], level.low[:, part], level.high[:, part])
+
+    def select(self, x0, x1, max_points, raw=None):
+        """Times and values of all columns between x0 and x1 with at most about max_points points.
+
+        raw is the RingBuffer of the live plot; its samples are used as they are if they cover
+        the range and fit into max_points. Otherwise every bucket of the chosen level yields its
+        minimum and its maximum at the bucket start time. Returns (x, {column: y})."""
+        if raw is not None and len(raw):
+            rt = raw.view('t')
+            if self.start is None or rt[0] <= max(x0, self.start):
+                i0, i1 = self._span(rt, x0, x1, len(rt))
+                if i1 - i0 <= max_points or not self.levels:
+                    return rt[i0:i1], {name: raw.view(name)[i0:i1] for name in self.columns}
+
+        for k, level in enumerate(self.levels):
+            i0, i1 = self._span(level.t[:level.count], x0, x1, level.count)
+            if 2 * (i1 - i0) <= max_points:
+                break
+        else:
+            if not self.levels:
+                return self.pending_t, {name: self.pending[i] for i, name in enumerate(self.columns)}
+
+        # Gewählte Stufe; reicht der Bereich bis zum Ende, die noch nicht zusammengefassten
+        # Einträge der feineren Stufen und die Rohwerte anhängen, damit der Plot bis zum letzten Wert reicht
+        pieces = [(level, i0, i1)]
+        to_end = i1 == level.count
+        if to_end:
+            for finer in reversed(self.levels[:k]):
+                pieces.append((finer, finer.reduced, finer.count))
+
+        xs = []
+        ys = [[] for _ in self.columns]
+        for part, i0, i1 in pieces:
+            xs.append(np.repeat(part.t[i0:i1], 2))
+            for i, y in enumerate(ys):
+                pairs = np.empty(2 * (i1 - i0))
+                pairs[0::2] = part.low[i, i0:i1]
+                pairs[1::2] = part.high[i, i0:i1]
+                y.append(pairs)
+        if to_end:
+            xs.append(self.pending_t)
+            for i, y in enumerate(ys):
+                y.append(self.pending[i])
+        return np.concatenate(xs), {name: np.concatenate(y) for name, y in zip(self.columns, ys)}
+
+    @staticmethod
+    def _span(t, x0, x1, count):
+        # Ein Punkt links und rechts außerhalb, damit die Kurven bis an den Rand reichen
+        i0 = max(0, int(np.searchsorted(t, x0, 'left')) - 1)
+        i1 = min(count, int(np.searchsorted(t, x1, 'right')) + 1)
+        return i0, i1
@@ -0,0 +1,273 @@
+# -*- coding :utf-8 -*-
+# lauda/catalog.py
+'''
+This module provides the run catalog: a local SQLite database with one summary row per
+recorded run (start/stop time, number of samples, min/max T1, max p, time in the tolerance
+band and the program). RunSummary is updated incrementally by the recorder thread while a
+run is recorded; index_directory() summarizes existing CSV and *.lrun files with a process
+pool and skips files that did not change since they were indexed. The worker processes import
+this module and lauda/loader.py, neither of which imports Qt; a file that cannot be summarized
+is reported and skipped.
+
+Usage:
+    python -m lauda.catalog index C:\\HTC_Process_Data
+    python -m lauda.catalog search --min-t1 220
+    python -m lauda.catalog search --order max_p --limit 1
+'''
+import argparse
+import csv
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from lauda.recording import RUN_SUFFIX
+
+CATALOG_PATH = os.path.join(os.path.expanduser('~'), '.lauda', 'runs.sqlite')
+DEFAULT_TOLERANCE_BAND = 5.0  # K, Voreinstellung von NewProgramEnterDialog
+MAX_GAP = 10.0  # s; längere Lücken zwischen zwei Messwerten zählen nicht zur Zeit im Toleranzband
+
+FIELDS = ('filepath', 'started', 'stopped', 'samples', 'min_T1', 'max_T1', 'max_p', 'in_band_s',
+          'program', 'tolerance_band', 'size', 'mtime')
+ORDERS = ('started', 'stopped', 'max_T1', 'min_T1', 'max_p', 'in_band_s', 'samples')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    filepath TEXT PRIMARY KEY,
+    started REAL,
+    stopped REAL,
+    samples INTEGER,
+    min_T1 REAL,
+    max_T1 REAL,
+    max_p REAL,
+    in_band_s REAL,
+    program TEXT,
+    tolerance_band REAL,
+    size INTEGER,
+    mtime REAL
+);
+CREATE INDEX IF NOT EXISTS runs_max_T1 ON runs (max_T1);
+CREATE INDEX IF NOT EXISTS runs_max_p ON runs (max_p);
+CREATE INDEX IF NOT EXISTS runs_started ON runs (started);
+'''
+
+
+def read_program(path):
+    """Program text and tolerance band of the last entered program (res/programm_data.csv)."""
+    try:
+        with open(path, newline='') as file:
+            data = next(csv.DictReader(file))
+    except (OSError, StopIteration):
+        return None, DEFAULT_TOLERANCE_BAND
+    try:
+        band = float(data.pop('Tolerance Band', DEFAULT_TOLERANCE_BAND))
+    except (TypeError, ValueError):
+        band = DEFAULT_TOLERANCE_BAND
+    data.pop('Last Updated', None)
+    return '; '.join(f"{key}: {value}" for key, value in data.items() if value), band
+
+
+class RunSummary:
+    """Summary statistics of one run, updated block by block."""
+
+    def __init__(self, filepath, program=None, tolerance_band=DEFAULT_TOLERANCE_BAND):
+        self.filepath = os.path.abspath(filepath)
+        self.program = program
+        self.tolerance_band = tolerance_band
+        self.started = None
+        self.stopped = None
+        self.samples = 0
+        self.min_T1 = None
+        self.max_T1 = None
+        self.max_p = None
+        self.in_band_s = 0.0
+        self.size = None
+        self.mtime = None
+        self.last_in_band = False  # Zustand des letzten Messwerts des vorigen Blocks
+
+    @classmethod
+    def from_row(cls, row):
+        summary = cls(row['filepath'], row['program'], row['tolerance_band'])
+        for name in FIELDS:
+            setattr(summary, name, row[name])
+        return summary
+
+    def row(self):
+        return tuple(getattr(self, name) for name in FIELDS)
+
+    def update_samples(self, samples):
+        """Update with a list of Sample records (in the recorder thread)."""
+        from lauda.acquisition import SampleBatch
+        batch = SampleBatch(samples)
+        self.update_columns(batch.t, batch.T1, batch.Ts, batch.p)
+
+    def update_columns(self, t, T1, Ts, p):
+        """Update with arrays of a block; NaN values are ignored."""
+        n = len(t)
+        if n == 0:
+            return
+        if self.started is None:
+            self.started = float(t[0])
+        # Zeit im Toleranzband: Intervall bis zum nächsten Messwert zählt, wenn dieser im Band liegt
+        intervals = np.diff(t, prepend=t[0] if self.stopped is None else self.stopped)
+        with np.errstate(invalid='ignore'):
+            in_band = np.abs(T1 - Ts) <= self.tolerance_band
+        previous = np.concatenate(([self.last_in_band], in_band[:-1]))
+        counted = in_band & previous & (intervals <= MAX_GAP)
+        self.in_band_s += float(intervals[counted].sum())
+        self.last_in_band = bool(in_band[-1])
+        self.stopped = float(t[-1])
+        self.samples += n
+        self.min_T1 = self._combine(min, self.min_T1, T1, np.nanmin)
+        self.max_T1 = self._combine(max, self.max_T1, T1, np.nanmax)
+        self.max_p = self._combine(max, self.max_p, p, np.nanmax)
+
+    @staticmethod
+    def _combine(pick, current, values, reduce):
+        if np.isnan(values).all():
+            return current
+        value = float(reduce(values))
+        return value if current is None else pick(current, value)
+
+
+class RunCatalog:
+    """SQLite catalog of the recorded runs."""
+
+    def __init__(self, path=CATALOG_PATH):
+        self.path = path
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def save(self, summary):
+        if os.path.exists(summary.filepath):
+            stat = os.stat(summary.filepath)
+            summary.size, summary.mtime = stat.st_size, stat.st_mtime
+        with self.connection:
+            self.connection.execute(f"INSERT OR REPLACE INTO runs ({', '.join(FIELDS)}) "
+                                    f"VALUES ({', '.join('?' * len(FIELDS))})", summary.row())
+
+    def get(self, filepath):
+        row = self.connection.execute("SELECT * FROM runs WHERE filepath = ?",
+                                      (os.path.abspath(filepath),)).fetchone()
+        return dict(row) if row else None
+
+    def isCurrent(self, filepath):
+        """True if the file is indexed with its current size and modification time."""
+        row = self.get(filepath)
+        if row is None:
+            return False
+        stat = os.stat(filepath)
+        return row['size'] == stat.st_size and row['mtime'] == stat.st_mtime
+
+    def search(self, text='', min_T1_above=None, max_p_above=None, order='started', descending=True, limit=None):
+        """Runs matching all given conditions, as dicts."""
+        if order not in ORDERS:
+            raise ValueError(f"order must be one of {ORDERS}")
+        conditions = []
+        parameters = []
+        if text:
+            conditions.append("(filepath LIKE ? OR program LIKE ?)")
+            parameters += [f"%{text}%"] * 2
+        if min_T1_above is not None:
+            conditions.append("max_T1 >= ?")
+            parameters.append(min_T1_above)
+        if max_p_above is not None:
+            conditions.append("max_p >= ?")
+            parameters.append(max_p_above)
+        query = "SELECT * FROM runs"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" ORDER BY {order} {'DESC' if descending else 'ASC'}"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        return [dict(row) for row in self.connection.execute(query, parameters)]
+
+
+def summarize_file(filepath, tolerance_band=DEFAULT_TOLERANCE_BAND):
+    """RunSummary of an existing recording (runs in a worker process of index_directory)."""
+    from lauda.loader import load_run
+
+    columns = load_run(filepath)
+    summary = RunSummary(filepath, tolerance_band=tolerance_band)
+    summary.update_columns(columns['t'], columns['T1'], columns['Ts'], columns['p'])
+    return summary
+
+
+def run_files(directory):
+    for root, _, names in os.walk(directory):
+        for name in sorted(names):
+            if name.lower().endswith(('.csv', RUN_SUFFIX)) and name != 'programm_data.csv':
+                yield os.path.join(root, name)
+
+
+def index_directory(directory, path=CATALOG_PATH, workers=None, progress=None, cancelled=None):
+    """Summarize all new or changed recordings below directory with a process pool.
+
+    progress(done, total) is called after every file. Returns the number of indexed files."""
+    catalog = RunCatalog(path)
+    try:
+        files = [file for file in run_files(directory) if not catalog.isCurrent(file)]
+        done = 0
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(summarize_file, file): file for file in files}
+            for future, file in futures.items():
+                if cancelled is not None and cancelled():
+                    for pending in futures:
+                        pending.cancel()
+                    break
+                try:
+                    summary = future.result()
+                    # Programm der Aufzeichnung bleibt erhalten, falls sie schon beim Aufzeichnen erfasst wurde
+                    known = catalog.get(file)
+                    if known is not None:
+                        summary.program = known['program']
+                    catalog.save(summary)
+                except Exception as e:
+                    # Auch ein abgestürzter Worker-Prozess (BrokenProcessPool) überspringt nur diese Datei
+                    print(f"Error indexing {file}: {e!r}")
+                done += 1
+                if progress is not None:
+                    progress(done, len(files))
+        return done
+    finally:
+        catalog.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="LAUDA run catalog")
+    parser.add_argument('--catalog', default=CATALOG_PATH, help="catalog database")
+    commands = parser.add_subparsers(dest='command', required=True)
+    index = commands.add_parser('index', help="index all recordings below a directory")
+    index.add_argument('directory')
+    index.add_argument('--workers', type=int, default=None)
+    search = commands.add_parser('search', help="search the catalog")
+    search.add_argument('text', nargs='?', default='')
+    search.add_argument('--min-t1', type=float, default=None, help="runs whose T1 reached this value")
+    search.add_argument('--min-p', type=float, default=None, help="runs whose p reached this value")
+    search.add_argument('--order', choices=ORDERS, default='started')
+    search.add_argument('--limit', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == 'index':
+        started = time.perf_counter()
+        count = index_directory(args.directory, args.catalog, args.workers)
+        print(f"{count} runs indexed in {time.perf_counter() - started:.2f} s")
+    else:
+        catalog = RunCatalog(args.catalog)
+        for run in catalog.search(args.text, args.min_t1, args.min_p, args.order, limit=args.limit):
+            started = time.strftime("%Y-%m-%d %H:%M", time.localtime(run['started'])) if run['started'] else '-'
+            print(f"{started}  T1 {run['min_T1']}..{run['max_T1']} °C  p max {run['max_p']} bar  "
+                  f"in band {run['in_band_s'] / 60:.0f} min  {run['filepath']}")
+        catalog.close()
+
+
+if __name__ == '__main__':
+    main()
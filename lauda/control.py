@@ -0,0 +1,166 @@
+# -*- coding :utf-8 -*-
+# lauda/control.py
+'''
+This module provides the state machine of the program control. Start, stop and the switch
+from Program to No Program are requests that return at once; START and STOP are executed by
+the device workers and the acquisition threads are stopped without waiting on the GUI thread.
+Every transition is reported as stateChanged(state):
+
+    idle ──start(True)──> starting ──OK──> program ──stop()──> stopping ──> idle
+      └───start(False)──> monitoring ─────────────stop()─────────┘
+
+A new start is only possible in idle, i.e. after the reply to STOP has arrived and the poll
+threads have finished their last cycle, so a restart can never race the poll loop. Replies to
+a START that was overtaken by stop() or a pressure trip are ignored.
+'''
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+from lauda.devices import FutureWatcher, LAUDA, PRESSURE
+from lauda.polling import STATUS_CHANNELS
+
+IDLE = 'idle'              # keine Erfassung
+STARTING = 'starting'      # Erfassung läuft, Antwort auf START steht aus
+PROGRAM = 'program'        # Programm des Thermostats läuft
+MONITORING = 'monitoring'  # Erfassung ohne Programm (No Program, nach Überdruck)
+STOPPING = 'stopping'      # Antwort auf STOP bzw. Ende der Erfassungsthreads steht aus
+
+
+class ProgramControl(QObject):
+    """Program / No Program start and stop of one thermostat.
+
+    The acquisition source (Acquisition, Replay or RemoteAcquisition) has to emit stopped
+    once its threads have finished. start_args are passed to its start(), e.g. program and
+    tolerance band of the daemon."""
+    stateChanged = pyqtSignal(str)
+    programStarted = pyqtSignal()
+    programStopped = pyqtSignal()
+    commandFailed = pyqtSignal(str, str)  # Befehl, Antwort ('' = keine Antwort)
+
+    def __init__(self, devices, acquisition, parent=None):
+        super().__init__(parent)
+        self.state = IDLE
+        self.program = False  # START gesendet, beim Stoppen ist STOP nötig
+        self.generation = 0  # verwirft Antworten überholter Anfragen
+        self.stop_pending = False
+        self.stopping = None  # Quelle, deren Threads noch laufen
+        self.deferred = None  # start() während stopping, wird in idle ausgeführt
+        self.startWatcher = None
+        self.stopWatcher = None
+        self.sources = []
+        self.setSource(devices, acquisition)
+
+    def setSource(self, devices, acquisition):
+        self.devices = devices
+        self.acquisition = acquisition
+        if acquisition not in self.sources:
+            self.sources.append(acquisition)
+            acquisition.stopped.connect(self.acquisitionStopped)
+
+    def isActive(self):
+        return self.state != IDLE
+
+    def setState(self, state):
+        if state != self.state:
+            self.state = state
+            self.stateChanged.emit(state)
+
+    def watch(self, command, slot):
+        generation = self.generation
+        return FutureWatcher([self.devices.submit(command)], lambda replies: self.replied(generation, slot, replies[0]))
+
+    def replied(self, generation, slot, reply):
+        if generation == self.generation:
+            slot(reply)
+
+    def start(self, program, start_args=()):
+        if self.state == STOPPING:
+            self.deferred = (program, start_args)
+            return
+        if self.state != IDLE:
+            return
+        self.generation += 1
+        self.program = program
+        if program:
+            self.devices.flush_input(LAUDA)
+            self.devices.flush_input(PRESSURE)
+            self.startWatcher = self.watch(b'START\r\n', self.startReplied)
+            self.acquisition.scheduler.invalidate(STATUS_CHANNELS)
+            self.setState(STARTING)
+        else:
+            self.setState(MONITORING)
+        self.acquisition.start(*start_args)
+
+    def startReplied(self, reply):
+        # Nachlaufende Zeichen des Thermostats nach START verwerfen
+        QTimer.singleShot(1000, lambda: self.devices.flush_input(LAUDA))
+        if reply == 'OK':
+            self.setState(PROGRAM)
+            self.programStarted.emit()
+        else:
+            # Die Antwort kann auch nur verloren gegangen sein: STOP wird beim Stoppen trotzdem gesendet
+            self.commandFailed.emit('START', reply)
+            self.setState(MONITORING)
+
+    def abortProgram(self):
+        """Switch to No Program without sending STOP, e.g. after the watchdog has stopped the program."""
+        if self.state in (STARTING, PROGRAM):
+            self.generation += 1
+            self.program = False
+            self.setState(MONITORING)
+
+    def stop(self):
+        self.deferred = None
+        if self.state in (IDLE, STOPPING):
+            return
+        self.generation += 1
+        self.setState(STOPPING)
+        self.acquisition.stop()
+        self.stopping = self.acquisition if self.acquisition.isRunning() else None
+        # STOP überholt die noch wartenden Abfragen der Erfassungsthreads
+        self.stop_pending = self.program and self.devices.is_connected(LAUDA)
+        if self.stop_pending:
+            self.stopWatcher = self.watch(b'STOP\r\n', self.stopReplied)
+        self.finishStop()
+
+    def stopReplied(self, reply):
+        if reply == 'OK':
+            self.devices.flush_input(LAUDA)
+            self.devices.flush_input(PRESSURE)
+            self.programStopped.emit()
+        else:
+            self.commandFailed.emit('STOP', reply)
+        self.acquisition.scheduler.invalidate(STATUS_CHANNELS)
+        self.stop_pending = False
+        self.finishStop()
+
+    def acquisitionStopped(self):
+        if self.stopping is not None and not self.stopping.isRunning():
+            self.stopping = None
+            self.finishStop()
+
+    def finishStop(self):
+        if self.state != STOPPING or self.stop_pending or self.stopping is not None:
+            return
+        self.program = False
+        self.setState(IDLE)
+        if self.deferred is not None:
+            program, start_args = self.deferred
+            self.deferred = None
+            self.start(program, start_args)
+
+    def sync(self, receiving, program=False):
+        """Follow a source that is started and stopped elsewhere (another GUI on the daemon)."""
+        if receiving and self.state == IDLE:
+            self.program = program
+            self.setState(PROGRAM if program else MONITORING)
+        elif not receiving and self.state in (STARTING, PROGRAM, MONITORING):
+            self.reset()
+
+    def reset(self):
+        """Back to idle without sending anything, e.g. when the daemon link is lost."""
+        self.generation += 1
+        self.program = False
+        self.stop_pending = False
+        self.stopping = None
+        self.deferred = None
+        self.setState(IDLE)
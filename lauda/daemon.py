@@ -0,0 +1,420 @@
+# -*- coding :utf-8 -*-
+# lauda/daemon.py
+'''
+This module provides the headless acquisition daemon. It owns the serial links, the
+acquisition workers, the pressure watchdog and the recorder in a process of its own, so a
+run keeps being acquired, guarded and recorded when the GUI hangs or is closed, and the
+poll loop never competes with the plot for the GIL. GUIs attach over a local socket
+(QLocalServer, a named pipe on Windows) with lauda/remote.py.
+
+The protocol is one JSON object per line. The daemon sends
+    {"type": "state", ...}          receiving, filepath, pressure_exceeded, connected devices
+    {"type": "samples", "rows": []} rows of t, Ti, T1, Ts, p, status_sign, Tu, To, Xp, Tn, Tv, flags
+    {"type": "trip", "reason": .., "p": .., ...}  trip of the pressure watchdog
+    {"type": "reply", "id": .., "result": ..}       reply of a submitted command ('' if it failed)
+    {"type": "error", "message": ..}                 a message of the GUI was rejected, the recorder failed
+and accepts {"cmd": "start" | "stop" | "record" | "reset" | "safety" | "submit" | "invalidate" | "state" |
+"shutdown", ...}. The pressure watchdog (lauda/safety.py) runs in the pressure worker of the daemon.
+A newly attached GUI first gets the state and the samples of the last BACKLOG seconds. Messages
+with a wrong type or a missing field are rejected one by one; the daemon keeps serving.
+
+Usage:
+    python lauda_daemon.py --lauda-port COM3 --pressure-port COM4 [--record run.csv --start]
+    python lauda_daemon.py --simulate
+'''
+import argparse
+import collections
+import json
+import os
+import signal
+import sqlite3
+import sys
+import time
+
+import serial
+from PyQt6.QtCore import QCoreApplication, QObject, QTimer, pyqtSignal
+from PyQt6.QtNetwork import QLocalServer
+
+from lauda.acquisition import Acquisition, Sample
+from lauda.catalog import CATALOG_PATH, DEFAULT_TOLERANCE_BAND, RunCatalog, RunSummary
+from lauda.devices import DeviceManager, FutureWatcher, LAUDA, PRESSURE
+from lauda.polling import EMIT_ORDER
+from lauda.recording import RunJournal, recorder_for
+from lauda.safety import PRESSURE_LIMIT, PressureWatchdog
+from lauda.transport import FramedSerial
+
+DEFAULT_SOCKET = 'lauda-acquisition'
+BACKLOG = 600.0  # s, Messwerte, die ein neu verbundenes GUI nachgeliefert bekommt
+ROW_FIELDS = ('t',) + EMIT_ORDER + ('flags',)
+SUBMIT_KINDS = ('query', 'pause', 'flush')
+
+
+def encode(message):
+    return (json.dumps(message) + '\n').encode()
+
+
+def sample_row(sample):
+    return [getattr(sample, name) for name in ROW_FIELDS]
+
+
+def row_sample(row):
+    return Sample(*row)
+
+
+def number(message, key, required=False):
+    """Numeric field of a message, None if it is missing and not required."""
+    value = message.get(key)
+    if value is None and not required:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"'{key}' has to be a number")
+    return value
+
+
+def text(message, key, default=None):
+    value = message.get(key, default)
+    if not isinstance(value, str):
+        raise ValueError(f"'{key}' has to be a string")
+    return value
+
+
+class LineReader:
+    """Splits the byte stream of a QLocalSocket into JSON messages."""
+
+    def __init__(self, socket):
+        self.socket = socket
+        self.rest = b''
+
+    def messages(self):
+        data = self.rest + bytes(self.socket.readAll())
+        *lines, self.rest = data.split(b'\n')
+        for line in lines:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    print(f"Invalid message: {e}")
+
+
+class AcquisitionDaemon(QObject):
+    """Acquisition, pressure watchdog and recorder without a GUI, served over a local socket."""
+    recordingFailed = pyqtSignal(str)  # Fehler des Recorders, aus dessen Thread gesendet
+
+    def __init__(self, devices, socket_name=DEFAULT_SOCKET, pressure_limit=PRESSURE_LIMIT, max_rise=0.0,
+                 batch_interval=0.2, parent=None):
+        super().__init__(parent)
+        self.devices = devices
+        self.socket_name = socket_name
+        self.pressure_exceeded = False
+        self.receiving = False
+        self.filepath = ''
+        self.program = None
+        self.tolerance_band = DEFAULT_TOLERANCE_BAND
+        self.recorder = None
+        self.record_flush_interval = 1.0
+        self.record_fsync_every = 10
+        self.journal = RunJournal()
+        self.catalog_path = CATALOG_PATH
+        self.run_started = None
+        self.backlog = collections.deque()
+        self.clients = {}
+        self.watchers = set()
+
+        self.watchdog = PressureWatchdog(devices, pressure_limit, max_rise)
+        self.acquisition = Acquisition(devices, batch_interval=batch_interval, parent=self, watchdog=self.watchdog)
+        self.acquisition.batchReceived.connect(self.onBatch)
+        self.acquisition.tripped.connect(self.onTrip)
+        self.acquisition.warning.connect(lambda text: print(f"{time.strftime('%H:%M:%S')} {text}"))
+        self.recordingFailed.connect(lambda message: self.broadcast({'type': 'error', 'message': message}))
+        self.server = QLocalServer(self)
+        self.server.newConnection.connect(self.onConnection)
+
+    def listen(self):
+        # Verwaiste Socketdatei eines abgestürzten Daemons entfernen
+        QLocalServer.removeServer(self.socket_name)
+        if not self.server.listen(self.socket_name):
+            raise RuntimeError(f"Cannot listen on {self.socket_name}: {self.server.errorString()}")
+
+    def state(self):
+        return {
+            'type': 'state',
+            'receiving': self.receiving,
+            'program': self.program,
+            'filepath': self.filepath,
+            'pressure_exceeded': self.pressure_exceeded,
+            'pressure_limit': self.watchdog.limit,
+            'max_rise': self.watchdog.max_rise,
+            'rise_window': self.watchdog.rise_window,
+            'connected': {device: self.devices.name(device) if self.devices.is_connected(device) else None
+                          for device in (LAUDA, PRESSURE)},
+            'errors': self.acquisition.errorCounts(),
+        }
+
+    def broadcast(self, message):
+        data = encode(message)
+        for socket in list(self.clients):
+            socket.write(data)
+
+    # Verbindungen der GUIs
+    def onConnection(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            self.clients[socket] = LineReader(socket)
+            socket.readyRead.connect(lambda socket=socket: self.onReadyRead(socket))
+            socket.disconnected.connect(lambda socket=socket: self.onDisconnected(socket))
+            socket.write(encode(self.state()))
+            if self.backlog:
+                socket.write(encode({'type': 'samples', 'rows': list(self.backlog)}))
+
+    def onDisconnected(self, socket):
+        # Das GUI darf jederzeit gehen, die Erfassung läuft weiter
+        self.clients.pop(socket, None)
+        socket.deleteLater()
+
+    def onReadyRead(self, socket):
+        reader = self.clients.get(socket)
+        if reader is None:
+            return
+        for message in reader.messages():
+            # Eine fehlerhafte Nachricht darf den Daemon und damit den Überdruckschutz nicht beenden
+            try:
+                if not isinstance(message, dict):
+                    raise ValueError(f"expected a JSON object, got {type(message).__name__}")
+                self.handle(socket, message)
+            except (KeyError, TypeError, AttributeError, ValueError) as e:
+                self.reject(socket, message, e)
+
+    def reject(self, socket, message, error):
+        report = f"Rejected message {message!r}: {error}"
+        print(f"{time.strftime('%H:%M:%S')} {report}")
+        socket.write(encode({'type': 'error', 'message': report}))
+        # Wartende Anfrage des GUI als fehlgeschlagen beantworten
+        if isinstance(message, dict) and message.get('cmd') == 'submit' and message.get('id') is not None:
+            socket.write(encode({'type': 'reply', 'id': message['id'], 'result': ''}))
+
+    def handle(self, socket, message):
+        command = message.get('cmd')
+        if command == 'start':
+            program = message.get('program')
+            if program is not None and not isinstance(program, str):
+                raise ValueError("'program' has to be a string")
+            tolerance_band = number(message, 'tolerance_band')
+            self.program = program
+            self.tolerance_band = DEFAULT_TOLERANCE_BAND if tolerance_band is None else tolerance_band
+            self.start()
+        elif command == 'stop':
+            self.stop()
+        elif command == 'record':
+            self.record(text(message, 'filepath', ''))
+        elif command == 'reset':
+            self.pressure_exceeded = False
+            self.watchdog.reset()
+            self.broadcast(self.state())
+        elif command == 'safety':
+            # Die Grenzwerte werden im Druck-Erfassungsthread verglichen: nur Zahlen übernehmen
+            self.watchdog.configure(number(message, 'limit'), number(message, 'max_rise'),
+                                    number(message, 'rise_window'))
+            self.broadcast(self.state())
+        elif command == 'invalidate':
+            names = message.get('names')
+            if names is not None and not (isinstance(names, list) and all(isinstance(name, str) for name in names)):
+                raise ValueError("'names' has to be a list of channel names")
+            self.acquisition.scheduler.invalidate(names)
+        elif command == 'submit':
+            self.submit(socket, message)
+        elif command == 'state':
+            socket.write(encode(self.state()))
+        elif command == 'shutdown':
+            QCoreApplication.quit()
+        else:
+            raise ValueError(f"unknown command {command!r}")
+
+    def submit(self, socket, message):
+        # Befehle der GUI-Dialoge gehen durch dieselbe Warteschlange wie die Erfassung
+        # Prüfen, bevor etwas in die Warteschlange der Gerätethreads gelangt
+        kind = message.get('kind', 'query')
+        if kind not in SUBMIT_KINDS:
+            raise ValueError(f"unknown kind {kind!r}")
+        device = message.get('device', LAUDA)
+        if device not in (LAUDA, PRESSURE):
+            raise ValueError(f"unknown device {device!r}")
+        priority = message.get('priority')
+        if isinstance(priority, bool) or not isinstance(priority, int):
+            raise ValueError("'priority' has to be an integer")
+        if kind == 'flush':
+            future = self.devices.flush_input(device, priority)
+        elif kind == 'pause':
+            future = self.devices.pause(number(message, 'seconds', required=True), device, priority)
+        else:
+            future = self.devices.submit(text(message, 'command').encode('latin-1'), device, priority,
+                                         number(message, 'timeout'))
+        request = message.get('id')
+        if request is None:
+            return
+        # Antwort im Thread des Daemons zurückschicken, nicht im Geräte-Thread
+        watcher = FutureWatcher([future], lambda results: self.reply(socket, request, results[0], watcher))
+        self.watchers.add(watcher)
+
+    def reply(self, socket, request, result, watcher):
+        self.watchers.discard(watcher)
+        if socket in self.clients:
+            socket.write(encode({'type': 'reply', 'id': request, 'result': result}))
+
+    # Erfassung, Überdruckschutz und Aufzeichnung
+    def start(self):
+        if not self.receiving:
+            self.receiving = True
+            self.acquisition.start()
+        self.broadcast(self.state())
+
+    def stop(self):
+        if self.receiving:
+            self.receiving = False
+            self.acquisition.stop()
+            self.closeRecording()
+        self.broadcast(self.state())
+
+    def record(self, filepath):
+        if filepath != self.filepath:
+            self.closeRecording()
+            self.filepath = filepath
+        self.broadcast(self.state())
+
+    def onBatch(self, batch):
+        rows = [sample_row(sample) for sample in batch.samples]
+        self.backlog.extend(rows)
+        while self.backlog and self.backlog[-1][0] - self.backlog[0][0] > BACKLOG:
+            self.backlog.popleft()
+
+        if self.filepath != '':
+            self.saveSamples(batch.samples)
+        self.broadcast({'type': 'samples', 'rows': rows})
+
+    def onTrip(self, trip):
+        # STOP und OUT_30 hat der Watchdog im Druck-Erfassungsthread bereits gesendet; die Erfassung läuft weiter
+        self.pressure_exceeded = True
+        self.acquisition.scheduler.invalidate()
+        print(f"{time.strftime('%H:%M:%S')} {trip.describe()}: program stopped, Ts set to 30 °C "
+              f"(detected after {trip.detect_ms:.1f} ms)")
+        self.broadcast({'type': 'trip', 'reason': trip.reason, 'p': trip.p, 'rise': trip.rise, 't': trip.t,
+                        'limit': trip.limit, 'max_rise': trip.max_rise, 'received': trip.received,
+                        'queued': trip.queued})
+        self.broadcast(self.state())
+
+    def saveSamples(self, samples):
+        if self.recorder is None:
+            if self.run_started is None:
+                self.run_started = time.time()
+            try:
+                self.journal.begin(self.filepath, started=self.run_started, program=self.program is not None)
+            except OSError as e:
+                print(f"Error writing run journal: {e}")
+            self.recorder = recorder_for(self.filepath, self.record_flush_interval, self.record_fsync_every,
+                                         self.runSummary(), self.catalog_path, self.recordingFailed.emit)
+        self.recorder.write(samples)
+
+    def runSummary(self):
+        try:
+            catalog = RunCatalog(self.catalog_path)
+            row = catalog.get(self.filepath)
+            catalog.close()
+        except (OSError, sqlite3.Error) as e:
+            print(f"Error reading run catalog: {e}")
+            row = None
+        if row is not None and os.path.exists(self.filepath):
+            return RunSummary.from_row(row)
+        return RunSummary(self.filepath, self.program or "No Program", self.tolerance_band)
+
+    def closeRecording(self, timeout=None):
+        if self.recorder is not None:
+            self.recorder.close()
+            if timeout is not None:
+                self.recorder.join(timeout)
+            self.recorder = None
+            self.journal.finish()
+            self.run_started = None
+
+    def resume(self):
+        """Continue the recording of an interrupted run (journal of the daemon or the GUI)."""
+        info = self.journal.pending()
+        if info is not None:
+            self.filepath = info['filepath']
+            self.run_started = info['started']
+            print(f"Resuming {self.filepath}")
+        return info
+
+    def shutdown(self):
+        self.acquisition.stop()
+        self.receiving = False
+        self.closeRecording(timeout=5.0)
+        self.server.close()
+
+
+def open_devices(args):
+    devices = DeviceManager()
+    if args.simulate:
+        from lauda.simulator import simulated_ports
+        lauda_port, pressure_port, _ = simulated_ports()
+        devices.attach(LAUDA, FramedSerial(lauda_port))
+        devices.attach(PRESSURE, FramedSerial(pressure_port, encoding='ISO-8859-1'))
+        return devices
+    # Gleiche Schnittstellenparameter wie SerialPortGui
+    port = serial.Serial(args.lauda_port, baudrate=args.lauda_baudrate, bytesize=8, parity=serial.PARITY_NONE,
+                         stopbits=2, timeout=1)
+    devices.attach(LAUDA, FramedSerial(port))
+    if args.pressure_port:
+        port = serial.Serial(args.pressure_port, baudrate=args.pressure_baudrate, timeout=1)
+        devices.attach(PRESSURE, FramedSerial(port, encoding='ISO-8859-1'))
+    return devices
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless LAUDA acquisition daemon")
+    parser.add_argument('--lauda-port', default='COM3')
+    parser.add_argument('--lauda-baudrate', type=int, default=9600)
+    parser.add_argument('--pressure-port', default='COM4', help="empty = no pressure transducer")
+    parser.add_argument('--pressure-baudrate', type=int, default=9600)
+    parser.add_argument('--simulate', action='store_true', help="use the simulated devices")
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, help="name of the local socket")
+    parser.add_argument('--pressure-limit', type=float, default=PRESSURE_LIMIT, help="trip pressure [bar]")
+    parser.add_argument('--max-rise', type=float, default=0.0, help="trip pressure rise [bar/min], 0 = off")
+    parser.add_argument('--record', default='', help="record to this file (CSV or *.lrun)")
+    parser.add_argument('--resume', action='store_true', help="continue an interrupted recording")
+    parser.add_argument('--start', action='store_true', help="start acquiring immediately")
+    args = parser.parse_args(argv)
+
+    app = QCoreApplication(sys.argv[:1])
+    try:
+        devices = open_devices(args)
+    except serial.SerialException as e:
+        print(f"Cannot open serial port: {e}")
+        return 1
+    daemon = AcquisitionDaemon(devices, args.socket, args.pressure_limit, args.max_rise)
+    try:
+        daemon.listen()
+    except RuntimeError as e:
+        print(e)
+        devices.disconnect()
+        return 1
+    if args.resume:
+        daemon.resume()
+    if args.record:
+        daemon.record(args.record)
+    if args.start:
+        daemon.start()
+
+    # Ctrl+C beendet sauber; der Timer gibt Python Gelegenheit, das Signal zu behandeln
+    signal.signal(signal.SIGINT, lambda *_: app.quit())
+    signal.signal(signal.SIGTERM, lambda *_: app.quit())
+    timer = QTimer()
+    timer.timeout.connect(lambda: None)
+    timer.start(200)
+    print(f"Acquisition daemon listening on {daemon.server.fullServerName()}")
+    app.exec()
+    daemon.shutdown()
+    devices.disconnect()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,178 @@
+# -*- coding :utf-8 -*-
+# lauda/devices.py
+'''
+This module provides the device manager that owns the serial links to the LAUDA thermostat
+and the pressure transducer. Every access goes through a priority command queue that is
+served by one worker thread per device, so replies can no longer end up with the wrong caller,
+safety commands overtake routine polls and callers get futures instead of blocking on readline.
+'''
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+# Prioritäten der Befehlswarteschlange (kleiner = wichtiger)
+PRIORITY_SAFETY = 0   # z.B. OUT_30 bei Überdruck
+PRIORITY_CONTROL = 1  # Benutzerbefehle: OUT_, SEG_, START, STOP
+PRIORITY_POLL = 2     # Routineabfragen der Erfassungsthreads
+
+LAUDA = 'lauda'
+PRESSURE = 'pressure'
+
+
+class _Job:
+    def __init__(self, kind, payload, timeout, future):
+        self.kind = kind  # 'query', 'many', 'flush' oder 'pause'
+        self.payload = payload
+        self.timeout = timeout
+        self.future = future
+
+
+class _DeviceWorker(threading.Thread):
+    """Serves the command queue of one device."""
+
+    def __init__(self, link, name):
+        super().__init__(name=f"{name}-worker", daemon=True)
+        self.link = link
+        self.queue = queue.PriorityQueue()
+        self.counter = itertools.count()  # FIFO innerhalb gleicher Priorität
+
+    def put(self, priority, job):
+        self.queue.put((priority, next(self.counter), job))
+
+    def shutdown(self):
+        self.queue.put((-1, next(self.counter), None))
+
+    def run(self):
+        while True:
+            _, _, job = self.queue.get()
+            if job is None:
+                break
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            try:
+                if job.kind == 'query':
+                    result = self.link.query(job.payload, job.timeout)
+                elif job.kind == 'many':
+                    result = self.link.query_many(job.payload, job.timeout)
+                elif job.kind == 'pause':
+                    result = time.sleep(job.payload)
+                else:
+                    result = self.link.flush_input()
+            except Exception as e:
+                job.future.set_exception(e)
+            else:
+                job.future.set_result(result)
+
+        # Noch wartende Aufträge abbrechen, damit kein Aufrufer hängen bleibt
+        while not self.queue.empty():
+            _, _, job = self.queue.get()
+            if job is not None:
+                job.future.cancel()
+
+
+class DeviceManager:
+    """Owns the LAUDA and pressure links and serializes all access to them."""
+
+    def __init__(self):
+        self.links = {}
+        self.workers = {}
+        self.lock = threading.Lock()
+
+    def attach(self, device, link):
+        """Take ownership of an open FramedSerial link for 'lauda' or 'pressure'."""
+        with self.lock:
+            if device in self.links:
+                raise RuntimeError(f"{device} already connected: {self.links[device].name}")
+            worker = _DeviceWorker(link, device)
+            self.links[device] = link
+            self.workers[device] = worker
+            worker.start()
+
+    def detach(self, device):
+        with self.lock:
+            link = self.links.pop(device, None)
+            worker = self.workers.pop(device, None)
+        if worker:
+            worker.shutdown()
+            worker.join()
+        if link:
+            link.close()
+        return link is not None
+
+    def disconnect(self):
+        return [device for device in (LAUDA, PRESSURE) if self.detach(device)]
+
+    def is_connected(self, device=LAUDA):
+        link = self.links.get(device)
+        return link is not None and link.is_open
+
+    def name(self, device=LAUDA):
+        return self.links[device].name
+
+    def _submit(self, device, kind, payload, priority, timeout, callback):
+        future = Future()
+        if callback:
+            future.add_done_callback(callback)
+        worker = self.workers.get(device)
+        if worker is None:
+            future.set_exception(ConnectionError(f"{device} not connected"))
+            return future
+        worker.put(priority, _Job(kind, payload, timeout, future))
+        return future
+
+    def submit(self, command, device=LAUDA, priority=PRIORITY_CONTROL, timeout=None, callback=None):
+        """Queue a command; the returned future resolves to the decoded reply ('' on timeout)."""
+        return self._submit(device, 'query', command, priority, timeout, callback)
+
+    def submit_many(self, commands, device=LAUDA, priority=PRIORITY_POLL, timeout=None, callback=None):
+        """Queue a pipelined burst; the future resolves to the list of replies or None."""
+        return self._submit(device, 'many', list(commands), priority, timeout, callback)
+
+    def flush_input(self, device=LAUDA, priority=PRIORITY_CONTROL):
+        return self._submit(device, 'flush', None, priority, None, None)
+
+    def pause(self, seconds, device=LAUDA, priority=PRIORITY_CONTROL):
+        """Queue a pause, e.g. to give the thermostat time to store a program segment."""
+        return self._submit(device, 'pause', seconds, priority, None, None)
+
+    def query(self, command, device=LAUDA, priority=PRIORITY_POLL, timeout=None):
+        """Blocking variant of submit() for the acquisition threads (never the GUI thread)."""
+        return self.submit(command, device, priority, timeout).result()
+
+    def query_many(self, commands, device=LAUDA, priority=PRIORITY_POLL, timeout=None):
+        return self.submit_many(commands, device, priority, timeout).result()
+
+
+class FutureWatcher(QObject):
+    """Delivers the results of one or more futures to the GUI thread as a Qt signal.
+
+    finished carries the list of results in submission order; failed futures contribute
+    an empty reply so dialogs can treat them like a missing 'OK'."""
+    finished = pyqtSignal(list)
+
+    def __init__(self, futures, slot, parent=None):
+        super().__init__(parent)
+        self.futures = list(futures)
+        self.pending = len(self.futures)
+        self.lock = threading.Lock()
+        # Vor dem Registrieren verbinden: bereits erledigte Futures melden sich sofort
+        self.finished.connect(slot)
+        for future in self.futures:
+            future.add_done_callback(self.done)
+
+    def done(self, future):
+        with self.lock:
+            self.pending -= 1
+            if self.pending:
+                return
+        self.finished.emit([self.result(future) for future in self.futures])
+
+    @staticmethod
+    def result(future):
+        if future.cancelled() or future.exception() is not None:
+            return ''
+        return future.result()
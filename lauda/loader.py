@@ -0,0 +1,155 @@
+# -*- coding :utf-8 -*-
+# lauda/loader.py
+'''
+This module provides the loader that reopens recorded runs for the viewer mode of MainWindow.
+CSV files in the layout of CsvLogger are parsed in chunks of whole lines entirely in NumPy:
+the fixed-width timestamps are converted with datetime64, the values with one numpy.fromstring
+call per chunk, so no Python object is created per row. Binary run files (*.lrun) are copied
+out of their memmap chunk by chunk. Both yield the same columns as the live ring buffer.
+The module does not import Qt, it also runs in the worker processes of the catalog indexer;
+MainWindow loads in the background with views.RunLoader.
+'''
+import csv
+import os
+import time
+
+import numpy as np
+
+from lauda.polling import FLAG_BITS
+from lauda.recording import CHANNELS, CSV_CHANNELS, RUN_SUFFIX, open_run
+
+CHUNK_BYTES = 1 << 22  # 4 MiB je CSV-Block
+CHUNK_ROWS = 1 << 18   # Datensätze je Block einer *.lrun-Datei
+STAMP = 19             # Länge von "YYYY-MM-DD HH:MM:SS"
+
+
+class LoadCancelled(Exception):
+    pass
+
+
+def _local_to_epoch(naive):
+    """Seconds since the epoch of local wall times given as seconds of a naive (UTC) clock."""
+    hours, index = np.unique(naive // 3600, return_inverse=True)
+    # Versatz zur Ortszeit je Stunde, nicht je Zeile; tm_isdst=-1: Sommerzeit nach dem Datum bestimmen
+    offsets = np.array([hour * 3600 - time.mktime(time.gmtime(hour * 3600)[:8] + (-1,))
+                        for hour in hours.tolist()])
+    return naive - offsets[index]
+
+
+def _parse_slow(lines):
+    """Row-by-row fallback for chunks that do not have the regular layout (e.g. a header line)."""
+    t = []
+    values = []
+    for row in csv.reader(line.decode('utf-8', errors='replace') for line in lines):
+        if len(row) != 1 + len(CSV_CHANNELS):
+            continue
+        try:
+            stamp = time.mktime(time.strptime(row[0], "%Y-%m-%d %H:%M:%S"))
+            values.append([float(text) if text else np.nan for text in row[1:]])
+        except ValueError:
+            continue
+        t.append(stamp)
+    return np.array(t, dtype=np.float64), np.array(values, dtype=np.float64).reshape(-1, len(CSV_CHANNELS))
+
+
+def parse_csv_chunk(data):
+    """Timestamps and an (n, 4) array of Ti, T1, Ts, p of a block of complete CSV lines."""
+    data = data.replace(b'\r\n', b'\n')
+    if not data.endswith(b'\n'):
+        data += b'\n'
+    # Leere Felder (nicht frische Werte) als nan einsetzen
+    while b',,' in data:
+        data = data.replace(b',,', b',nan,')
+    data = data.replace(b',\n', b',nan\n')
+
+    text = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero(text == ord('\n'))
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    keep = ends - starts > STAMP  # Leerzeilen überspringen
+    starts, ends = starts[keep], ends[keep]
+    n = len(starts)
+    if n == 0:
+        return np.empty(0), np.empty((0, len(CSV_CHANNELS)))
+
+    stamps = text[starts[:, None] + np.arange(STAMP)]
+    try:
+        naive = stamps.copy().view(f'S{STAMP}').ravel().astype('datetime64[s]').astype(np.float64)
+    except ValueError:
+        return _parse_slow(data.splitlines())
+
+    # Zeitstempel ausblenden, Zeilenenden werden zu Trennzeichen
+    numbers = text.copy()
+    numbers[(starts[:, None] + np.arange(STAMP + 1)).ravel()] = ord(' ')
+    numbers[ends] = ord(',')
+    values = np.fromstring(numbers.tobytes(), dtype=np.float64, sep=',')
+    if len(values) != n * len(CSV_CHANNELS):
+        return _parse_slow(data.splitlines())
+    return _local_to_epoch(naive), values.reshape(n, len(CSV_CHANNELS))
+
+
+def load_csv(filepath, progress=None, cancelled=None, chunk_bytes=CHUNK_BYTES):
+    """Columns t, Ti, T1, Ts, p of a CSV recording; empty cells are NaN."""
+    total = os.path.getsize(filepath)
+    times = []
+    blocks = []
+    rest = b''
+    done = 0
+    with open(filepath, 'rb') as file:
+        while True:
+            if cancelled is not None and cancelled():
+                raise LoadCancelled(filepath)
+            chunk = file.read(chunk_bytes)
+            done += len(chunk)
+            data = rest + chunk
+            if chunk:
+                # Nur vollständige Zeilen verarbeiten, den Rest mit dem nächsten Block
+                cut = data.rfind(b'\n') + 1
+                data, rest = data[:cut], data[cut:]
+            if data:
+                t, values = parse_csv_chunk(data)
+                times.append(t)
+                blocks.append(values)
+            if progress is not None:
+                progress(done, total)
+            if not chunk:
+                break
+
+    values = np.concatenate(blocks) if blocks else np.empty((0, len(CSV_CHANNELS)))
+    columns = {'t': np.concatenate(times) if times else np.empty(0)}
+    for i, name in enumerate(CSV_CHANNELS):
+        columns[name] = np.ascontiguousarray(values[:, i])
+    return columns
+
+
+def load_binary(filepath, progress=None, cancelled=None, chunk_rows=CHUNK_ROWS):
+    """Columns t, Ti, T1, Ts, p, Tu, To, Xp, Tn, Tv of a run file; values that were not fresh are NaN."""
+    _, records = open_run(filepath)
+    total = len(records)
+    columns = {'t': np.empty(total)}
+    for name in CHANNELS:
+        columns[name] = np.empty(total)
+    for start in range(0, total, chunk_rows):
+        if cancelled is not None and cancelled():
+            raise LoadCancelled(filepath)
+        chunk = records[start:start + chunk_rows]
+        part = slice(start, start + len(chunk))
+        columns['t'][part] = chunk['t']
+        for name in CHANNELS:
+            column = columns[name][part]
+            column[:] = chunk[name]
+            column[(chunk['flags'] & FLAG_BITS[name]) != 0] = np.nan
+        if progress is not None:
+            progress(part.stop, total)
+    del records
+    return columns
+
+
+def load_run(filepath, progress=None, cancelled=None):
+    """Columns of a recorded run, CSV or *.lrun depending on the file name.
+
+    progress(done, total) is called after every chunk; if cancelled() returns True the
+    loading stops with LoadCancelled."""
+    if filepath.lower().endswith(RUN_SUFFIX):
+        return load_binary(filepath, progress, cancelled)
+    return load_csv(filepath, progress, cancelled)
+
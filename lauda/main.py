@@ -2,12 +2,24 @@
 # lauda/main.py
 '''This module provides LAUDA Thermostat application.'''
 
+import argparse
 import sys
 from PyQt6.QtWidgets import QApplication
 import lauda.views
 
 def main():
     """Project main function"""
+    parser = argparse.ArgumentParser(description="LAUDA Thermostat")
+    parser.add_argument('--simulate', action='store_true', help="use the simulated devices instead of COM3/COM4")
+    parser.add_argument('--replay', metavar='FILE', help="replay a recorded run (CSV or *.lrun) instead of acquiring")
+    parser.add_argument('--speed', type=float, default=1.0, help="replay speed, multiple of real time (0 = as fast as possible)")
+    parser.add_argument('--attach', nargs='?', const='lauda-acquisition', metavar='SOCKET',
+                        help="attach to the acquisition daemon (lauda_daemon.py) instead of the serial ports")
+    parser.add_argument('--reactors', type=int, default=0, metavar='N',
+                        help="manage N reactors in one window (tabs or tiles), each with its own devices")
+    # Übrige Argumente gehen an Qt
+    args, _ = parser.parse_known_args()
+
     # Create the application
     app = QApplication(sys.argv)
     app.setStyle('Fusion')
@@ -16,8 +28,33 @@ def main():
     splash_screen = lauda.views.SplashScreen()
     splash_screen.exec()
 
+    if args.reactors:
+        # Mehrere Reaktoren: die seriellen Ports verbindet jeder Reaktor in seinem Settings-Menü
+        reactorsWindow = lauda.views.ReactorsWindow()
+        for i in range(args.reactors):
+            reactorsWindow.addReactor(f"Reactor {i + 1}", simulated=args.simulate)
+        reactorsWindow.show()
+        # Checkliste für jeden Reaktor, danach dessen serielle Ports
+        checklists = []
+        for reactor in reversed(reactorsWindow.reactors):
+            checklist = lauda.views.ChecklistWindow(reactor, app)
+            checklist.show()
+            checklists.append(checklist)
+        sys.exit(app.exec())
+
     mainWindow = lauda.views.MainWindow()
+    if args.simulate:
+        # Simulierte Geräte statt COM3/COM4 (siehe lauda/simulator.py)
+        lauda.views.attach_simulator(mainWindow.devices)
     mainWindow.show()
+    if args.attach:
+        # Erfassung, Überdruckschutz und Aufzeichnung laufen im Daemon weiter, auch wenn das GUI beendet wird
+        mainWindow.attachDaemon(args.attach)
+    else:
+        # Nach einem Absturz den unterbrochenen Lauf zur Fortsetzung anbieten
+        mainWindow.offerResume()
+    if args.replay:
+        mainWindow.replayRun(args.replay, args.speed)
     # Create and show the checklist window (assuming modality is not required)
     checklist = lauda.views.ChecklistWindow(mainWindow, app)
     checklist.show()
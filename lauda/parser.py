@@ -0,0 +1,103 @@
+# -*- coding :utf-8 -*-
+# lauda/parser.py
+'''
+This module provides the table-driven response parser of the acquisition loop. One ChannelSpec
+per channel describes the command, the type, the valid range and the unit. CycleParser parses all
+replies of a poll pass in one go without exceptions in the hot loop, marks every value as fresh,
+stale or invalid and counts the errors per channel, so plotting and logging know which values
+are real and which were carried over from an earlier cycle.
+'''
+import re
+
+FRESH = 'fresh'      # in diesem Durchlauf gültig gelesen
+STALE = 'stale'      # letzter gültiger Wert ist zu alt oder die letzte Abfrage schlug fehl
+INVALID = 'invalid'  # Antwort in diesem Durchlauf unbrauchbar (leer, kein Zahlwert, außerhalb des Bereichs)
+
+NUMBER = re.compile(r'\s*[+-]?(\d+\.?\d*|\.\d+)\s*$')
+STATUS = re.compile(r'\s*[0-9]{7}\s*$')
+
+
+class ChannelSpec:
+    """Command, type, valid range and unit of one channel."""
+
+    def __init__(self, name, command, kind='float', low=None, high=None, unit='', device='lauda'):
+        self.name = name
+        self.command = command
+        self.kind = kind  # 'float' oder 'status'
+        self.low = low
+        self.high = high
+        self.unit = unit
+        self.device = device
+
+    def parse(self, reply):
+        """Return the parsed value, or None if the reply is not valid for this channel."""
+        if self.kind == 'status':
+            return reply.strip() if STATUS.match(reply) else None
+        if not NUMBER.match(reply):
+            return None
+        value = float(reply)
+        if (self.low is not None and value < self.low) or (self.high is not None and value > self.high):
+            return None
+        return value
+
+    def __repr__(self):
+        return f"ChannelSpec({self.name!r}, {self.command!r}, {self.kind!r}, {self.low}..{self.high} {self.unit})"
+
+
+CHANNEL_SPECS = (
+    ChannelSpec('Ti', b'IN_1\r\n', 'float', -50.0, 400.0, '°C'),
+    ChannelSpec('T1', b'IN_2\r\n', 'float', -50.0, 400.0, '°C'),
+    ChannelSpec('Ts', b'IN_3\r\n', 'float', -50.0, 400.0, '°C'),
+    ChannelSpec('p', b'P', 'float', -1.0, 400.0, 'bar', device='pressure'),
+    ChannelSpec('status_sign', b'IN_4\r\n', 'status'),
+    ChannelSpec('Tu', b'IN_8\r\n', 'float', -50.0, 400.0, '°C'),
+    ChannelSpec('To', b'IN_9\r\n', 'float', -50.0, 400.0, '°C'),
+    ChannelSpec('Xp', b'IN_A\r\n', 'float', 0.0, 100.0, 'K'),
+    ChannelSpec('Tn', b'IN_B\r\n', 'float', 0.0, 999.0, 's'),
+    ChannelSpec('Tv', b'IN_C\r\n', 'float', 0.0, 999.0, 's'),
+)
+
+SPECS = {spec.name: spec for spec in CHANNEL_SPECS}
+
+
+class CycleParser:
+    """Parses the replies of one poll pass and keeps value, state and error count per channel.
+
+    max_age maps a channel name to the number of seconds after which its last valid value
+    is reported as stale even if it was not polled again."""
+
+    def __init__(self, names, max_age=None):
+        self.specs = [SPECS[name] for name in names]
+        self.max_age = max_age or {}
+        self.values = {}
+        self.states = {}
+        self.last_valid = {}
+        self.errors = dict.fromkeys(names, 0)
+
+    def reset(self):
+        self.values = {}
+        self.states = {}
+        self.last_valid = {}
+
+    def parse(self, names, replies, now):
+        """Parse the replies of the polled channels; returns the names read successfully."""
+        fresh = set()
+        for name, reply in zip(names, replies):
+            value = SPECS[name].parse(reply)
+            if value is None:
+                self.errors[name] += 1
+                self.states[name] = INVALID
+            else:
+                self.values[name] = value
+                self.states[name] = FRESH
+                self.last_valid[name] = now
+                fresh.add(name)
+
+        for name, state in self.states.items():
+            if name in fresh or (state == INVALID and name in names):
+                continue
+            last = self.last_valid.get(name)
+            too_old = last is not None and now - last > self.max_age.get(name, float('inf'))
+            if state == INVALID or too_old:
+                self.states[name] = STALE
+        return fresh
@@ -0,0 +1,98 @@
+# -*- coding :utf-8 -*-
+# lauda/polling.py
+'''
+This module provides the polling scheduler of the acquisition loop. Every channel of the
+LAUDA thermostat and the pressure transducer has its own poll period, so the rarely changing
+controller parameters no longer slow down the readings of Ti, T1 and p.
+'''
+import time
+
+from lauda.parser import CHANNEL_SPECS
+
+# Poll periods in seconds (0 = every cycle)
+FAST = 0.0
+STATUS_PERIOD = 5.0
+PARAMETER_PERIOD = 60.0
+
+
+class PollChannel:
+    """One value read from a device with its own poll period."""
+
+    def __init__(self, name, command, period, device='lauda'):
+        self.name = name
+        self.command = command
+        self.period = period
+        self.device = device
+
+    def __repr__(self):
+        return f"PollChannel({self.name!r}, {self.command!r}, period={self.period})"
+
+
+POLL_PERIODS = {
+    'Ti': FAST,
+    'T1': FAST,
+    'Ts': FAST,
+    'p': FAST,
+    'status_sign': STATUS_PERIOD,
+    'Tu': PARAMETER_PERIOD,
+    'To': PARAMETER_PERIOD,
+    'Xp': PARAMETER_PERIOD,
+    'Tn': PARAMETER_PERIOD,
+    'Tv': PARAMETER_PERIOD,
+}
+
+# Befehle und Geräte stammen aus der Kanaltabelle in lauda/parser.py
+DEFAULT_CHANNELS = tuple(PollChannel(spec.name, spec.command, POLL_PERIODS[spec.name], spec.device)
+                         for spec in CHANNEL_SPECS)
+
+
+def channels_for(device, channels=DEFAULT_CHANNELS):
+    """Return the channels served by one device ('lauda' or 'pressure')."""
+    return tuple(channel for channel in channels if channel.device == device)
+
+
+# Reihenfolge der Werte im dataReceived-Signal
+EMIT_ORDER = ('Ti', 'T1', 'Ts', 'p', 'status_sign', 'Tu', 'To', 'Xp', 'Tn', 'Tv')
+# Bit je nicht frischem Kanal in Sample.flags und im Datensatz einer *.lrun-Datei
+FLAG_BITS = {name: 1 << i for i, name in enumerate(EMIT_ORDER)}
+FAST_CHANNELS = ('Ti', 'T1', 'Ts', 'p')
+LAUDA_FAST_CHANNELS = ('Ti', 'T1', 'Ts')
+STATUS_CHANNELS = ('status_sign',)
+PARAMETER_CHANNELS = ('Tu', 'To', 'Xp', 'Tn', 'Tv')
+
+
+class PollScheduler:
+    """Decides which channels are due in the current poll cycle."""
+
+    def __init__(self, channels=DEFAULT_CHANNELS):
+        # Eigene Kopien, damit set_period die Standardtabelle nicht verändert
+        self.channels = tuple(PollChannel(c.name, c.command, c.period, c.device) for c in channels)
+        self.by_name = {channel.name: channel for channel in self.channels}
+        self.last_polled = {}
+        self.reset()
+
+    def reset(self):
+        # Beim Start werden alle Kanäle einmal abgefragt
+        self.last_polled = dict.fromkeys(self.by_name)
+
+    def set_period(self, name, period):
+        self.by_name[name].period = period
+
+    def invalidate(self, names=None):
+        """Force the given channels (default: all) to be polled in the next cycle,
+        e.g. after a write to the device changed them."""
+        for name in (self.by_name if names is None else names):
+            self.last_polled[name] = None
+
+    def due(self, now=None):
+        if now is None:
+            now = time.monotonic()
+        due = []
+        for channel in self.channels:
+            last = self.last_polled[channel.name]
+            if last is None or now - last >= channel.period:
+                due.append(channel)
+        return due
+
+    def mark_polled(self, name, now=None):
+        self.last_polled[name] = time.monotonic() if now is None else now
@@ -0,0 +1,464 @@
+# -*- coding :utf-8 -*-
+# lauda/recording.py
+'''
+This module provides the recording of the measured values. The recorders are worker threads
+that keep their file open, write the samples of whole blocks at once and flush and fsync the file
+by a configurable policy. The GUI thread only hands the samples over a queue and is never
+blocked by file I/O.
+
+    - CsvLogger writes the row format of the former MainWindow.saveCSV:
+
+          2024-05-03 14:12:07,25.3,24.1,30.0,1.013
+
+    - BinaryRecorder writes the compact run format (*.lrun): a 64-byte header followed by
+      fixed-size little-endian records (RECORD), appended in chunks of whole records. The
+      records hold the float64 timestamp, all channels as float32 including the controller
+      parameters, the packed IN_4 status and the freshness flags of the sample. open_run()
+      maps a run file with numpy.memmap without reading it, export_csv() streams it into the
+      CSV layout above.
+
+    - RunJournal marks a recording as active before the first sample is written and as
+      finished when it is closed cleanly. A journal that is still active on the next start
+      means the run was interrupted (crash, power loss); read_tail() then reads only the end
+      of the recording (seek from the end of the file) to refill the live buffers, and the
+      recorders continue appending to the same file after cutting off a torn last record
+      or line.
+
+Usage:
+    python -m lauda.recording export run.lrun run.csv
+'''
+import argparse
+import csv
+import json
+import os
+import queue
+import sqlite3
+import struct
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from lauda.polling import FLAG_BITS
+
+_CLOSE = object()
+
+RUN_SUFFIX = '.lrun'
+JOURNAL_PATH = os.path.join(os.path.expanduser('~'), '.lauda', 'active_run.json')
+TAIL_BLOCK = 65536  # Blockgröße beim Rückwärtslesen einer CSV-Datei
+MAGIC = b'LAUDARUN'
+VERSION = 1
+HEADER = struct.Struct('<8sIIId36x')  # Kennung, Version, Headergröße, Datensatzgröße, Startzeit
+HEADER_SIZE = HEADER.size
+
+RECORD = np.dtype([('t', '<f8'),
+                   ('Ti', '<f4'), ('T1', '<f4'), ('Ts', '<f4'), ('p', '<f4'),
+                   ('Tu', '<f4'), ('To', '<f4'), ('Xp', '<f4'), ('Tn', '<f4'), ('Tv', '<f4'),
+                   ('status', '<u2'),  # Stellen 0-2 und 4-6 des Statusworts als Bits, Stelle 3 in Bit 8-11
+                   ('flags', '<u2')])  # Sample.flags: ein Bit je nicht frischem Kanal
+CHANNELS = ('Ti', 'T1', 'Ts', 'p', 'Tu', 'To', 'Xp', 'Tn', 'Tv')
+CSV_CHANNELS = ('Ti', 'T1', 'Ts', 'p')
+
+_STATUS_BITS = (0, 1, 2, 4, 5, 6)
+_packed = {}
+
+
+def journal_path(name=None):
+    """Journal file of one reactor; several reactors in one application need one each."""
+    if not name:
+        return JOURNAL_PATH
+    slug = ''.join(char if char.isalnum() else '_' for char in name)
+    return os.path.join(os.path.dirname(JOURNAL_PATH), f'active_run_{slug}.json')
+
+
+def pack_status(status_sign):
+    """Pack a 7-character IN_4 status word into 16 bits (cached per status word).
+
+    None (no status yet, invalid reply) is packed as 0."""
+    if not isinstance(status_sign, str):
+        return 0
+    bits = _packed.get(status_sign)
+    if bits is None:
+        bits = 0
+        if len(status_sign) == 7 and status_sign.isdigit():
+            for position in _STATUS_BITS:
+                if status_sign[position] != '0':
+                    bits |= 1 << position
+            bits |= int(status_sign[3]) << 8
+        _packed[status_sign] = bits
+    return bits
+
+
+def unpack_status(bits):
+    """The 7-character IN_4 status word of packed status bits."""
+    bits = int(bits)
+    digits = ['1' if bits & (1 << position) else '0' for position in range(7)]
+    digits[3] = str((bits >> 8) & 0xF)
+    return ''.join(digits)
+
+
+def format_time(t):
+    return datetime.fromtimestamp(t).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def format_value(value):
+    """Text of a float32 channel value as Python writes the float it was parsed from ('30.0', '1.013')."""
+    text = '%.7g' % value
+    if text.lstrip('-').isdigit():
+        text += '.0'
+    return text
+
+
+def csv_row(sample, stamp=None):
+    """One CSV row of a sample; values that are not fresh stay empty."""
+    return [stamp or format_time(sample.t),
+            sample.Ti if sample.fresh('Ti') else '',
+            sample.T1 if sample.fresh('T1') else '',
+            sample.Ts if sample.fresh('Ts') else '',
+            sample.p if sample.fresh('p') else '']
+
+
+def to_records(samples):
+    """Structured RECORD array of a list of samples."""
+    return np.array([(s.t, s.Ti, s.T1, s.Ts, s.p, s.Tu, s.To, s.Xp, s.Tn, s.Tv, pack_status(s.status_sign), s.flags)
+                     for s in samples], dtype=RECORD)
+
+
+def read_header(file):
+    magic, version, header_size, record_size, started = HEADER.unpack(file.read(HEADER_SIZE))
+    if magic != MAGIC or version != VERSION or record_size != RECORD.itemsize:
+        raise ValueError(f"{getattr(file, 'name', 'file')} is not a LAUDA run file (version {VERSION})")
+    return {'version': version, 'header_size': header_size, 'record_size': record_size, 'started': started}
+
+
+def open_run(filepath):
+    """Header and records of a run file; the records are a read-only numpy.memmap.
+
+    A partly written record at the end (e.g. after a crash) is not part of the result."""
+    with open(filepath, 'rb') as file:
+        header = read_header(file)
+    count = (os.path.getsize(filepath) - header['header_size']) // RECORD.itemsize
+    if count <= 0:
+        return header, np.empty(0, dtype=RECORD)
+    return header, np.memmap(filepath, dtype=RECORD, mode='r', offset=header['header_size'], shape=(count,))
+
+
+def export_csv(source, target, chunk_rows=65536, progress=None):
+    """Stream a run file into the CSV layout of CsvLogger, chunk by chunk.
+
+    progress(done, total) is called after every chunk. Returns the number of rows."""
+    bits = [FLAG_BITS[name] for name in CSV_CHANNELS]
+    _, records = open_run(source)
+    total = len(records)
+    with open(target, 'w', newline='') as file:
+        for start in range(0, total, chunk_rows):
+            chunk = records[start:start + chunk_rows]
+            # Zeitstempel je Sekunde nur einmal formatieren
+            seconds, index = np.unique(chunk['t'].astype(np.int64), return_inverse=True)
+            stamps = [format_time(second) for second in seconds.tolist()]
+            values = np.column_stack([chunk[name] for name in CSV_CHANNELS]).astype(np.float64).tolist()
+            lines = []
+            for i, flags, row in zip(index.tolist(), chunk['flags'].tolist(), values):
+                # Nicht frische Werte bleiben leer
+                cells = [format_value(value) if not flags & bit else '' for value, bit in zip(row, bits)]
+                lines.append(stamps[i] + ',' + ','.join(cells) + '\r\n')
+            file.write(''.join(lines))
+            if progress is not None:
+                progress(min(start + chunk_rows, total), total)
+    return total
+
+
+class _Recorder(threading.Thread):
+    """Writes queued sample blocks to a file in the background.
+
+    The file is flushed every flush_interval seconds while data arrives and fsynced on every
+    fsync_every-th flush (0 = only when closing). With a summary (catalog.RunSummary) the
+    statistics of the run are updated in this thread and saved to the run catalog at
+    catalog_path on every fsync and when closing. Errors are printed and kept in error; the first
+    one is also passed to on_error(message), which is called in this thread (e.g. the emit of a
+    Qt signal)."""
+
+    def __init__(self, filepath, flush_interval=1.0, fsync_every=10, summary=None, catalog_path=None,
+                 on_error=None):
+        super().__init__(name=type(self).__name__, daemon=True)
+        self.filepath = filepath
+        self.flush_interval = flush_interval
+        self.fsync_every = fsync_every
+        self.summary = summary
+        self.catalog_path = catalog_path
+        self.on_error = on_error
+        self.catalog = None
+        self.queue = queue.SimpleQueue()
+        self.rows = 0
+        self.error = None
+        self.start()
+
+    def write(self, samples):
+        """Queue a block of samples; returns immediately."""
+        self.queue.put(samples)
+
+    def close(self):
+        """Write the queued samples, flush, fsync and close the file in the background."""
+        self.queue.put(_CLOSE)
+
+    def openFile(self):
+        return open(self.filepath, 'a', newline='')
+
+    def reportError(self, action, error):
+        first = self.error is None
+        self.error = error
+        message = f"Error {action} {self.filepath}: {error}"
+        print(message)
+        # Nicht für jeden weiteren Block erneut melden
+        if first and self.on_error is not None:
+            self.on_error(message)
+
+    def writeSamples(self, file, samples):
+        raise NotImplementedError
+
+    def saveSummary(self):
+        if self.summary is None or self.catalog_path is None:
+            return
+        from lauda.catalog import RunCatalog
+        try:
+            if self.catalog is None:
+                self.catalog = RunCatalog(self.catalog_path)
+            self.catalog.save(self.summary)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Error updating run catalog: {e}")
+
+    def run(self):
+        try:
+            file = self.openFile()
+        except (OSError, ValueError, struct.error) as e:
+            self.reportError("opening", e)
+            return
+
+        with file:
+            flushes = 0
+            dirty = False
+            next_flush = time.monotonic() + self.flush_interval
+            while True:
+                try:
+                    samples = self.queue.get(timeout=max(0.0, next_flush - time.monotonic()) if dirty else None)
+                except queue.Empty:
+                    samples = None
+                if samples is _CLOSE:
+                    break
+                try:
+                    if samples:
+                        self.writeSamples(file, samples)
+                        self.rows += len(samples)
+                        if self.summary is not None:
+                            self.summary.update_samples(samples)
+                        dirty = True
+                    if dirty and time.monotonic() >= next_flush:
+                        file.flush()
+                        flushes += 1
+                        if self.fsync_every and flushes % self.fsync_every == 0:
+                            os.fsync(file.fileno())
+                            self.saveSummary()
+                        dirty = False
+                        next_flush = time.monotonic() + self.flush_interval
+                except Exception as e:
+                    # Nur dieser Block geht verloren, der Recorder schreibt die folgenden weiter
+                    self.reportError("writing", e)
+            try:
+                file.flush()
+                os.fsync(file.fileno())
+            except OSError as e:
+                self.reportError("writing", e)
+        self.saveSummary()
+        if self.catalog is not None:
+            self.catalog.close()
+
+
+class CsvLogger(_Recorder):
+    """Appends samples to a CSV file in the background."""
+
+    def __init__(self, *args, **kwargs):
+        self.writer = None
+        self.second = None  # Sekunde und Text des zuletzt formatierten Zeitstempels
+        self.stamp = ''
+        super().__init__(*args, **kwargs)
+
+    def openFile(self):
+        # Nach einem Absturz unvollständige letzte Zeile abschneiden, damit neue Zeilen sauber beginnen
+        if os.path.exists(self.filepath):
+            with open(self.filepath, 'r+b') as file:
+                size = file.seek(0, os.SEEK_END)
+                end = size
+                while end > 0:
+                    start = max(0, end - TAIL_BLOCK)
+                    file.seek(start)
+                    newline = file.read(end - start).rfind(b'\n')
+                    if newline >= 0:
+                        end = start + newline + 1
+                        break
+                    end = start
+                if end != size:
+                    file.truncate(end)
+        return super().openFile()
+
+    def timestamp(self, t):
+        # Zeitstempel haben Sekundenauflösung: Formatierung je Sekunde nur einmal
+        second = int(t)
+        if second != self.second:
+            self.second = second
+            self.stamp = format_time(second)
+        return self.stamp
+
+    def writeSamples(self, file, samples):
+        if self.writer is None:
+            self.writer = csv.writer(file)
+        self.writer.writerows(csv_row(sample, self.timestamp(sample.t)) for sample in samples)
+
+
+class BinaryRecorder(_Recorder):
+    """Appends samples to a run file (*.lrun) in the background, one write per block."""
+
+    def openFile(self):
+        file = open(self.filepath, 'a+b')
+        try:
+            size = file.seek(0, os.SEEK_END)
+            if size == 0:
+                file.write(HEADER.pack(MAGIC, VERSION, HEADER_SIZE, RECORD.itemsize, time.time()))
+            else:
+                file.seek(0)
+                header = read_header(file)
+                # Unvollständigen oder nie geschriebenen (genullten) letzten Datensatz abschneiden,
+                # damit neue Datensätze ausgerichtet bleiben
+                count = (size - header['header_size']) // RECORD.itemsize
+                valid = _valid_count(file, header['header_size'], count)
+                end = header['header_size'] + valid * RECORD.itemsize
+                if end != size:
+                    file.truncate(end)
+                file.seek(0, os.SEEK_END)
+        except (OSError, ValueError, struct.error):
+            file.close()
+            raise
+        return file
+
+    def writeSamples(self, file, samples):
+        file.write(to_records(samples).tobytes())
+
+
+def _valid_count(file, header_size, count, window=256):
+    """Number of records up to the last one with a timestamp (torn writes leave zeros)."""
+    while count > 0:
+        n = min(window, count)
+        file.seek(header_size + (count - n) * RECORD.itemsize)
+        t = np.frombuffer(file.read(n * RECORD.itemsize), dtype=RECORD)['t']
+        written = np.flatnonzero(t > 0)
+        if len(written):
+            return count - n + int(written[-1]) + 1
+        count -= n
+    return 0
+
+
+def read_tail(filepath, count):
+    """The last count samples of a recording as columns t, Ti, T1, Ts, p, Tu, To, Xp, Tn, Tv.
+
+    Only the end of the file is read. Values that were not fresh are NaN; CSV files do not
+    contain the controller parameters, these columns are NaN as well."""
+    if filepath.lower().endswith(RUN_SUFFIX):
+        with open(filepath, 'rb') as file:
+            header = read_header(file)
+            size = file.seek(0, os.SEEK_END)
+            total = _valid_count(file, header['header_size'], (size - header['header_size']) // RECORD.itemsize)
+            n = min(count, total)
+            file.seek(header['header_size'] + (total - n) * RECORD.itemsize)
+            records = np.frombuffer(file.read(n * RECORD.itemsize), dtype=RECORD)
+        columns = {'t': records['t'].astype(np.float64)}
+        for name in CHANNELS:
+            column = records[name].astype(np.float64)
+            column[(records['flags'] & FLAG_BITS[name]) != 0] = np.nan
+            columns[name] = column
+        return columns
+
+    # CSV: blockweise vom Dateiende lesen, bis genügend vollständige Zeilen vorliegen
+    with open(filepath, 'rb') as file:
+        end = file.seek(0, os.SEEK_END)
+        data = b''
+        while end > 0 and data.count(b'\n') <= count:
+            start = max(0, end - TAIL_BLOCK)
+            file.seek(start)
+            data = file.read(end - start) + data
+            end = start
+    lines = data.decode('utf-8', errors='replace').splitlines()
+    if end > 0:
+        lines = lines[1:]  # erste Zeile ist angeschnitten
+    rows = [row for row in csv.reader(lines[-count:]) if len(row) == 1 + len(CSV_CHANNELS)]
+
+    n = len(rows)
+    columns = {name: np.full(n, np.nan) for name in ('t',) + CHANNELS}
+    for i, row in enumerate(rows):
+        try:
+            columns['t'][i] = datetime.strptime(row[0], "%Y-%m-%d %H:%M:%S").timestamp()
+        except ValueError:
+            continue
+        for name, text in zip(CSV_CHANNELS, row[1:]):
+            if text:
+                columns[name][i] = float(text)
+    valid = ~np.isnan(columns['t'])
+    return {name: column[valid] for name, column in columns.items()}
+
+
+class RunJournal:
+    """Marker of the recording in progress, written atomically before the first sample.
+
+    pending() returns the information of a recording that was not finished cleanly."""
+
+    def __init__(self, path=JOURNAL_PATH):
+        self.path = path
+
+    def begin(self, filepath, **info):
+        info.update(filepath=os.path.abspath(filepath), started=info.get('started', time.time()))
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w') as file:
+            json.dump(info, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, self.path)
+
+    def finish(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def pending(self):
+        try:
+            with open(self.path) as file:
+                info = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(info.get('filepath', '')):
+            return None
+        return info
+
+
+def recorder_for(filepath, flush_interval=1.0, fsync_every=10, summary=None, catalog_path=None, on_error=None):
+    """BinaryRecorder for *.lrun files, CsvLogger otherwise."""
+    cls = BinaryRecorder if filepath.lower().endswith(RUN_SUFFIX) else CsvLogger
+    return cls(filepath, flush_interval, fsync_every, summary, catalog_path, on_error)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="LAUDA run files")
+    commands = parser.add_subparsers(dest='command', required=True)
+    export = commands.add_parser('export', help="export a run file (*.lrun) to CSV")
+    export.add_argument('source')
+    export.add_argument('target')
+    args = parser.parse_args(argv)
+
+    if args.command == 'export':
+        started = time.perf_counter()
+        rows = export_csv(args.source, args.target)
+        print(f"{rows} rows exported to {args.target} in {time.perf_counter() - started:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
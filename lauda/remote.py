@@ -0,0 +1,201 @@
+# -*- coding :utf-8 -*-
+# lauda/remote.py
+'''
+This module provides the GUI side of the acquisition daemon (lauda/daemon.py). DaemonLink
+carries the JSON messages over the local socket; RemoteDevices and RemoteAcquisition stand in
+for DeviceManager and Acquisition, so MainWindow and its dialogs work unchanged while the
+serial links, the pressure watchdog and the recorder stay in the daemon process.
+'''
+import itertools
+from concurrent.futures import Future
+
+from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtNetwork import QLocalSocket
+
+from lauda.acquisition import SampleBatch
+from lauda.daemon import DEFAULT_SOCKET, LineReader, encode, row_sample
+from lauda.devices import LAUDA, PRIORITY_CONTROL, PRIORITY_POLL
+from lauda.safety import Trip
+
+
+class DaemonLink(QObject):
+    """Connection to the acquisition daemon; every message arrives as messageReceived(dict)."""
+    messageReceived = pyqtSignal(dict)
+    disconnected = pyqtSignal()
+
+    def __init__(self, name=DEFAULT_SOCKET, parent=None):
+        super().__init__(parent)
+        self.name = name
+        self.socket = QLocalSocket(self)
+        self.reader = LineReader(self.socket)
+        self.socket.readyRead.connect(self.onReadyRead)
+        self.socket.disconnected.connect(self.disconnected)
+
+    def connectToDaemon(self, timeout=2.0):
+        self.socket.connectToServer(self.name)
+        return self.socket.waitForConnected(int(timeout * 1000))
+
+    def isConnected(self):
+        return self.socket.state() == QLocalSocket.LocalSocketState.ConnectedState
+
+    def send(self, message):
+        if self.isConnected():
+            self.socket.write(encode(message))
+            self.socket.flush()
+
+    def close(self):
+        self.socket.disconnectFromServer()
+
+    def onReadyRead(self):
+        for message in self.reader.messages():
+            self.messageReceived.emit(message)
+
+
+class RemoteDevices:
+    """DeviceManager interface whose commands are executed by the daemon.
+
+    The futures resolve in the GUI thread when the reply arrives ('' if the command failed
+    or the daemon went away)."""
+
+    def __init__(self, link):
+        self.link = link
+        self.connected = {}
+        self.pending = {}
+        self.ids = itertools.count()
+        link.messageReceived.connect(self.onMessage)
+        link.disconnected.connect(self.onDisconnected)
+
+    def onMessage(self, message):
+        if message['type'] == 'state':
+            self.connected = message['connected']
+        elif message['type'] == 'reply':
+            future = self.pending.pop(message['id'], None)
+            if future is not None:
+                future.set_result(message['result'])
+
+    def onDisconnected(self):
+        self.connected = {}
+        for future in self.pending.values():
+            future.set_result('')
+        self.pending = {}
+
+    def attach(self, device, link):
+        raise RuntimeError("The serial ports are owned by the acquisition daemon")
+
+    def detach(self, device):
+        return False
+
+    def disconnect(self):
+        return []
+
+    def is_connected(self, device=LAUDA):
+        return self.link.isConnected() and bool(self.connected.get(device))
+
+    def name(self, device=LAUDA):
+        return self.connected[device]
+
+    def _submit(self, device, priority, callback=None, **message):
+        future = Future()
+        if callback:
+            future.add_done_callback(callback)
+        if not self.link.isConnected():
+            future.set_exception(ConnectionError("acquisition daemon not connected"))
+            return future
+        request = next(self.ids)
+        self.pending[request] = future
+        self.link.send(dict(message, cmd='submit', id=request, device=device, priority=priority))
+        return future
+
+    def submit(self, command, device=LAUDA, priority=PRIORITY_CONTROL, timeout=None, callback=None):
+        return self._submit(device, priority, callback, command=command.decode('latin-1'), timeout=timeout)
+
+    def flush_input(self, device=LAUDA, priority=PRIORITY_CONTROL):
+        return self._submit(device, priority, kind='flush')
+
+    def pause(self, seconds, device=LAUDA, priority=PRIORITY_CONTROL):
+        return self._submit(device, priority, kind='pause', seconds=seconds)
+
+    def query(self, command, device=LAUDA, priority=PRIORITY_POLL, timeout=None):
+        raise RuntimeError("Blocking queries are not available over the daemon link")
+
+
+class RemoteScheduler:
+    """Forwards invalidate() to the poll scheduler of the daemon."""
+
+    def __init__(self, link):
+        self.link = link
+
+    def invalidate(self, names=None):
+        self.link.send({'cmd': 'invalidate', 'names': list(names) if names is not None else None})
+
+
+class RemoteAcquisition(QObject):
+    """Acquisition interface fed by the samples of the daemon.
+
+    tripped carries the Trip of the daemon's pressure watchdog, stateChanged every state
+    message (receiving, filepath, pressure_exceeded, ...) and stopped the end of the
+    acquisition in the daemon."""
+    dataReceived = pyqtSignal(float, float, float, float, str, float, float, float, float, float)
+    sampleReceived = pyqtSignal(object)
+    batchReceived = pyqtSignal(object)
+    tripped = pyqtSignal(object)
+    stopped = pyqtSignal()
+    stateChanged = pyqtSignal(dict)
+
+    def __init__(self, link, parent=None):
+        super().__init__(parent)
+        self.link = link
+        self.scheduler = RemoteScheduler(link)
+        self.state = {}
+        link.messageReceived.connect(self.onMessage)
+
+    def setBatchInterval(self, seconds):
+        # Die Blockbildung übernimmt der Daemon
+        pass
+
+    def start(self, program=None, tolerance_band=None):
+        message = {'cmd': 'start', 'program': program}
+        if tolerance_band is not None:
+            message['tolerance_band'] = tolerance_band
+        self.link.send(message)
+
+    def stop(self):
+        self.link.send({'cmd': 'stop'})
+
+    def record(self, filepath):
+        self.link.send({'cmd': 'record', 'filepath': filepath})
+
+    def reset(self):
+        self.link.send({'cmd': 'reset'})
+
+    def configureSafety(self, limit, max_rise, rise_window):
+        self.link.send({'cmd': 'safety', 'limit': limit, 'max_rise': max_rise, 'rise_window': rise_window})
+
+    def isRunning(self):
+        return bool(self.state.get('receiving'))
+
+    def errorCounts(self):
+        return self.state.get('errors', {})
+
+    def onMessage(self, message):
+        kind = message['type']
+        if kind == 'samples':
+            samples = [row_sample(row) for row in message['rows']]
+            if not samples:
+                return
+            for sample in samples:
+                self.sampleReceived.emit(sample)
+                self.dataReceived.emit(*sample.values())
+            self.batchReceived.emit(SampleBatch(samples))
+        elif kind == 'state':
+            receiving = self.isRunning()
+            self.state = message
+            if receiving and not message['receiving']:
+                self.stopped.emit()
+            self.stateChanged.emit(message)
+        elif kind == 'trip':
+            # received und queued stammen von der monotonen Uhr des Daemons, nur ihre Differenz zählt
+            trip = Trip(message['reason'], message['p'], message['rise'], message['t'], message['limit'],
+                        message['max_rise'], message['received'])
+            trip.queued = message['queued']
+            self.tripped.emit(trip)
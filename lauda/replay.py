@@ -0,0 +1,183 @@
+# -*- coding :utf-8 -*-
+# lauda/replay.py
+'''
+This module provides the replay source: a recorded run (CSV of CsvLogger or *.lrun) is fed to
+MainWindow through the interface of Acquisition (dataReceived, sampleReceived, batchReceived,
+start/stop), so the plot and the pressure check see the recorded samples exactly as they were
+acquired; MainWindow does not record them again. A pressure watchdog of its own checks them as they are replayed; it
+sends STOP and OUT_30 to a private simulator, never to the connected thermostat, and a replay
+is not started or stopped through ProgramControl. The speed is a multiple of real time; 0
+replays as fast as the GUI takes the samples. Field issues such as a pressure trip can be
+reproduced without hardware and the GUI can be stress-tested at hundreds of times real time.
+
+Usage:
+    python lauda.py --replay run.csv --speed 100
+'''
+import time
+
+import numpy as np
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+from lauda.acquisition import Sample, SampleBatch
+from lauda.devices import DeviceManager, LAUDA
+from lauda.loader import load_run
+from lauda.polling import EMIT_ORDER, PollScheduler
+from lauda.recording import RUN_SUFFIX, open_run, unpack_status
+from lauda.safety import PRESSURE_LIMIT, RISE_WINDOW, PressureWatchdog
+from lauda.simulator import simulated_ports
+from lauda.transport import FramedSerial
+
+# CSV-Aufzeichnungen enthalten kein Statuswort: laufender Thermostat, Regelung auf Ti, T1 angeschlossen
+REPLAY_STATUS = '0010010'
+MAX_ROWS = 10000  # Datensätze je Timer-Durchlauf, damit die GUI bedienbar bleibt
+
+
+def load_replay(filepath):
+    """Columns t and EMIT_ORDER of a recorded run for Replay.
+
+    Values that were not fresh (empty CSV cells, flagged *.lrun values) are carried over from
+    the last fresh value as during the acquisition; the returned flags mark them per row."""
+    columns = load_run(filepath)
+    n = len(columns['t'])
+    values = {'t': columns['t']}
+    flags = np.zeros(n, dtype=np.int64)
+    rows = np.arange(n)
+    for name in EMIT_ORDER:
+        if name == 'status_sign':
+            continue
+        column = columns.get(name, np.full(n, np.nan))
+        missing = np.isnan(column)
+        flags[missing] |= Sample.BITS[name]
+        # Letzten frischen Wert fortschreiben
+        last = np.maximum.accumulate(np.where(missing, 0, rows)) if n else rows
+        values[name] = np.where(missing[last], np.nan, column[last])
+
+    if filepath.lower().endswith(RUN_SUFFIX):
+        _, records = open_run(filepath)
+        codes, index = np.unique(records['status'], return_inverse=True)
+        texts = [unpack_status(code) for code in codes.tolist()]
+        values['status_sign'] = [texts[i] for i in index.tolist()]
+        del records
+    else:
+        values['status_sign'] = [REPLAY_STATUS] * n
+    values['flags'] = flags
+    return values
+
+
+class Replay(QObject):
+    """Stand-in for Acquisition that delivers the samples of a recorded run.
+
+    The recorded timestamps are kept. stop() pauses the replay and start() continues at the
+    same sample, so a restart after the pressure trip carries on with the recording;
+    finished is emitted after the last sample and stopped by every stop(). Every fresh pressure
+    value is checked by the replay's own watchdog (limit, max_rise and rise_window as in
+    PressureWatchdog) before its sample is delivered, as in the pressure worker; close()
+    releases its simulator."""
+    dataReceived = pyqtSignal(float, float, float, float, str, float, float, float, float, float)
+    sampleReceived = pyqtSignal(object)
+    batchReceived = pyqtSignal(object)
+    tripped = pyqtSignal(object)
+    stopped = pyqtSignal()
+    finished = pyqtSignal()
+
+    def __init__(self, filepath, speed=1.0, batch_interval=0.0, parent=None, limit=PRESSURE_LIMIT, max_rise=0.0,
+                 rise_window=RISE_WINDOW):
+        super().__init__(parent)
+        self.filepath = filepath
+        self.columns = load_replay(filepath)
+        # Eigener Watchdog an einem Simulator: eine Wiedergabe darf nie Befehle an den echten Thermostat senden
+        self.devices = DeviceManager()
+        lauda_port, _, _ = simulated_ports()
+        self.devices.attach(LAUDA, FramedSerial(lauda_port))
+        self.watchdog = PressureWatchdog(self.devices, limit, max_rise, rise_window, log_path=None)
+        self.count = len(self.columns['t'])
+        self.position = 0
+        self.speed = speed
+        self.max_rows = MAX_ROWS
+        # MainWindow markiert nach Schreibbefehlen Kanäle zur Abfrage; beim Abspielen ohne Wirkung
+        self.scheduler = PollScheduler()
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.replayDue)
+        self.setBatchInterval(batch_interval)
+
+    def __len__(self):
+        return self.count
+
+    def setBatchInterval(self, seconds):
+        self.batch_interval = seconds
+        self.updateInterval()
+
+    def setSpeed(self, speed):
+        """Multiple of real time; 0 = as fast as possible."""
+        self.speed = speed
+        self.updateInterval()
+        self.anchor()
+
+    def updateInterval(self):
+        if not self.speed:
+            self.timer.setInterval(0)
+        else:
+            self.timer.setInterval(int(self.batch_interval * 1000) if self.batch_interval > 0 else 10)
+
+    def anchor(self):
+        # Wiedergabezeit ab dem nächsten Datensatz an die Uhr koppeln
+        if self.position < self.count:
+            self.anchor_t = self.columns['t'][self.position]
+            self.anchor_clock = time.monotonic()
+
+    def start(self):
+        self.anchor()
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+        self.stopped.emit()
+
+    def isRunning(self):
+        return self.timer.isActive()
+
+    def rewind(self):
+        self.position = 0
+        self.anchor()
+
+    def close(self):
+        self.stop()
+        self.devices.disconnect()
+
+    def errorCounts(self):
+        return {}
+
+    def samples(self, start, stop):
+        columns = self.columns
+        rows = zip(*(columns[name][start:stop].tolist() if name != 'status_sign' else columns[name][start:stop]
+                     for name in ('t',) + EMIT_ORDER + ('flags',)))
+        return [Sample(*row) for row in rows]
+
+    def checkPressure(self, samples):
+        # Aufgezeichnete Zeitstempel für den Druckanstieg, die Latenz ab der Wiedergabe
+        received = time.monotonic()
+        for sample in samples:
+            if sample.fresh('p'):
+                trip = self.watchdog.check(sample.p, sample.t, received)
+                if trip is not None:
+                    self.tripped.emit(trip)
+
+    def replayDue(self):
+        if self.speed:
+            target = self.anchor_t + (time.monotonic() - self.anchor_clock) * self.speed
+            stop = int(np.searchsorted(self.columns['t'], target, 'right'))
+        else:
+            stop = self.count
+        stop = min(stop, self.position + self.max_rows)
+        if stop > self.position:
+            samples = self.samples(self.position, stop)
+            self.position = stop
+            self.checkPressure(samples)
+            for sample in samples:
+                self.sampleReceived.emit(sample)
+                self.dataReceived.emit(*sample.values())
+            if self.batch_interval > 0:
+                self.batchReceived.emit(SampleBatch(samples))
+        if self.position >= self.count:
+            self.timer.stop()
+            self.finished.emit()
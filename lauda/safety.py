@@ -0,0 +1,163 @@
+# -*- coding :utf-8 -*-
+# lauda/safety.py
+'''
+This module provides the pressure watchdog. It checks every pressure reading in the thread
+that read it, before any Qt signal is emitted, and on a trip queues STOP and OUT_30 (Ts = 30 °C)
+with safety priority, so neither a busy nor a blocked GUI thread (e.g. a modal QMessageBox)
+delays the reaction. It trips when the pressure exceeds the limit or, optionally, when it
+rises faster than max_rise, which catches a runaway before the limit is reached.
+
+The reaction time is bounded by one pressure interval (0.2 s), the LAUDA command in progress
+(at most its 1 s timeout) and the round trip of STOP and OUT_30. Every trip is recorded with
+its latencies in TRIP_LOG.
+'''
+import collections
+import csv
+import os
+import threading
+import time
+
+from lauda.devices import PRIORITY_SAFETY
+
+PRESSURE_LIMIT = 50.0   # bar
+RISE_WINDOW = 5.0       # s, Zeitraum, über den der Druckanstieg bestimmt wird
+REACTION_BUDGET = 2.0   # s, längere Reaktionszeiten werden gemeldet
+TRIP_LOG = os.path.join(os.path.expanduser('~'), '.lauda', 'trips.csv')
+TRIP_FIELDS = ('time', 'reason', 'p', 'rise', 'limit', 'max_rise', 'detect_ms', 'reaction_ms', 'reply')
+
+
+class Trip:
+    """One trip of the watchdog.
+
+    t is the timestamp of the reading that tripped (wall time, or the recorded time in a
+    replay). The latencies are measured with time.monotonic(): received is the time the reading
+    arrived, queued the time STOP and OUT_30 were queued and confirmed the time the reply to
+    OUT_30 arrived (None until then)."""
+
+    def __init__(self, reason, p, rise, t, limit, max_rise, received=None):
+        self.reason = reason  # 'limit' oder 'rise'
+        self.p = p
+        self.rise = rise  # bar/min
+        self.t = t
+        self.received = time.monotonic() if received is None else received
+        self.limit = limit
+        self.max_rise = max_rise
+        self.queued = None
+        self.confirmed = None
+        self.reply = None
+
+    @property
+    def detect_ms(self):
+        return (self.queued - self.received) * 1000
+
+    @property
+    def reaction_ms(self):
+        return (self.confirmed - self.received) * 1000 if self.confirmed is not None else None
+
+    def describe(self):
+        if self.reason == 'rise':
+            return f"pressure rising {self.rise:.1f} bar/min > {self.max_rise:g} bar/min at {self.p:.1f} bar"
+        return f"pressure {self.p:.1f} bar > {self.limit:g} bar"
+
+
+class PressureWatchdog:
+    """Over-pressure and rate-of-rise check on the acquisition path.
+
+    check() is called by the pressure worker (or the replay) with every fresh reading and
+    returns a Trip the first time a threshold is crossed; further trips are suppressed until
+    reset(). max_rise is in bar/min, 0 disables the rate-of-rise trigger."""
+
+    def __init__(self, devices, limit=PRESSURE_LIMIT, max_rise=0.0, rise_window=RISE_WINDOW,
+                 log_path=TRIP_LOG):
+        self.devices = devices
+        self.limit = limit
+        self.max_rise = max_rise
+        self.rise_window = rise_window
+        self.log_path = log_path
+        self.readings = collections.deque()
+        self.trip = None
+        self.trips = []
+        # readings wird vom Druck-Thread fortgeschrieben und vom GUI-Thread geleert
+        self.lock = threading.Lock()
+        self.log_lock = threading.Lock()
+
+    def configure(self, limit=None, max_rise=None, rise_window=None):
+        """Change the thresholds; None keeps a value. A new rise_window restarts the rise check."""
+        if limit is not None and limit <= 0:
+            raise ValueError(f"pressure limit must be positive, not {limit}")
+        if max_rise is not None and max_rise < 0:
+            raise ValueError(f"max_rise must not be negative, not {max_rise}")
+        if rise_window is not None and rise_window <= 0:
+            raise ValueError(f"rise_window must be positive, not {rise_window}")
+        if limit is not None:
+            self.limit = limit
+        if max_rise is not None:
+            self.max_rise = max_rise
+        if rise_window is not None and rise_window != self.rise_window:
+            with self.lock:
+                self.rise_window = rise_window
+                self.readings.clear()
+
+    def reset(self):
+        with self.lock:
+            self.trip = None
+            self.readings.clear()
+
+    def rise(self, p, t):
+        """Pressure rise in bar/min over the last rise_window seconds (None until half of it is covered)."""
+        with self.lock:
+            readings = self.readings
+            readings.append((t, p))
+            while readings and t - readings[0][0] > self.rise_window:
+                readings.popleft()
+            t0, p0 = readings[0]
+        if t - t0 < self.rise_window / 2:
+            return None
+        return (p - p0) / (t - t0) * 60
+
+    def check(self, p, t, received=None):
+        """received is the time.monotonic() at which the reading arrived (default: now)."""
+        rise = self.rise(p, t)
+        if self.trip is not None:
+            return None
+        if p > self.limit:
+            reason = 'limit'
+        elif self.max_rise and rise is not None and rise > self.max_rise:
+            reason = 'rise'
+        else:
+            return None
+
+        trip = Trip(reason, p, rise, t, self.limit, self.max_rise, received)
+        self.trip = trip
+        # STOP und OUT_30 überholen alle wartenden Routineabfragen
+        self.devices.submit(b'STOP\r\n', priority=PRIORITY_SAFETY)
+        future = self.devices.submit(b'OUT_30\r\n', priority=PRIORITY_SAFETY)
+        trip.queued = time.monotonic()
+        future.add_done_callback(lambda future: self.confirmed(trip, future))
+        self.trips.append(trip)
+        return trip
+
+    def confirmed(self, trip, future):
+        trip.confirmed = time.monotonic()
+        trip.reply = future.result() if not future.cancelled() and future.exception() is None else ''
+        if trip.reaction_ms > REACTION_BUDGET * 1000:
+            print(f"Pressure trip reaction took {trip.reaction_ms:.0f} ms (budget {REACTION_BUDGET * 1000:.0f} ms)")
+        self.log(trip)
+
+    def log(self, trip):
+        if not self.log_path:
+            return
+        try:
+            with self.log_lock:
+                os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+                new = not os.path.exists(self.log_path)
+                with open(self.log_path, 'a', newline='') as file:
+                    writer = csv.writer(file)
+                    if new:
+                        writer.writerow(TRIP_FIELDS)
+                    writer.writerow([time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(trip.t)), trip.reason,
+                                     trip.p, '' if trip.rise is None else round(trip.rise, 3), trip.limit,
+                                     trip.max_rise, round(trip.detect_ms, 3), round(trip.reaction_ms, 3),
+                                     trip.reply])
+        except OSError as e:
+            print(f"Error writing trip log: {e}")
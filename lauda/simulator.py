@@ -0,0 +1,419 @@
+# -*- coding :utf-8 -*-
+# lauda/simulator.py
+'''
+This module provides an offline simulator of the LAUDA USH 400 thermostat and the pressure
+transducer. It speaks the command set used by the application (IN_1..IN_C, OUT_, OUT_L/H/XP/TN/
+TV/TB/CY, OUT_RT1/OUT_RTi, SEG_, START/STOP and the transducer's P) on top of a simple thermal and
+pressure model of the reactor, with configurable latency, jitter and dropped replies. The
+in-process port can additionally model a USB serial adapter (adapter_latency): every transfer
+is delayed in both directions, but transfers overlap, so commands written back to back pay it
+only once per burst, as with the latency timer of an FTDI adapter.
+
+The simulated devices can be used in-process through SimulatedPort, which behaves like an open
+pyserial port, or exposed on a Linux pseudo terminal with PtyBridge:
+
+    python -m lauda.simulator            # prints the two /dev/pts/N names to connect to
+    python lauda.py --simulate           # runs the GUI against in-process devices
+'''
+import math
+import os
+import queue
+import random
+import re
+import threading
+import time
+
+ROOM_TEMPERATURE = 20.0
+AIR_PRESSURE = 1.013  # bar
+
+
+def vapour_pressure(T):
+    """Saturation pressure of water in bar (Antoine equation)."""
+    if T < 100.0:
+        A, B, C = 8.07131, 1730.63, 233.426
+    else:
+        A, B, C = 8.14019, 1810.94, 244.485
+    return 10 ** (A - B / (C + T)) * 0.00133322
+
+
+class ReactorModel:
+    """Thermal and pressure model of the HTC reactor heated by the thermostat.
+
+    Ti (Vorlauf) follows the controller output with a limited heating rate, T1 (im Reaktor)
+    follows Ti with a first order lag and p is the vapour pressure of water at T1 plus the
+    enclosed air and optionally generated gas. Time can run faster than real time (speed)."""
+
+    def __init__(self, speed=1.0, noise=0.02):
+        self.lock = threading.RLock()
+        self.speed = speed
+        self.noise = noise
+        self.tau_flow = 60.0       # s, Zeitkonstante Vorlauf
+        self.tau_reactor = 600.0   # s, Zeitkonstante Reaktor
+        self.max_rate = 5.0 / 60   # K/s, maximale Heizrate
+        self.gas_rate = 0.0        # bar/s, Gasbildung (z.B. für Druckanstiegstests)
+
+        self.Ti = ROOM_TEMPERATURE
+        self.T1 = ROOM_TEMPERATURE
+        self.Ts = 30.0
+        self.gas = 0.0
+        self.Tu = -10.0
+        self.To = 280.0
+        self.Xp = 2.0
+        self.Tn = 25.0
+        self.Tv = 5.0
+        self.control_T1 = True
+        self.tolerance_band = 5.0
+        self.cycles = 1
+
+        self.segments = {}
+        self.program_start = None
+        self.program_Ts0 = self.Ts
+        self.sim_time = 0.0
+        self.last_update = time.monotonic()
+
+    def advance(self, now=None):
+        with self.lock:
+            now = time.monotonic() if now is None else now
+            dt = (now - self.last_update) * self.speed
+            self.last_update = now
+            # In Schritten von höchstens 1 s integrieren, damit hohe Geschwindigkeiten stabil bleiben
+            while dt > 0:
+                step = min(dt, 1.0)
+                self.step(step)
+                dt -= step
+
+    def step(self, dt):
+        self.sim_time += dt
+        if self.program_start is not None:
+            self.Ts = self.program_setpoint()
+
+        # Regelung auf T1: Vorlauf über den Sollwert hinaus treiben, begrenzt durch Tu/To
+        if self.control_T1:
+            target = self.Ts + (self.Ts - self.T1) * 2.0 / max(self.Xp, 0.1)
+        else:
+            target = self.Ts
+        target = min(max(target, self.Tu), self.To)
+
+        rate = (target - self.Ti) / self.tau_flow
+        rate = max(-self.max_rate, min(self.max_rate, rate))
+        self.Ti += rate * dt
+        self.T1 += (self.Ti - self.T1) * (1 - math.exp(-dt / self.tau_reactor))
+        self.gas += self.gas_rate * dt
+
+    def program_setpoint(self):
+        """Setpoint of the running program: linear ramps between the segment temperatures."""
+        elapsed = self.sim_time - self.program_start
+        segments = [self.segments[i] for i in sorted(self.segments)]
+        total = sum(duration for _, duration in segments)
+        if not segments or total <= 0:
+            return self.Ts
+        if elapsed >= total * self.cycles:
+            self.program_start = None  # Programm beendet, Sollwert bleibt stehen
+            return segments[-1][0]
+        elapsed %= total
+        start = self.program_Ts0
+        for temperature, duration in segments:
+            if elapsed < duration:
+                return start + (temperature - start) * elapsed / duration
+            elapsed -= duration
+            start = temperature
+        return start
+
+    def measure(self, value):
+        return value + random.gauss(0.0, self.noise) if self.noise else value
+
+    @property
+    def p(self):
+        return vapour_pressure(self.T1) + AIR_PRESSURE - vapour_pressure(ROOM_TEMPERATURE) + self.gas
+
+    def status(self):
+        """IN_4 status string (7 characters, see LAUDA manual)."""
+        return ''.join([
+            '1' if self.Ti > self.To else '0',         # Übertemperaturstörung
+            '0',                                       # Unterniveaustörung
+            '1' if self.program_start is not None else '0',
+            '1' if self.control_T1 else '0',           # Regelung auf Ti (0) / T1 (1)
+            '0',                                       # Sollwert über Analogeingang
+            '1',                                       # Externes Pt100 T1 angeschlossen
+            '0',                                       # Externes Pt100 T2 angeschlossen
+        ])
+
+
+class LaudaSimulator:
+    """Command interpreter of the USH 400 RS 232 interface."""
+
+    terminator = b'\r\n'
+    SEGMENT = re.compile(r'SEG_\((\d+)\)_(\d+)\.(\d+):(\d+)$')
+
+    def __init__(self, model):
+        self.model = model
+        self.pending = bytearray()
+
+    def feed(self, data):
+        """Split received bytes into commands."""
+        self.pending += data
+        commands = []
+        while True:
+            end = self.pending.find(b'\n')
+            if end < 0:
+                return commands
+            commands.append(bytes(self.pending[:end]).strip().decode('ascii', 'replace'))
+            del self.pending[:end + 1]
+
+    def handle(self, command):
+        model = self.model
+        with model.lock:
+            model.advance()
+            readings = {
+                'IN_1': lambda: model.measure(model.Ti),
+                'IN_2': lambda: model.measure(model.T1),
+                'IN_3': lambda: model.Ts,
+                'IN_8': lambda: model.Tu,
+                'IN_9': lambda: model.To,
+                'IN_A': lambda: model.Xp,
+                'IN_B': lambda: model.Tn,
+                'IN_C': lambda: model.Tv,
+            }
+            if command in readings:
+                return f"{readings[command]():.2f}"
+            if command == 'IN_4':
+                return model.status()
+            if command == 'START':
+                model.program_start = model.sim_time
+                model.program_Ts0 = model.Ts
+                return 'OK'
+            if command == 'STOP':
+                model.program_start = None
+                return 'OK'
+            if command == 'OUT_RT1':
+                model.control_T1 = True
+                return 'OK'
+            if command == 'OUT_RTi':
+                model.control_T1 = False
+                return 'OK'
+
+            match = self.SEGMENT.match(command)
+            if match:
+                index, temperature, hours, minutes = match.groups()
+                model.segments[int(index)] = (float(temperature), int(hours) * 3600 + int(minutes) * 60)
+                return 'OK'
+
+            for prefix, attribute in (('OUT_TB', 'tolerance_band'), ('OUT_CY', 'cycles'), ('OUT_XP', 'Xp'),
+                                      ('OUT_TN', 'Tn'), ('OUT_TV', 'Tv'), ('OUT_L', 'Tu'), ('OUT_H', 'To'),
+                                      ('OUT_', 'Ts')):
+                if command.startswith(prefix):
+                    try:
+                        value = float(command[len(prefix):])
+                    except ValueError:
+                        return 'ERR_3'
+                    setattr(model, attribute, int(value) if attribute == 'cycles' else value)
+                    return 'OK'
+        return 'ERR_2'
+
+
+class PressureSimulator:
+    """Pressure transducer: answers every single 'P' byte with the current pressure."""
+
+    terminator = b'\r\n'
+
+    def __init__(self, model):
+        self.model = model
+
+    def feed(self, data):
+        return ['P'] * data.count(b'P')
+
+    def handle(self, command):
+        with self.model.lock:
+            self.model.advance()
+            return f"{self.model.measure(self.model.p):.3f}"
+
+
+class _Responder(threading.Thread):
+    """Answers the commands of one simulated device one at a time, like the real hardware."""
+
+    def __init__(self, device, sink, latency=0.01, jitter=0.0, drop_rate=0.0, baudrate=9600):
+        super().__init__(daemon=True)
+        self.device = device
+        self.sink = sink
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.byte_time = 11.0 / baudrate if baudrate else 0.0  # 8N2 = 11 Bit je Zeichen
+        self.commands = queue.Queue()
+        self.dropped = 0
+        self.answered = 0
+
+    def put(self, data):
+        for command in self.device.feed(data):
+            self.commands.put(command)
+
+    def stop(self):
+        self.commands.put(None)
+
+    def run(self):
+        while True:
+            command = self.commands.get()
+            if command is None:
+                break
+            reply = self.device.handle(command).encode('ascii') + self.device.terminator
+            delay = self.latency + random.uniform(-self.jitter, self.jitter) + len(reply) * self.byte_time
+            if delay > 0:
+                time.sleep(delay)
+            if self.drop_rate and random.random() < self.drop_rate:
+                self.dropped += 1
+                continue
+            self.answered += 1
+            self.sink(reply)
+
+
+class _DelayLine(threading.Thread):
+    """Hands data on after a fixed delay, keeping the order; transfers in flight overlap."""
+
+    def __init__(self, delay, sink):
+        super().__init__(daemon=True)
+        self.delay = delay
+        self.sink = sink
+        self.transfers = queue.Queue()
+
+    def put(self, data):
+        self.transfers.put((time.monotonic() + self.delay, data))
+
+    def stop(self):
+        self.transfers.put((0.0, None))
+
+    def run(self):
+        while True:
+            due, data = self.transfers.get()
+            if data is None:
+                break
+            remaining = due - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
+            self.sink(data)
+
+
+class SimulatedPort:
+    """In-process stand-in for an open pyserial port connected to a simulated device.
+
+    adapter_latency (s) delays every transfer to and from the device like a USB serial adapter."""
+
+    def __init__(self, device, name='SIM', timeout=1.0, adapter_latency=0.0, **link):
+        self.name = name
+        self.timeout = timeout
+        self.is_open = True
+        self.dtr = self.rts = self.cts = True
+        self.buffer = bytearray()
+        self.condition = threading.Condition()
+        self.responder = _Responder(device, self.receive, **link)
+        self.responder.start()
+        self.lines = []
+        if adapter_latency:
+            upstream = _DelayLine(adapter_latency, self.receive)
+            downstream = _DelayLine(adapter_latency, self.responder.put)
+            self.responder.sink = upstream.put
+            self.send = downstream.put
+            self.lines = [upstream, downstream]
+            for line in self.lines:
+                line.start()
+        else:
+            self.send = self.responder.put
+
+    def receive(self, data):
+        with self.condition:
+            self.buffer += data
+            self.condition.notify_all()
+
+    @property
+    def in_waiting(self):
+        return len(self.buffer)
+
+    def write(self, data):
+        self.send(data)
+        return len(data)
+
+    def read(self, size=1):
+        with self.condition:
+            if not self.buffer and self.timeout:
+                self.condition.wait(self.timeout)
+            data = bytes(self.buffer[:size])
+            del self.buffer[:size]
+            return data
+
+    def reset_input_buffer(self):
+        with self.condition:
+            self.buffer.clear()
+
+    def close(self):
+        self.is_open = False
+        self.responder.stop()
+        for line in self.lines:
+            line.stop()
+
+
+class PtyBridge:
+    """Exposes a simulated device on a Linux pseudo terminal (e.g. /dev/pts/5)."""
+
+    def __init__(self, device, **link):
+        import tty
+        self.master, slave = os.openpty()
+        tty.setraw(slave)
+        self.name = os.ttyname(slave)
+        self.slave = slave
+        self.responder = _Responder(device, lambda reply: os.write(self.master, reply), **link)
+        self.reader = threading.Thread(target=self.read_loop, daemon=True)
+
+    def start(self):
+        self.responder.start()
+        self.reader.start()
+        return self
+
+    def read_loop(self):
+        while True:
+            try:
+                data = os.read(self.master, 1024)
+            except OSError:
+                break
+            if not data:
+                break
+            self.responder.put(data)
+
+    def close(self):
+        self.responder.stop()
+        os.close(self.master)
+        os.close(self.slave)
+
+
+def simulated_ports(model=None, lauda_link=None, pressure_link=None):
+    """Create a LAUDA and a pressure SimulatedPort sharing one reactor model."""
+    model = model or ReactorModel()
+    lauda = SimulatedPort(LaudaSimulator(model), 'SIM-LAUDA', **(lauda_link or {}))
+    pressure = SimulatedPort(PressureSimulator(model), 'SIM-P', **(pressure_link or {}))
+    return lauda, pressure, model
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="LAUDA USH 400 and pressure transducer simulator on a pty")
+    parser.add_argument('--speed', type=float, default=1.0, help="simulation time factor")
+    parser.add_argument('--latency', type=float, default=0.01, help="reply latency [s]")
+    parser.add_argument('--jitter', type=float, default=0.0, help="reply jitter [s]")
+    parser.add_argument('--drop', type=float, default=0.0, help="probability of a dropped reply")
+    args = parser.parse_args()
+
+    model = ReactorModel(speed=args.speed)
+    link = dict(latency=args.latency, jitter=args.jitter, drop_rate=args.drop)
+    lauda = PtyBridge(LaudaSimulator(model), **link).start()
+    pressure = PtyBridge(PressureSimulator(model), **link).start()
+    print(f"LAUDA Thermostat:     {lauda.name}")
+    print(f"Pressure transducer:  {pressure.name}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        lauda.close()
+        pressure.close()
+
+
+if __name__ == '__main__':
+    main()
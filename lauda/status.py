@@ -0,0 +1,54 @@
+# -*- coding :utf-8 -*-
+# lauda/status.py
+'''
+This module provides the status model of the LAUDA thermostat. The seven characters of the IN_4
+reply are decoded through lookup tables built once at import, decoded states are cached per
+status string, and the model only emits when the status or the controller parameters (Tu, To,
+Xp, Tn, Tv) actually change. Views connect to the model and skip updates while they are hidden.
+'''
+from PyQt6.QtCore import QObject, pyqtSignal
+
+# Klartext je Stelle des IN_4-Statusworts, Index = Ziffer 0..9
+STATUS_TEXTS = (
+    ("Keine Störung",) + ("Störung",) * 9,
+    ("Niveau o.k.",) + ("Störung",) * 9,
+    ("AUS",) + ("Läuft",) * 9,
+    ("Ti (Vorlauf)", "T1 (im Reaktor)", "T2") + tuple(str(digit) for digit in range(3, 10)),
+    ("Analogeingänge AUS",) + ("Vorgegeben",) * 9,
+    ("Nicht angeschlossen",) + ("Angeschlossen",) * 9,
+    ("Nicht angeschlossen",) + ("Angeschlossen",) * 9,
+)
+
+_decoded = {}
+
+
+def decode_status(status_sign):
+    """The seven status texts of an IN_4 reply such as '0010011' (cached per status string)."""
+    texts = _decoded.get(status_sign)
+    if texts is None:
+        texts = tuple(table[ord(char) - 48] for table, char in zip(STATUS_TEXTS, status_sign))
+        _decoded[status_sign] = texts
+    return texts
+
+
+class StatusModel(QObject):
+    """Latest status and controller parameters of the thermostat."""
+    statusChanged = pyqtSignal(tuple)
+    parametersChanged = pyqtSignal(tuple)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.status_sign = None
+        self.status = ()
+        self.parameters = ()
+
+    def update(self, status_sign, Tu, To, Xp, Tn, Tv):
+        if status_sign != self.status_sign:
+            self.status_sign = status_sign
+            self.status = decode_status(status_sign)
+            self.statusChanged.emit(self.status)
+
+        parameters = (Tu, To, Xp, Tn, Tv)
+        if parameters != self.parameters:
+            self.parameters = parameters
+            self.parametersChanged.emit(parameters)
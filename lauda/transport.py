@@ -0,0 +1,104 @@
+# -*- coding :utf-8 -*-
+# lauda/transport.py
+'''
+This module provides the framed serial transport used for all protocol traffic with the
+LAUDA thermostat and the pressure transducer. Instead of pyserial readline(), which reads in
+small chunks and always waits for the port timeout, it reads everything that is waiting in one
+call, splits the frames in a reusable buffer and gives every command its own deadline.
+'''
+import time
+
+# Deadlines in Sekunden
+QUERY_TIMEOUT = 0.3     # IN_x Abfragen und Druckabfrage
+COMMAND_TIMEOUT = 1.0   # OUT_, SEG_, START, STOP (Gerät quittiert mit OK)
+READ_SLICE = 0.05       # Blockierzeit eines einzelnen read() solange noch nichts ansteht
+
+
+def timeout_for(command):
+    """Return the reply deadline for a command."""
+    if command.startswith(b'IN_') or command == b'P':
+        return QUERY_TIMEOUT
+    return COMMAND_TIMEOUT
+
+
+class FramedSerial:
+    """Buffered, framed reader/writer on top of an open pyserial port."""
+
+    def __init__(self, port, terminator=b'\n', encoding='utf-8', errors='replace'):
+        self.port = port
+        self.terminator = terminator
+        self.encoding = encoding
+        self.errors = errors
+        self.buffer = bytearray()
+        # Ein kurzer, fester Port-Timeout; die eigentliche Frist bestimmt jeder Befehl selbst
+        self.port.timeout = READ_SLICE
+
+    @property
+    def name(self):
+        return self.port.name
+
+    @property
+    def is_open(self):
+        return self.port.is_open
+
+    def close(self):
+        self.buffer.clear()
+        self.port.close()
+
+    def flush_input(self):
+        """Discard everything received so far, including partial frames."""
+        self.port.reset_input_buffer()
+        self.buffer.clear()
+
+    def write(self, data):
+        self.port.write(data)
+
+    def fill(self):
+        """Move everything the port has received into the buffer with one read call.
+
+        Blocks for at most READ_SLICE when nothing is waiting."""
+        chunk = self.port.read(self.port.in_waiting or 1)
+        if chunk:
+            self.buffer += chunk
+        return len(chunk)
+
+    def read_frame(self, timeout=QUERY_TIMEOUT):
+        """Return the next frame without terminator, or None if the deadline expired."""
+        deadline = time.monotonic() + timeout
+        while True:
+            end = self.buffer.find(self.terminator)
+            if end >= 0:
+                frame = bytes(self.buffer[:end])
+                del self.buffer[:end + len(self.terminator)]
+                return frame
+            if time.monotonic() >= deadline:
+                return None
+            self.fill()
+
+    def readline(self, timeout=QUERY_TIMEOUT):
+        """Return the next frame decoded and stripped, '' on timeout (like pyserial readline)."""
+        frame = self.read_frame(timeout)
+        if frame is None:
+            return ''
+        return frame.decode(self.encoding, self.errors).strip()
+
+    def query(self, command, timeout=None):
+        """Send a command and return its decoded reply ('' if the deadline expired)."""
+        self.write(command)
+        return self.readline(timeout_for(command) if timeout is None else timeout)
+
+    def query_many(self, commands, timeout=None):
+        """Pipelined mode: write a burst of commands back to back and match the replies in order.
+
+        Returns the list of decoded replies, or None if the device dropped a reply. The
+        replies can then no longer be assigned to their commands, so the input is discarded
+        and the caller has to repeat the burst in lock-step mode with query()."""
+        self.write(b''.join(commands))
+        replies = []
+        for command in commands:
+            frame = self.read_frame(timeout_for(command) if timeout is None else timeout)
+            if frame is None:
+                self.flush_input()
+                return None
+            replies.append(frame.decode(self.encoding, self.errors).strip())
+        return replies
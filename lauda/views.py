@@ -4,29 +4,45 @@ This module provides interfaces for managing the visualization and storage of te
 and pressures during a hydrothermal carbonization process. Additionally, it facilitates input handling for
 control parameters and program inputs to the LAUDA High Temperature Thermostat USH."
 '''
-import collections
 import csv
 import os
 import sys
 import time
 from datetime import datetime
+import numpy as np
 import pyqtgraph as pg
 import serial
-from PyQt6.QtCore import QDateTime, QSize, QThread, pyqtSignal, QUrl
-from PyQt6.QtCore import QTimer, Qt
+import sqlite3
+from PyQt6.QtCore import QDateTime, QSize, QUrl
+from PyQt6 import sip
+from PyQt6.QtCore import QEvent, QThread, QTimer, Qt, pyqtSignal
 from PyQt6.QtGui import QFont
 from PyQt6.QtGui import QAction
 from PyQt6.QtWebEngineCore import QWebEngineSettings, QWebEnginePage
 from PyQt6.QtWebEngineWidgets import QWebEngineView
 from PyQt6.QtWidgets import (QMainWindow, QCheckBox, QPushButton, QDialog, QFileDialog, QMessageBox, QHBoxLayout,
-                             QFormLayout, QLineEdit, QGroupBox, QDoubleSpinBox, QComboBox, QSpinBox,
+                             QFormLayout, QLineEdit, QInputDialog, QGroupBox, QDoubleSpinBox, QComboBox, QSpinBox,
                              QRadioButton,
-                             QButtonGroup, QSpacerItem, QSizePolicy)
+                             QButtonGroup, QSpacerItem, QSizePolicy, QProgressDialog, QTableWidget,
+                             QTableWidgetItem, QAbstractItemView, QHeaderView, QMdiArea, QMdiSubWindow)
 from PyQt6.QtWidgets import QWidget, QProgressBar, QLabel, QVBoxLayout
 
-#Global variables for serial connection
-ser = None
-ser_p = None
+from lauda.acquisition import Acquisition, SampleBatch
+from lauda.buffers import MinMaxPyramid, RingBuffer, StaticSeries
+from lauda.polling import STATUS_CHANNELS, PARAMETER_CHANNELS
+from lauda.recording import read_tail, recorder_for, journal_path, RunJournal, RUN_SUFFIX
+from lauda.loader import LoadCancelled, load_run
+from lauda.replay import Replay
+from lauda.remote import DaemonLink, RemoteAcquisition, RemoteDevices
+from lauda.daemon import DEFAULT_SOCKET
+from lauda.control import ProgramControl, IDLE, MONITORING, PROGRAM, STARTING, STOPPING
+from lauda.catalog import (RunCatalog, RunSummary, index_directory, read_program, CATALOG_PATH,
+                           DEFAULT_TOLERANCE_BAND, ORDERS)
+from lauda.devices import DeviceManager, FutureWatcher, LAUDA, PRESSURE
+from lauda.simulator import simulated_ports
+from lauda.safety import PressureWatchdog
+from lauda.status import StatusModel
+from lauda.transport import FramedSerial
 
 def resource_path(relative_path):
     """ Get absolute path to resource, works for dev and for PyInstaller """
@@ -38,6 +54,13 @@ def resource_path(relative_path):
 
     return os.path.join(base_path, relative_path)
 
+def attach_simulator(devices, model=None, **link):
+    """Connect the device manager to the offline LAUDA and pressure simulators."""
+    lauda_port, pressure_port, model = simulated_ports(model, link, link)
+    devices.attach(LAUDA, FramedSerial(lauda_port))
+    devices.attach(PRESSURE, FramedSerial(pressure_port, encoding='ISO-8859-1'))
+    return model
+
 class SplashScreen(QDialog):
     def __init__(self):
         super().__init__()
@@ -125,7 +148,8 @@ class ChecklistWindow(QDialog):
 
         layout = QVBoxLayout()
 
-        label = QLabel("Checkliste", self)
+        # Im ReactorsWindow eine Checkliste je Reaktor
+        label = QLabel("Checkliste" if mainWindow.name is None else f"Checkliste {mainWindow.name}", self)
         label.setFont(QFont("Arial", 18))
         label.setAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignHCenter)
 
@@ -183,6 +207,7 @@ class SerialPortGui(QDialog):
         super().__init__()
 
         self.mainWindow = mainWindow
+        self.devices = mainWindow.devices
 
         self.setWindowTitle("Serial Port")
         self.setFixedSize(500, 400)
@@ -214,6 +239,7 @@ class SerialPortGui(QDialog):
         self.lauda_port_combobox = QComboBox()
         self.lauda_port_combobox.addItems(
             ['COM3','COM2','COM1','COM4'])
+        self.lauda_port_combobox.setEditable(True)  # z.B. /dev/pts/N des Simulators
 
         self.lauda_baudrate_combobox = QComboBox()
         self.lauda_baudrate_combobox.addItems(['9600', '4800'])
@@ -238,6 +264,7 @@ class SerialPortGui(QDialog):
         self.pressure_port_combobox = QComboBox()
         self.pressure_port_combobox.addItems(
             ['COM4', 'COM3', 'COM2', 'COM1'])
+        self.pressure_port_combobox.setEditable(True)
 
         self.pressure_baudrate_combobox = QComboBox()
         self.pressure_baudrate_combobox.addItems(['9600','4800'])
@@ -275,6 +302,14 @@ class SerialPortGui(QDialog):
         message = f"{group_name} - {error_message}"
         self.display_message(message)
 
+    @staticmethod
+    def modem_lines_ok(port, *lines):
+        try:
+            return all(getattr(port, line) for line in lines)
+        except OSError:
+            # Pseudo-Terminals (z.B. der Simulator unter Linux) haben keine Steuerleitungen
+            return True
+
     def connect_button_clicked(self):
         selected_radio_button = None
         self.connection_status_temp = False  # Hinzugefügte Variable, um den Verbindungsstatus zu verfolgen
@@ -300,17 +335,18 @@ class SerialPortGui(QDialog):
                     # Implement the connection logic based on the selected_group
                     if selected_group == "RS 232 C LAUDA":
                         try:
-                            global ser
-                            if ser and ser.is_open and i == 0:
-                                    self.display_error_message("Lauda Thermostat already connected:", ser.name)
+                            if self.devices.is_connected(LAUDA) and i == 0:
+                                    self.display_error_message("Lauda Thermostat already connected:",
+                                                               self.devices.name(LAUDA))
 
-                            if not ser:
-                                ser = serial.Serial(lauda_port, baudrate=lauda_baudrate, bytesize=8,
-                                                    parity=serial.PARITY_NONE,
-                                                    stopbits=2, timeout=1)
+                            if not self.devices.is_connected(LAUDA):
+                                port = serial.Serial(lauda_port, baudrate=lauda_baudrate, bytesize=8,
+                                                     parity=serial.PARITY_NONE,
+                                                     stopbits=2, timeout=1)
+                                self.devices.attach(LAUDA, FramedSerial(port))
 
                                 # Überprüfen, ob die Verbindung erfolgreich war
-                                if all([ser.is_open, ser.dtr, ser.rts, ser.cts]):
+                                if port.is_open and self.modem_lines_ok(port, 'dtr', 'rts', 'cts'):
                                     self.display_message("Connection to Lauda Thermostat established")
                                     self.connection_status_temp = True
 
@@ -323,16 +359,16 @@ class SerialPortGui(QDialog):
                         self.connection_status = False
 
                         try:
-                            global ser_p
-                            if ser_p:
-                                if ser_p.is_open:
-                                    self.display_error_message("Pressure Transducer already connected:", self.ser_p.name)
+                            if self.devices.is_connected(PRESSURE):
+                                self.display_error_message("Pressure Transducer already connected:",
+                                                           self.devices.name(PRESSURE))
 
-                            if not ser_p:
-                                ser_p = serial.Serial(pressure_port, baudrate=pressure_baudrate, timeout=1)
+                            if not self.devices.is_connected(PRESSURE):
+                                port = serial.Serial(pressure_port, baudrate=pressure_baudrate, timeout=1)
+                                self.devices.attach(PRESSURE, FramedSerial(port, encoding='ISO-8859-1'))
 
                                 # Überprüfen, ob die Verbindung erfolgreich war
-                                if all([ser_p.is_open, ser_p.dtr, ser_p.rts]):
+                                if port.is_open and self.modem_lines_ok(port, 'dtr', 'rts'):
                                     self.display_message("Connection to Pressure transducer established")
                                     self.connection_status_pres = True
 
@@ -348,35 +384,96 @@ class SerialPortGui(QDialog):
         self.accept()
 
     def disconnect_button_clicked(self):
-        global ser
-        global ser_p
+        disconnected = self.devices.disconnect()
 
-        if ser:
-            ser.close()
-            ser = None
+        if LAUDA in disconnected:
             self.display_message("Disconnect button clicked for Lauda.")
-        if ser_p:
-            ser_p.close()
-            ser_p = None
+        if PRESSURE in disconnected:
             self.display_message("Disconnect button clicked for Pressure.")
 
         self.accept()
 
 
+class RunLoader(QThread):
+    """Loads a recorded run in the background for the viewer mode.
+
+    loaded delivers the file path, the run as StaticSeries and its MinMaxPyramid."""
+    progressChanged = pyqtSignal(int)  # Prozent
+    loaded = pyqtSignal(str, object, object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, filepath, parent=None):
+        super().__init__(parent)
+        self.filepath = filepath
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        try:
+            columns = load_run(self.filepath, self.reportProgress, lambda: self.cancelled)
+        except LoadCancelled:
+            return
+        except (OSError, ValueError) as e:
+            self.failed.emit(str(e))
+            return
+        # Min/Max-Historie ebenfalls im Hintergrund aufbauen
+        history = MinMaxPyramid()
+        history.extend_columns(columns)
+        if not self.cancelled:
+            self.loaded.emit(self.filepath, StaticSeries(columns), history)
+
+    def reportProgress(self, done, total):
+        self.progressChanged.emit(int(100 * done / total) if total else 100)
+
+
+class CatalogIndexer(QThread):
+    """Runs index_directory in the background for the runs browser."""
+    progressChanged = pyqtSignal(int, int)
+    indexed = pyqtSignal(int)
+
+    def __init__(self, directory, path=CATALOG_PATH, parent=None):
+        super().__init__(parent)
+        self.directory = directory
+        self.path = path
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        try:
+            count = index_directory(self.directory, self.path, progress=self.progressChanged.emit,
+                                    cancelled=lambda: self.cancelled)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Error indexing {self.directory}: {e}")
+            count = 0
+        self.indexed.emit(count)
+
+
 class MainWindow(QMainWindow):
-    def __init__(self, parent=None):
+    recordingFailed = pyqtSignal(str)  # Fehler des Recorders, aus dessen Thread gesendet
+
+    def __init__(self, parent=None, name=None):
         super().__init__(parent)
+        # Name des Reaktors, wenn mehrere Reaktoren in einem ReactorsWindow laufen
+        self.name = name
+        self.title = name or "LAUDA Thermostat"
+        # Besitzt beide seriellen Verbindungen, alle Zugriffe laufen über dessen Warteschlange
+        self.devices = DeviceManager()
         self.initializeUI()
 
 
     def initializeUI(self):
-        self.setWindowTitle("LAUDA Thermostat")
+        self.setTitle()
         self.setMinimumSize(1000, 550)
         self.initializePlot()
         self.setUpMainWindow()
         self.createMenu()
-        global ser
-        global ser_p
+
+    def setTitle(self, detail=None):
+        self.setWindowTitle(f"{self.title} - {detail}" if detail else self.title)
 
     def initializePlot(self):
         self.plot_widget = pg.PlotWidget()
@@ -384,33 +481,87 @@ class MainWindow(QMainWindow):
         self.plot_widget.showGrid(x=True, y=True, alpha=0.3)
         self.plot_widget.setLabel('left', 'Temperature [°C] and Pressure [bar]')
         self.plot_widget.setLabel('bottom', 'time')
-        # Deaktivieren der horizontalen Verschiebung für die x-Achse
-        self.plot_widget.getViewBox().setMouseEnabled(x=False)
+        # Zoomen und Verschieben entlang der Zeitachse über die gesamte Laufhistorie
+        self.plot_widget.getViewBox().setMouseEnabled(x=True)
 
         self.plot_widget.setLimits(yMin=0, yMax=None)
 
-        self.max_data_points = 2000  # Beispiel: Maximal 2000 Datenpunkte
-
-        # Initialisieren des Ringpuffers für Daten mit deque
-        self.time = collections.deque(maxlen=self.max_data_points)
-        self.Ti = collections.deque(maxlen=self.max_data_points)
-        self.T1 = collections.deque(maxlen=self.max_data_points)
-        self.Ts = collections.deque(maxlen=self.max_data_points)
-        self.p = collections.deque(maxlen=self.max_data_points)
-
-        self.serial_thread = SerialThread()
-        self.serial_thread.dataReceived.connect(self.update_data)
+        # Ringpuffer für die Zeit und alle Messkanäle, ausgelegt auf buffer_hours. Der zusammengeführte
+        # Strom liefert ein Sample je Thermostat-Zyklus und je Druckwert (im Simulator etwa 27/s);
+        # liefern die Geräte mehr, vergrößert fitBuffer den Puffer nach der gemessenen Rate
+        self.buffer_hours = 2
+        self.samples_per_second = 30
+        self.max_samples_per_second = 100  # Obergrenze für fitBuffer
+        self.buffer = RingBuffer.for_duration(self.buffer_hours, self.samples_per_second)
+        self.max_data_points = self.buffer.capacity
+        # Min/Max-Historie des gesamten Laufs, aus der je nach Zoom die passende Auflösung gezeichnet wird
+        self.history = MinMaxPyramid()
+        self.rendered_x_range = None
+        # Ansicht eines geöffneten Laufs (StaticSeries, MinMaxPyramid), None = Live-Daten
+        self.view_data = None
+        self.runLoader = None
+
+        # Messwerte blockweise alle 200 ms statt einzeln an die GUI liefern (0 = jeden Messwert einzeln)
+        self.batch_interval = 0.2
+        # Überdruckschutz im Druck-Erfassungsthread: Programm stoppen und Ts auf 30 °C setzen
+        self.watchdog = PressureWatchdog(self.devices)
+        self.live_acquisition = Acquisition(self.devices, batch_interval=self.batch_interval, watchdog=self.watchdog)
+        self.live_acquisition.warning.connect(self.display_message)
+        self.recordingFailed.connect(self.display_message)
+        # Start/Stopp von Programm und Erfassung als Zustandsautomat, ohne auf Geräte oder Threads zu warten
+        self.control = ProgramControl(self.devices, self.live_acquisition, self)
+        self.control.stateChanged.connect(self.programStateChanged)
+        self.control.programStarted.connect(self.programStarted)
+        self.control.programStopped.connect(self.programStopped)
+        self.control.commandFailed.connect(self.programCommandFailed)
+        self.sources = []
+        self.setAcquisition(self.live_acquisition)
+
+        # Plot und Anzeigen werden mit fester Bildrate gezeichnet, unabhängig von der Abtastrate
+        self.frame_rate = 10  # Bilder pro Sekunde
+        self.idle_frame_rate = 1  # Bilder pro Sekunde, wenn das Fenster minimiert oder verborgen ist
+        self.frame_pending = False
+        self.latest_sample = None
+        self.render_timer = QTimer(self)
+        self.render_timer.timeout.connect(self.renderFrame)
+        self.updateFrameRate()
+        self.render_timer.start()
 
         self.plot_widget.addLegend()
         self.plot_widget.setAxisItems({'bottom': pg.DateAxisItem()})
+        # Die vier Kurven und die Legende werden einmal angelegt und danach nur noch mit setData aktualisiert
+        # (NaN = veralteter Wert, Lücke im Plot)
+        self.curves = {
+            'Ti': self.plot_widget.plot(pen='#009999', name='Ti', connect='finite'),
+            'T1': self.plot_widget.plot(pen={'color': 'r', 'width': 2}, name='T1', connect='finite'),
+            'Ts': self.plot_widget.plot(pen='#33FF33', name='Ts', connect='finite'),
+            'p': self.plot_widget.plot(pen={'color': 'b', 'width': 2}, name='p', connect='finite'),
+        }
+        for curve in self.curves.values():
+            # Nur den sichtbaren Bereich zeichnen, bei mehr Punkten als Pixeln Min/Max je Pixel (Spitzen bleiben sichtbar)
+            curve.setClipToView(True)
+            curve.setDownsampling(auto=True, method='peak')
         self.receiving = False
 
     def setUpMainWindow(self):
 
         self.filepath = ''
-        self.running = False
+        # Aufzeichnung (CSV oder *.lrun) wird im Hintergrund geschrieben: flush jede Sekunde, fsync bei jedem zehnten flush
+        self.recorder = None
+        self.record_flush_interval = 1.0
+        self.record_fsync_every = 10
+        # Markiert die laufende Aufzeichnung, damit ein abgebrochener Lauf beim nächsten Start fortgesetzt werden kann
+        self.journal = RunJournal(journal_path(self.name))
+        self.run_started = None
+        # Zusammenfassung jedes Laufs im Lauf-Katalog, vom Recorder-Thread fortlaufend aktualisiert
+        self.catalog_path = CATALOG_PATH
+        # Verbindung zum Erfassungs-Daemon (lauda_daemon.py), None = Erfassung im GUI-Prozess
+        self.daemon = None
+        # Laufende Wiedergabe (Replay), None = Live-Erfassung
+        self.replay = None
         self.pressure_exceeded = False
-        self.statusWindow = StatusWindow()
+        self.status = StatusModel(self)
+        self.statusWindow = StatusWindow(self.status)
 
         main_layout = QVBoxLayout()
 
@@ -438,56 +589,91 @@ class MainWindow(QMainWindow):
         central_widget.setLayout(main_layout)
         self.setCentralWidget(central_widget)
 
+    def setAcquisition(self, source):
+        # Live-Erfassung oder Wiedergabe einer Aufzeichnung, beide mit der Schnittstelle von Acquisition
+        self.acquisition = source
+        live = source is self.live_acquisition
+        # Nur die Live-Erfassung steuert den Thermostat; eine Wiedergabe läuft an ProgramControl vorbei
+        if live:
+            self.control.setSource(self.devices, source)
+            if source in self.sources:
+                return
+            self.sources.append(source)
+        source.tripped.connect(self.pressureTripped if live else self.replayTripped)
+        if self.batch_interval > 0:
+            source.batchReceived.connect(self.update_batch)
+        else:
+            source.sampleReceived.connect(self.update_data)
+
     def start_data_receiving(self):
-        if not ser:
+        if not self.devices.is_connected(LAUDA):
             self.display_message("No connection to LAUDA Thermostat!")
+            return
 
-        sign = ''
-
-        if ser:
+        if not self.control.isActive():
             if not self.pressure_exceeded:
                 current_time = QDateTime.currentDateTime().toString("hh:mm:ss")
                 self.start_time = time.time()
                 self.start_line_edit.setText(current_time)
+            if self.view_data is not None:
+                self.closeRun()
+        # START und das Anlaufen der Erfassung laufen im Hintergrund, die Anzeige folgt programStateChanged
+        start_args = self.runProgram() if self.acquisition is self.daemon else ()
+        self.control.start(self.program_radio_button.isChecked(), start_args)
+
+    def programStateChanged(self, state):
+        if state == STARTING:
+            self.receiving = True
+            self.start_button.setObjectName("startbutton")
+            self.setRestriction()
+
+        elif state == PROGRAM:
+            self.receiving = True
+            self.start_button.setObjectName("startbutton")
+            self.setRestriction()
+            self.start_button.setText("Programm...")
+            self.buttonStyle()
+            self.no_program_radio_button.setEnabled(False)
+            if self.filepath != '':
+                # Hier wird der Start-Button auf Grün und der Text auf "Saving..." geändert
+                self.start_button.setText("Programm saving")
 
+        elif state == MONITORING:
+            self.receiving = True
             self.start_button.setObjectName("startbutton")
-            if self.program_radio_button.isChecked():
-                self.running = False
-                ser.flushInput()
-                ser_p.flushInput()
-                ser.write(b'START\r\n')
-                sign = ser.readline().decode().strip()
-                time.sleep(1)
-                ser.flushInput()
-                self.setRestriction()
-                #print(sign)
-
-            if self.no_program_radio_button.isChecked():
-                self.buttonStyle()
-                self.start_button.setText("No Programm")
-                self.setRestriction()
-                self.program_radio_button.setEnabled(False)
-                if self.filepath != '':
-                    self.start_button.setText("Saving...")
-
-            if not self.receiving:
-                self.receiving = True
-                self.serial_thread.start()
-                self.running = True
-
-            if sign == 'OK' and not self.pressure_exceeded:
-                self.display_message("Programm started!")
-                self.start_button.setText("Programm...")
-                self.buttonStyle()
-                self.no_program_radio_button.setEnabled(False)
-                if self.filepath != '':
-                    # Hier wird der Start-Button auf Grün und der Text auf "Saving..." geändert
-                    self.start_button.setText("Programm saving")
-                    self.display_message("Programm started and recorded!")
-                    ser.flushInput()
-                    ser_p.flushInput()
-
-                self.running = True
+            self.no_program_radio_button.setChecked(True)
+            self.buttonStyle()
+            self.start_button.setText("No Programm")
+            self.setRestriction()
+            self.program_radio_button.setEnabled(False)
+            if self.filepath != '':
+                self.start_button.setText("Saving...")
+
+        elif state == STOPPING:
+            # Start erst wieder, wenn STOP bestätigt ist. Messwerte weiter annehmen und aufzeichnen:
+            # acquisition.stop() liefert noch den letzten Block, erst in idle ist die Erfassung beendet
+            current_time = QDateTime.currentDateTime().toString("hh:mm:ss")
+            self.stop_line_edit.setText(current_time)
+            if self.filepath != '' and not self.pressure_exceeded:
+                self.file = ''
+                self.display_message("Saving stopped!")
+            self.start_button.setText("Stopping...")
+            self.stop_button.setEnabled(False)
+
+        elif state == IDLE:
+            # Erst nach stopped der Erfassung: kein Block ist mehr unterwegs
+            self.receiving = False
+            self.closeRecording()
+            self.stop_button.setEnabled(True)
+            self.enable_buttons()
+
+    def programStarted(self):
+        if self.pressure_exceeded:
+            return
+        if self.filepath != '':
+            self.display_message("Programm started and recorded!")
+        else:
+            self.display_message("Programm started!")
 
     def setRestriction(self):
         self.start_button.setEnabled(False)
@@ -514,34 +700,23 @@ class MainWindow(QMainWindow):
         )
 
     def stop_data_receiving(self):
-        if self.receiving:
-            current_time = QDateTime.currentDateTime().toString("hh:mm:ss")
-            self.stop_line_edit.setText(current_time)
-            if self.filepath != '' and not self.pressure_exceeded:
-                self.file = ''
-                self.display_message("Saving stopped!")
-
-            if ser and self.program_radio_button.isChecked():
-                self.running = False
-                self.serial_thread.stop()
-                time.sleep(3)
-                ser.write(b'STOP\r\n')
-                sign = ser.readline().decode().strip()
-
-                if sign == 'OK' and not self.pressure_exceeded:
-                    self.display_message("Programm stopped!")
-                    ser.flushInput()
-                    ser_p.flushInput()
-
-
-        elif not ser:
+        if self.replay is not None:
+            self.replayFinished()
+        elif self.control.isActive():
+            # STOP und das Beenden der Erfassungsthreads laufen im Hintergrund
+            self.control.stop()
+        elif not self.devices.is_connected(LAUDA):
             self.display_message("Not connected to LAUDA Thermostat")
 
-        if self.receiving:
-            self.receiving = False
-            self.serial_thread.stop()
-            self.running = False
-            self.enable_buttons()  # Rufen Sie die Funktion auf, um die Buttons zu aktivieren und Stile zurückzusetzen
+    def programStopped(self):
+        if not self.pressure_exceeded:
+            self.display_message("Programm stopped!")
+
+    def programCommandFailed(self, command, reply):
+        if command == 'START':
+            self.display_message(f"Programm could not be started ({reply or 'no reply'})!")
+        else:
+            self.display_message(f"STOP not confirmed by LAUDA Thermostat ({reply or 'no reply'})!")
 
     def enable_buttons(self):
         self.start_button.setEnabled(True)
@@ -560,100 +735,239 @@ class MainWindow(QMainWindow):
         self.start_button.setText("Start")
 
     def reset_pressure_exceeded(self):
+        # Dateipfad bleibt erhalten, damit derselbe Lauf nach dem Reset weiter aufgezeichnet werden kann
         self.pressure_exceeded = False
-        self.filepath = ''
+        self.watchdog.reset()
+        if self.daemon is not None:
+            self.daemon.reset()
         self.start_line_edit.setText('Process startet...')
         self.stop_line_edit.setText('Process stopped...')
 
-    def checkHighP(self, p):
-        if p > 50 and not self.pressure_exceeded:  # Nur wenn der Druck zum ersten Mal den Schwellenwert überschreitet            self.pressure_exceeded = True  # Setzen Sie den Zustand auf True, um zu verhindern, dass dies erneut ausgeführt wird
-            self.pressure_exceeded = True
-            self.stop_data_receiving()
-            ser.write(b'OUT_30\r\n')
-            out = ser.readline().decode().strip()
-            if out == 'OK':
-                self.no_program_radio_button.setChecked(True)
-                self.start_data_receiving()
-                self.display_message("Programm stopped and Ts reset to 30 °C due to pressure > 50 bar!")
-
-    def update_data(self, Ti, T1, Ts, p, status_sign, Tu, To, Xp, Tn, Tv):
+    def pressureTripped(self, trip):
+        # STOP und OUT_30 hat der Watchdog (oder der Daemon) bereits gesendet, die Erfassung läuft weiter;
+        # hier nur noch die Anzeige auf "No Programm" umstellen
+        if self.pressure_exceeded:
+            return
+        self.pressure_exceeded = True
+        self.stop_line_edit.setText(datetime.fromtimestamp(trip.t).strftime("%H:%M:%S"))
+        self.no_program_radio_button.setChecked(True)
+        self.control.abortProgram()
+        self.display_message(f"Programm stopped and Ts reset to 30 °C due to {trip.describe()}!")
+
+    def update_data(self, sample):
+        self.update_batch(SampleBatch([sample]))
+
+    def update_batch(self, batch):
         if self.receiving:
-            # Fügen Sie neue Daten an den Ringpuffer an
-            self.time.append(time.time())
-            self.Ti.append(Ti)
-            self.T1.append(T1)
-            self.Ts.append(Ts)
-            self.p.append(p)
-
-            self.checkHighP(p)
-
-            # Aktualisieren Sie den Plot mit dem Ringpuffer
-            self.update_plot()
-            self.updateStatusInfo(status_sign, Tu, To, Xp, Tn, Tv)
-            # Update digital output
-            self.ti_edit.setText(str(Ti))
-            self.t1_edit.setText(str(T1))
-            self.ts_edit.setText(str(Ts))
-            self.p_edit.setText(str(p))
-
-            # Erstellen Sie ein neues Datenobjekt für den CSV-Speicher
-            new_data = {"time": [datetime.now()], "Ti": [Ti], "T1": [T1], "Ts": [Ts], "p": [p]}
+            # Fügen Sie neue Daten an den Ringpuffer an (Zeitstempel aus dem Erfassungsthread)
+            self.buffer.extend(batch)
+            self.fitBuffer()
+            self.history.extend(batch)
+
+            # Mit angebundenem Daemon zeichnet dieser auf; eine Wiedergabe wird nicht aufgezeichnet,
+            # sonst würde sie an die Datei des letzten Laufs (oder an die wiedergegebene) angehängt
+            local = self.acquisition is not self.daemon and self.replay is None
+
+            # Plot, Status und Anzeige zeichnet renderFrame mit fester Bildrate
+            self.latest_sample = batch.last()
+            self.frame_pending = True
 
             # Speichern Sie neue Daten in der CSV-Datei
-            if self.filepath != '':
-                self.saveCSV(new_data, self.filepath)
+            if self.filepath != '' and local:
+                self.saveSamples(batch.samples, self.filepath)
+
+    def fitBuffer(self):
+        # Voll, bevor buffer_hours abgedeckt sind: auf die gemessene Rate (+10 %) vergrößern
+        buffer = self.buffer
+        if buffer.count < buffer.capacity:
+            return
+        t = buffer.view('t')
+        span = t[-1] - t[0]
+        duration = self.buffer_hours * 3600
+        if span <= 0 or span >= 0.95 * duration:
+            return
+        rate = min((buffer.count - 1) / span * 1.1, self.max_samples_per_second)
+        capacity = int(duration * rate)
+        if capacity > buffer.capacity:
+            buffer.resize(capacity)
+            self.max_data_points = capacity
+
+    def renderFrame(self):
+        # Nur neu zeichnen, wenn seit dem letzten Bild neue Daten eingetroffen sind oder gezoomt wurde
+        x_range = self.plot_widget.getViewBox().viewRange()[0]
+        if not self.frame_pending and x_range == self.rendered_x_range:
+            return
+        self.frame_pending = False
+        self.rendered_x_range = x_range
+        self.update_plot()
+        sample = self.latest_sample
+        if sample is None:
+            return
+        self.updateStatusInfo(sample.status_sign, sample.Tu, sample.To, sample.Xp, sample.Tn, sample.Tv)
+        # Update digital output (veraltete oder ungültige Werte werden nicht angezeigt)
+        self.ti_edit.setText(self.displayValue(sample, 'Ti'))
+        self.t1_edit.setText(self.displayValue(sample, 'T1'))
+        self.ts_edit.setText(self.displayValue(sample, 'Ts'))
+        self.p_edit.setText(self.displayValue(sample, 'p'))
+
+    def updateFrameRate(self):
+        # Minimiert oder verborgen nur noch selten zeichnen
+        visible = self.isVisible() and not self.isMinimized()
+        frame_rate = self.frame_rate if visible else self.idle_frame_rate
+        self.render_timer.setInterval(int(1000 / frame_rate))
+
+    def setFrameRate(self, frame_rate):
+        self.frame_rate = frame_rate
+        self.updateFrameRate()
+
+    def changeEvent(self, event):
+        if event.type() == QEvent.Type.WindowStateChange:
+            self.updateFrameRate()
+        super().changeEvent(event)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.updateFrameRate()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.updateFrameRate()
+
+    @staticmethod
+    def displayValue(sample, name):
+        return str(getattr(sample, name)) if sample.fresh(name) else '---'
 
     def update_plot(self):
-        # Umwandlung von deque in eine Liste für die Verwendung in der Visualisierung
-        time_data = list(self.time)
-        Ti_data = list(self.Ti)
-        T1_data = list(self.T1)
-        Ts_data = list(self.Ts)
-        p_data = list(self.p)
-
-        # Aktualisieren Sie den Plot mit den Daten im Ringpuffer
-        self.plot_widget.clear()
-        self.plot_widget.plot(time_data, Ti_data, pen='#009999', name='Ti')
-        self.plot_widget.plot(time_data, T1_data, pen={'color': 'r', 'width': 2}, name='T1')
-        self.plot_widget.plot(time_data, Ts_data, pen='#33FF33', name='Ts')
-        self.plot_widget.plot(time_data, p_data, pen={'color': 'b', 'width': 2}, name='p')
+        # Sichtbarer Zeitbereich, bei automatischer Skalierung der gesamte Lauf
+        view_box = self.plot_widget.getViewBox()
+        if view_box.autoRangeEnabled()[0]:
+            x0, x1 = -np.inf, np.inf
+        else:
+            x0, x1 = view_box.viewRange()[0]
 
-    def updateStatusInfo(self, status_sign, Tu, To, Xp, Tn, Tv):
+        # Rohwerte aus dem Ringpuffer (Sichten, keine Kopie) oder Min/Max-Stufe der Historie, höchstens zwei Punkte je Pixel
+        series, history = self.view_data or (self.buffer, self.history)
+        time_data, values = history.select(x0, x1, 2 * max(self.plot_widget.width(), 500), raw=series)
+        for name, curve in self.curves.items():
+            curve.setData(time_data, values[name])
 
-        status_info = [
-            "Störung" if int(status_sign[0]) else "Keine Störung",
-            "Störung" if int(status_sign[1]) else "Niveau o.k.",
-            "Läuft" if int(status_sign[2]) else "AUS",
-            f"{int(status_sign[3])}",
-            "Vorgegeben" if int(status_sign[4]) else "Analogeingänge AUS",
-            "Angeschlossen" if int(status_sign[5]) else "Nicht angeschlossen",
-            "Angeschlossen" if int(status_sign[6]) else "Nicht angeschlossen"
-        ]
-        # Anpassung basierend auf den Bedingungen
-        if int(status_sign[3]) == 0:
-            status_info[3] = "Ti (Vorlauf)"
-        elif int(status_sign[3]) == 1:
-            status_info[3] = "T1 (im Reaktor)"
-        elif int(status_sign[3]) == 2:
-            status_info[3] = "T2"
+    def updateStatusInfo(self, status_sign, Tu, To, Xp, Tn, Tv):
+        # Das Statusmodell meldet nur Änderungen, das Statusfenster übernimmt sie nur, wenn es sichtbar ist
+        self.status.update(status_sign, Tu, To, Xp, Tn, Tv)
+
+    def saveSamples(self, samples, filepath):
+        # Schreiben übernimmt der Recorder im Hintergrund (CSV oder *.lrun je nach Dateiendung);
+        # bei neuem Dateipfad wird die alte Datei geschlossen
+        if self.recorder is None or self.recorder.filepath != filepath:
+            self.closeRecording()
+            if self.run_started is None:
+                self.run_started = time.time()
+            try:
+                self.journal.begin(filepath, started=self.run_started, program=self.program_radio_button.isChecked())
+            except OSError as e:
+                print(f"Error writing run journal: {e}")
+            self.recorder = recorder_for(filepath, self.record_flush_interval, self.record_fsync_every,
+                                         self.runSummary(filepath), self.catalog_path, self.recordingFailed.emit)
+        self.recorder.write(samples)
+
+    def runSummary(self, filepath):
+        # Wird in dieselbe Datei weiter aufgezeichnet (Fortsetzen, Reset nach Überdruck), die Statistik fortführen
+        try:
+            catalog = RunCatalog(self.catalog_path)
+            row = catalog.get(filepath)
+            catalog.close()
+        except (OSError, sqlite3.Error) as e:
+            print(f"Error reading run catalog: {e}")
+            row = None
+        if row is not None and os.path.exists(filepath):
+            return RunSummary.from_row(row)
+        return RunSummary(filepath, *self.runProgram())
+
+    def runProgram(self):
+        # Programm und Toleranzband für den Lauf-Katalog
+        if self.program_radio_button.isChecked():
+            return read_program(resource_path(r'res\programm_data.csv'))
+        return "No Program", DEFAULT_TOLERANCE_BAND
+
+    def closeRecording(self, timeout=None):
+        # Ohne timeout wird nicht gewartet, der Recorder schreibt die restlichen Daten selbstständig
+        if self.recorder is not None:
+            self.recorder.close()
+            if timeout is not None:
+                self.recorder.join(timeout)
+            self.recorder = None
+            # Sauber beendet: beim nächsten Start nichts fortzusetzen
+            self.journal.finish()
+            self.run_started = None
+
+    def offerResume(self):
+        info = self.journal.pending()
+        if info is None:
+            return
+        started = datetime.fromtimestamp(info['started']).strftime("%Y-%m-%d %H:%M:%S")
+        reply = QMessageBox.question(self, 'Resume run',
+                                     f"The recording {info['filepath']} (started {started}) was not finished.\n"
+                                     f"Resume this run?",
+                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        if reply == QMessageBox.StandardButton.Yes:
+            self.resumeRun(info['filepath'], info['started'])
+        else:
+            self.journal.finish()
 
-        for i in range(7):
-            self.statusWindow.status_edits[i].setText(status_info[i])
-
-        self.statusWindow.parameter_edits[0].setText(str(Tu))
-        self.statusWindow.parameter_edits[1].setText(str(To))
-        self.statusWindow.parameter_edits[2].setText(str(Xp))
-        self.statusWindow.parameter_edits[3].setText(str(Tn))
-        self.statusWindow.parameter_edits[4].setText(str(Tv))
-
-    def saveCSV(self, new_data, filepath):
-        with open(filepath, 'a', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow([new_data['time'][0].strftime("%Y-%m-%d %H:%M:%S"),
-                             new_data['Ti'][0],
-                             new_data['T1'][0],
-                             new_data['Ts'][0],
-                             new_data['p'][0]])
+    def resumeRun(self, filepath, started=None):
+        # Nur das Ende der Aufzeichnung lesen, um Ringpuffer und Plot zu füllen; weitere Daten werden angehängt
+        try:
+            columns = read_tail(filepath, self.buffer.capacity)
+        except (OSError, ValueError) as e:
+            self.display_message(f"Run could not be resumed: {e}")
+            return
+        self.buffer.clear()
+        self.buffer.extend_columns(columns)
+        self.history.clear()
+        self.history.extend_columns(columns)
+        self.frame_pending = True
+        self.filepath = filepath
+        self.run_started = started
+        self.display_message(f"Run resumed, recording continues in {filepath} after Start.")
+
+    def attachDaemon(self, name=DEFAULT_SOCKET):
+        """Use the acquisition daemon instead of the serial ports of this process."""
+        link = DaemonLink(name, self)
+        if not link.connectToDaemon():
+            self.display_message(f"No acquisition daemon running on {name}")
+            return False
+        self.devices = RemoteDevices(link)
+        self.daemon = RemoteAcquisition(link, self)
+        self.daemon.stateChanged.connect(self.daemonStateChanged)
+        link.disconnected.connect(self.daemonDisconnected)
+        self.live_acquisition = self.daemon
+        self.setAcquisition(self.daemon)
+        self.setTitle(name)
+        return True
+
+    def daemonStateChanged(self, state):
+        self.filepath = state['filepath']
+        self.pressure_exceeded = state['pressure_exceeded']
+        # Der Dialog "Pressure safety" zeigt die Grenzwerte des Daemons
+        self.watchdog.configure(state['pressure_limit'], state['max_rise'], state['rise_window'])
+        # Erfassung vom Daemon oder einem anderen GUI gestartet bzw. beendet
+        if state['receiving'] and not self.control.isActive() and self.view_data is not None:
+            self.closeRun()
+        self.control.sync(state['receiving'], state['program'] not in (None, "No Program"))
+
+    def daemonDisconnected(self):
+        self.control.reset()
+        self.display_message("Connection to the acquisition daemon lost!")
+
+    def closeEvent(self, event):
+        # Eigene Erfassung beenden (z.B. ein Reaktor im ReactorsWindow); ein Daemon erfasst weiter
+        if self.replay is not None:
+            self.replayFinished()
+        if self.acquisition is not self.daemon:
+            self.acquisition.stop()
+        # Beim Beenden die noch ausstehenden Daten sicher auf die Platte bringen
+        self.closeRecording(timeout=5.0)
+        super().closeEvent(event)
 
     def createMenu(self):
         self.menuBar = self.menuBar()
@@ -684,6 +998,10 @@ class MainWindow(QMainWindow):
         self.programmeingabeAction.triggered.connect(self.openNewProgrammDialog)
         self.settingsMenu.addAction(self.programmeingabeAction)
 
+        self.pressureSafetyAction = QAction("Pressure safety...", self)
+        self.pressureSafetyAction.triggered.connect(self.openPressureSafetyDialog)
+        self.settingsMenu.addAction(self.pressureSafetyAction)
+
         # File menu
         self.fileMenu = self.menuBar.addMenu("&File")
         self.save = QAction("Save", self)
@@ -691,6 +1009,25 @@ class MainWindow(QMainWindow):
         self.save.triggered.connect(self.showSaveFile)
         self.fileMenu.addAction(self.save)
 
+        self.openRunAction = QAction("Open run...", self)
+        self.openRunAction.setShortcut("Ctrl+O")
+        self.openRunAction.triggered.connect(self.openRun)
+        self.fileMenu.addAction(self.openRunAction)
+
+        self.closeRunAction = QAction("Close run", self)
+        self.closeRunAction.triggered.connect(self.closeRun)
+        self.closeRunAction.setEnabled(False)
+        self.fileMenu.addAction(self.closeRunAction)
+
+        self.replayAction = QAction("Replay run...", self)
+        self.replayAction.triggered.connect(self.openReplay)
+        self.fileMenu.addAction(self.replayAction)
+
+        self.runsAction = QAction("Runs...", self)
+        self.runsAction.setShortcut("Ctrl+F")
+        self.runsAction.triggered.connect(self.openRunsBrowser)
+        self.fileMenu.addAction(self.runsAction)
+
         # Information menu
         self.infoMenu = self.menuBar.addMenu("&Information")
         self.programmInfoAction = QAction("Programm Info", self)
@@ -718,7 +1055,8 @@ class MainWindow(QMainWindow):
 
         if reply == QMessageBox.StandardButton.Yes:
             if self:
-                self.close()
+                # Mit mehreren Reaktoren das ganze ReactorsWindow schließen
+                self.window().close()
 
             try:
                 self.mainWindow.close()
@@ -750,7 +1088,7 @@ class MainWindow(QMainWindow):
 
     def showSaveFile(self):
         self.filename = ''
-        file_filter = 'Data File (*.csv)'
+        file_filter = f'Data File (*.csv);;Binary Run File (*{RUN_SUFFIX})'
         response = QFileDialog.getSaveFileName(
             parent=self,
             caption='Select a data file',
@@ -759,6 +1097,111 @@ class MainWindow(QMainWindow):
             initialFilter='Excel File (*.csv)'
         )
         self.filepath = response[0]
+        if self.daemon is not None:
+            self.daemon.record(self.filepath)
+
+    def openRun(self):
+        response = QFileDialog.getOpenFileName(
+            parent=self,
+            caption='Open a recorded run',
+            directory=r'C:\Users\Ivet17\OneDrive\Desktop\HTC_Process_Data',
+            filter=f'Recorded Run (*.csv *{RUN_SUFFIX})'
+        )
+        if response[0]:
+            self.loadRun(response[0])
+
+    def loadRun(self, filepath):
+        # Laden im Hintergrund mit Fortschrittsanzeige, abbrechbar
+        if self.runLoader is not None:
+            self.runLoader.cancel()
+        self.runLoader = RunLoader(filepath, self)
+        progress = QProgressDialog(f"Loading {os.path.basename(filepath)}...", "Cancel", 0, 100, self)
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(500)
+        self.runLoader.progressChanged.connect(progress.setValue)
+        self.runLoader.loaded.connect(self.showRun)
+        self.runLoader.failed.connect(lambda error: self.display_message(f"Run could not be opened: {error}"))
+        self.runLoader.finished.connect(progress.close)
+        progress.canceled.connect(self.runLoader.cancel)
+        self.runLoader.start()
+
+    def showRun(self, filepath, series, history):
+        # Gleicher Plot- und Dezimierungsweg wie bei Live-Daten
+        self.view_data = (series, history)
+        self.setTitle(os.path.basename(filepath))
+        self.closeRunAction.setEnabled(True)
+        self.plot_widget.getViewBox().enableAutoRange(x=True)
+        self.frame_pending = True
+
+    def openReplay(self):
+        response = QFileDialog.getOpenFileName(
+            parent=self,
+            caption='Replay a recorded run',
+            directory=r'C:\Users\Ivet17\OneDrive\Desktop\HTC_Process_Data',
+            filter=f'Recorded Run (*.csv *{RUN_SUFFIX})'
+        )
+        if not response[0]:
+            return
+        speed, ok = QInputDialog.getDouble(self, "Replay", "Speed (x real time, 0 = as fast as possible):",
+                                           1.0, 0.0, 100000.0, 1)
+        if ok:
+            self.replayRun(response[0], speed)
+
+    def replayRun(self, filepath, speed=1.0):
+        """Feed a recorded run through the acquisition path instead of the devices.
+
+        The replay never touches self.devices: neither START/STOP nor the OUT_30 of its
+        watchdog reach the connected thermostat. The replayed samples are not recorded."""
+        if self.control.isActive() or self.replay is not None:
+            self.display_message("Stop the acquisition before replaying a run!")
+            return
+        try:
+            replay = Replay(filepath, speed, self.batch_interval, self, self.watchdog.limit, self.watchdog.max_rise,
+                            self.watchdog.rise_window)
+        except (OSError, ValueError) as e:
+            self.display_message(f"Run could not be replayed: {e}")
+            return
+        self.replay = replay
+        replay.finished.connect(self.replayFinished)
+        self.setAcquisition(replay)
+        if self.view_data is not None:
+            self.closeRun()
+        # Die aufgezeichneten Zeitstempel liegen vor den Werten im Puffer
+        self.buffer.clear()
+        self.history.clear()
+        self.setTitle(f"Replay {os.path.basename(filepath)} ({f'{speed:g}x' if speed else 'max'})")
+        self.receiving = True
+        self.setRestriction()
+        self.start_button.setText("Replay...")
+        replay.start()
+
+    def replayTripped(self, trip):
+        # Nur anzeigen: der Watchdog der Wiedergabe hat STOP und OUT_30 an ihren Simulator gesendet
+        self.display_message(f"Replay: the pressure watchdog tripped at "
+                             f"{datetime.fromtimestamp(trip.t).strftime('%H:%M:%S')} due to {trip.describe()}!")
+
+    def replayFinished(self):
+        replay = self.replay
+        if replay is None:
+            return
+        self.replay = None
+        replay.close()
+        self.receiving = False
+        self.closeRecording()
+        self.enable_buttons()
+        self.setAcquisition(self.live_acquisition)
+        self.buffer.clear()
+        self.history.clear()
+        self.setTitle()
+        self.display_message("Replay finished!")
+
+    def closeRun(self):
+        # Zurück zur Live-Ansicht
+        self.view_data = None
+        self.setTitle()
+        self.closeRunAction.setEnabled(False)
+        self.plot_widget.getViewBox().enableAutoRange(x=True)
+        self.frame_pending = True
 
     def createtemperaturGroupbox(self):
         self.groupbox = QGroupBox("Temperaturen und Druck")
@@ -853,12 +1296,19 @@ class MainWindow(QMainWindow):
         self.serialPort= SerialPortGui(self)
         self.serialPort.exec()
 
+    def openPressureSafetyDialog(self):
+        self.pressureSafety = PressureSafetyDialog(self.watchdog, self)
+        if self.pressureSafety.exec() == QDialog.DialogCode.Accepted and self.daemon is not None:
+            self.daemon.configureSafety(self.watchdog.limit, self.watchdog.max_rise, self.watchdog.rise_window)
+
     def openReglerParameterWindow(self):
-        self.reglerParameter = ReglerParameterDialog()
-        self.reglerParameter.exec()
+        self.reglerParameter = ReglerParameterDialog(self.devices)
+        if self.reglerParameter.exec() == QDialog.DialogCode.Accepted:
+            # Neue Reglerparameter sofort statt erst nach Ablauf der Abfrageperiode anzeigen
+            self.acquisition.scheduler.invalidate(STATUS_CHANNELS + PARAMETER_CHANNELS)
 
     def openNewProgrammDialog(self):
-        self.newProgramm = NewProgramEnterDialog()
+        self.newProgramm = NewProgramEnterDialog(self.devices)
         self.newProgramm.exec()
 
     def openInfoProgrammDialog(self):
@@ -866,10 +1316,13 @@ class MainWindow(QMainWindow):
         self.infoProgramm.show()
 
     def openStatusWindow(self):
-        global ser
-        self.statusWindow = StatusWindow()
+        # Das vom Statusmodell gespeiste Fenster anzeigen, keine neue (nicht versorgte) Instanz
         self.statusWindow.exec()
 
+    def openRunsBrowser(self):
+        self.runsBrowser = RunsBrowser(self, self.catalog_path)
+        self.runsBrowser.show()
+
     def openHelpWindow(self):
         self.helpWindow = HelpWindow()
         self.helpWindow.show()
@@ -882,16 +1335,273 @@ class MainWindow(QMainWindow):
         msg_box.exec()
 
 
-class ReglerParameterDialog(QDialog):
+class ReactorsWindow(QMainWindow):
+    """Several reactors in one application: one MainWindow per reactor, each with its own
+    devices, acquisition, recorder and pressure limit, shown as tabs or tiled.
+
+    The reactors are drawn in turn by one shared timer, one reactor per tick, so their frames
+    do not coincide and block the event loop for all of them at once. A running reactor is
+    only closed after confirmation: its program is stopped and the tab closes once its
+    ProgramControl is idle, i.e. STOP is confirmed and both acquisition threads have finished."""
 
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.reactors = []
+        self.render_index = 0
+        self.skipped = {}  # Übersprungene Durchläufe verborgener Reaktoren
+        self.closing = []  # gestoppte Reaktoren, die sich schließen, sobald sie idle sind
+        self.quitting = False
+        self.frame_rate = 10  # Bilder pro Sekunde und Reaktor
+        self.render_timer = QTimer(self)
+        self.render_timer.timeout.connect(self.renderNext)
+        self.setWindowTitle("LAUDA Thermostat - Reactors")
+        self.resize(1400, 900)
+
+        self.mdiArea = QMdiArea()
+        self.mdiArea.setViewMode(QMdiArea.ViewMode.TabbedView)
+        self.mdiArea.setTabsClosable(True)
+        self.setCentralWidget(self.mdiArea)
+        self.createMenu()
+
+    def createMenu(self):
+        self.menuBar = self.menuBar()
+        self.menuBar.setNativeMenuBar(False)
+        self.reactorsMenu = self.menuBar.addMenu("&Reactors")
+
+        self.addReactorAction = QAction("Add reactor...", self)
+        self.addReactorAction.triggered.connect(lambda: self.askReactor(simulated=False))
+        self.reactorsMenu.addAction(self.addReactorAction)
+
+        self.addSimulatedAction = QAction("Add simulated reactor...", self)
+        self.addSimulatedAction.triggered.connect(lambda: self.askReactor(simulated=True))
+        self.reactorsMenu.addAction(self.addSimulatedAction)
+        self.reactorsMenu.addSeparator()
+
+        self.tabbedAction = QAction("Tabs", self)
+        self.tabbedAction.setCheckable(True)
+        self.tabbedAction.setChecked(True)
+        self.tabbedAction.triggered.connect(self.showTabbed)
+        self.reactorsMenu.addAction(self.tabbedAction)
+
+        self.tiledAction = QAction("Tiles", self)
+        self.tiledAction.setCheckable(True)
+        self.tiledAction.triggered.connect(self.showTiled)
+        self.reactorsMenu.addAction(self.tiledAction)
+
+        self.reactorsMenu.addSeparator()
+
+        self.quit = QAction("Quit all", self)
+        self.quit.setShortcut("Ctrl+Q")
+        self.quit.triggered.connect(self.close)
+        self.reactorsMenu.addAction(self.quit)
+
+    def askReactor(self, simulated):
+        name, ok = QInputDialog.getText(self, "Add reactor", "Name:", text=f"Reactor {len(self.reactors) + 1}")
+        if ok and name:
+            self.addReactor(name, simulated)
+
+    def addReactor(self, name, simulated=False):
+        """New reactor tab; its serial ports are connected in its own Settings > Serial Port dialog."""
+        window = MainWindow(name=name)
+        window.setMinimumSize(400, 300)
+        if simulated:
+            attach_simulator(window.devices)
+        subWindow = QMdiSubWindow()
+        subWindow.setWidget(window)
+        subWindow.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        subWindow.destroyed.connect(lambda: self.reactorClosed(window))
+        subWindow.installEventFilter(self)
+        window.control.stateChanged.connect(lambda state: self.reactorStateChanged(window, state))
+        self.mdiArea.addSubWindow(subWindow)
+        subWindow.show()
+        # Gemeinsamer Timer statt eines eigenen je Reaktor
+        window.render_timer.stop()
+        self.reactors.append(window)
+        self.updateRenderInterval()
+        if self.tiledAction.isChecked():
+            self.mdiArea.tileSubWindows()
+        window.offerResume()
+        return window
+
+    def isRunning(self, window):
+        # Mit angebundenem Daemon läuft die Erfassung dort weiter, der Reaktor kann jederzeit schließen
+        return window.daemon is None and window.control.isActive()
+
+    def eventFilter(self, subWindow, event):
+        if event.type() == QEvent.Type.Close and subWindow.widget() in self.reactors:
+            window = subWindow.widget()
+            if self.isRunning(window):
+                event.ignore()
+                self.stopReactor(window)
+                return True
+        return super().eventFilter(subWindow, event)
+
+    def stopReactor(self, window, ask=True):
+        if window in self.closing:
+            return
+        if ask and window.control.state != STOPPING:
+            reply = QMessageBox.question(self, 'Close reactor',
+                                         f"{window.name} is running. Stop it and close?",
+                                         QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+            if reply != QMessageBox.StandardButton.Yes:
+                return
+        self.closing.append(window)
+        window.control.stop()
+
+    def reactorStateChanged(self, window, state):
+        if state != IDLE or window not in self.closing:
+            return
+        self.closing.remove(window)
+        # Nicht innerhalb des Close-Events erneut schließen, das den Stopp ausgelöst hat
+        if self.quitting:
+            if not any(self.isRunning(reactor) for reactor in self.reactors):
+                QTimer.singleShot(0, self.close)
+        else:
+            QTimer.singleShot(0, window.parentWidget().close)
+
+    def reactorClosed(self, window):
+        # MainWindow.closeEvent hat Erfassung und Aufzeichnung beendet; Ports für einen neuen Reaktor freigeben
+        if window not in self.reactors:
+            return
+        self.reactors.remove(window)
+        self.skipped.pop(window, None)
+        self.updateRenderInterval()
+        if window.daemon is None:
+            # Erst trennen, wenn beide Threads beendet sind: getrennte Geräte brechen wartende Abfragen ab
+            for thread in (window.live_acquisition.thermostat, window.live_acquisition.pressure):
+                if not sip.isdeleted(thread):
+                    thread.wait()
+        window.devices.disconnect()
+
+    def updateRenderInterval(self):
+        # Beim Beenden der Anwendung kann der Timer vor den Unterfenstern gelöscht sein
+        if sip.isdeleted(self.render_timer):
+            return
+        if self.reactors:
+            self.render_timer.start(max(1, int(1000 / (self.frame_rate * len(self.reactors)))))
+        else:
+            self.render_timer.stop()
+
+    def renderNext(self):
+        if not self.reactors:
+            return
+        self.render_index = (self.render_index + 1) % len(self.reactors)
+        window = self.reactors[self.render_index]
+        # Verborgene Reaktoren (andere Tabs) nur mit ihrer Leerlauf-Bildrate zeichnen
+        if not self.isShown(window):
+            skipped = self.skipped.get(window, 0) + 1
+            if skipped < self.frame_rate / window.idle_frame_rate:
+                self.skipped[window] = skipped
+                return
+        self.skipped[window] = 0
+        window.renderFrame()
+
+    def isShown(self, window):
+        if not window.isVisible() or window.parentWidget().isMinimized():
+            return False
+        # Im Tab-Modus ist nur der aktuelle Reaktor zu sehen
+        if self.mdiArea.viewMode() == QMdiArea.ViewMode.TabbedView:
+            return window.parentWidget() is self.mdiArea.currentSubWindow()
+        return True
+
+    def showTabbed(self):
+        self.tabbedAction.setChecked(True)
+        self.tiledAction.setChecked(False)
+        self.mdiArea.setViewMode(QMdiArea.ViewMode.TabbedView)
+
+    def showTiled(self):
+        self.tabbedAction.setChecked(False)
+        self.tiledAction.setChecked(True)
+        self.mdiArea.setViewMode(QMdiArea.ViewMode.SubWindowView)
+        self.mdiArea.tileSubWindows()
+
+    def closeEvent(self, event):
+        running = [window for window in self.reactors if self.isRunning(window)]
+        if running:
+            # Laufende Reaktoren zuerst stoppen; reactorStateChanged schließt danach erneut
+            event.ignore()
+            if not self.quitting:
+                reply = QMessageBox.question(self, 'Quit',
+                                             f"{len(running)} reactor(s) running. Stop them and quit?",
+                                             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+                if reply != QMessageBox.StandardButton.Yes:
+                    return
+                self.quitting = True
+            for window in running:
+                self.stopReactor(window, ask=False)
+            return
+        # Jeder Reaktor beendet seine Erfassung und schließt seine Aufzeichnung
+        self.render_timer.stop()
+        for subWindow in self.mdiArea.subWindowList():
+            subWindow.destroyed.disconnect()
+        for window in list(self.reactors):
+            window.close()
+            self.reactorClosed(window)
+        super().closeEvent(event)
+
+
+class PressureSafetyDialog(QDialog):
+    """Thresholds of the pressure watchdog and the latencies of its last trip."""
+
+    def __init__(self, watchdog, parent=None):
+        super().__init__(parent)
+        self.watchdog = watchdog
+        self.setWindowTitle("Pressure safety")
+
+        layout = QFormLayout()
+        self.limit_spinbox = QDoubleSpinBox()
+        self.limit_spinbox.setRange(1.0, 400.0)
+        self.limit_spinbox.setSuffix(" bar")
+        self.limit_spinbox.setValue(watchdog.limit)
+        layout.addRow("Stop the program above:", self.limit_spinbox)
+
+        # 0 = Anstiegsüberwachung aus
+        self.rise_spinbox = QDoubleSpinBox()
+        self.rise_spinbox.setRange(0.0, 100.0)
+        self.rise_spinbox.setSuffix(" bar/min")
+        self.rise_spinbox.setSpecialValueText("off")
+        self.rise_spinbox.setValue(watchdog.max_rise)
+        layout.addRow("or when rising faster than:", self.rise_spinbox)
+
+        self.window_spinbox = QDoubleSpinBox()
+        self.window_spinbox.setRange(1.0, 120.0)
+        self.window_spinbox.setSuffix(" s")
+        self.window_spinbox.setValue(watchdog.rise_window)
+        layout.addRow("Rise measured over:", self.window_spinbox)
+
+        trip = watchdog.trips[-1] if watchdog.trips else None
+        if trip is None:
+            last_trip = "none"
+        else:
+            reaction = f"{trip.reaction_ms:.0f} ms" if trip.reaction_ms is not None else "pending"
+            last_trip = (f"{datetime.fromtimestamp(trip.t).strftime('%H:%M:%S')}, {trip.describe()}\n"
+                         f"detected after {trip.detect_ms:.1f} ms, OUT_30 confirmed after {reaction}")
+        layout.addRow("Last trip:", QLabel(last_trip))
+
+        ok_button = QPushButton("OK")
+        ok_button.clicked.connect(self.accept)
+        cancel_button = QPushButton("Cancel")
+        cancel_button.clicked.connect(self.reject)
+        buttons = QHBoxLayout()
+        buttons.addWidget(ok_button)
+        buttons.addWidget(cancel_button)
+        layout.addRow(buttons)
+        self.setLayout(layout)
+
+    def accept(self):
+        self.watchdog.configure(self.limit_spinbox.value(), self.rise_spinbox.value(), self.window_spinbox.value())
+        super().accept()
+
+
+class ReglerParameterDialog(QDialog):
+
+    def __init__(self, devices, parent=None):
+        super().__init__(parent)
+        self.devices = devices
         self.setWindowTitle("Reglerparameter")
         self.setFixedSize(280, 450)
         self.setupUI()
 
-        self.status_window = StatusWindow()
-
 
     def setupUI(self):
         layout = QVBoxLayout()
@@ -953,15 +1663,15 @@ class ReglerParameterDialog(QDialog):
         regelparameter_groupbox.setLayout(regelparameter_layout)
         regelparameter_groupbox.setFixedHeight(150)
 
-        enter_button = QPushButton("Enter")
-        enter_button.clicked.connect(self.enter_button_clicked)
+        self.enter_button = QPushButton("Enter")
+        self.enter_button.clicked.connect(self.enter_button_clicked)
 
         close_button = QPushButton("Close")
         close_button.clicked.connect(self.close)
 
         layout.addWidget(regelgrossen_groupbox)
         layout.addWidget(regelparameter_groupbox)
-        layout.addWidget(enter_button)
+        layout.addWidget(self.enter_button)
         layout.addWidget(close_button)
         self.setLayout(layout)
 
@@ -973,8 +1683,7 @@ class ReglerParameterDialog(QDialog):
         msg_box.exec()
 
     def enter_button_clicked(self):
-        global ser
-        if ser and ser.is_open:
+        if self.devices.is_connected(LAUDA):
             # Eingabewerte aus den Textfeldern lesen
             Ts = self.sollwert_input.value()
             Tu = self.tu_input.value()
@@ -984,49 +1693,43 @@ class ReglerParameterDialog(QDialog):
             Tn = self.tn_input.value()
             Tv = self.tv_input.value()
 
-            # Befehle erstellen und an das Serielle Interface senden
-            ser.write(f'OUT_{Ts:.2f}\r\n'.encode())  # Sollwertübergabe
-            out = ser.readline().decode().strip()
-
-            ser.write(f'OUT_L{Tu:.2f}\r\n'.encode())  # Schaltpunkt für den Untertemperaturwert Tu
-            out_l = ser.readline().decode().strip()
-
-            ser.write(f'OUT_H{To:.2f}\r\n'.encode())  # Übertemperaturschaltpunkt
-            out_h = ser.readline().decode().strip()
-
-            out_rt1, out_rti = "", ""
+            # Befehle erstellen und in die Warteschlange des Thermostats stellen
+            commands = [
+                f'OUT_{Ts:.2f}\r\n'.encode(),  # Sollwertübergabe
+                f'OUT_L{Tu:.2f}\r\n'.encode(),  # Schaltpunkt für den Untertemperaturwert Tu
+                f'OUT_H{To:.2f}\r\n'.encode(),  # Übertemperaturschaltpunkt
+            ]
             if regel_quelle == 'T1 (im Reaktor)':
-                ser.write(b'OUT_RT1\r\n')  # Schaltet Regelgrößen auf die Quelle externes Pt 100 T1
-                out_rt1 = ser.readline().decode().strip()
+                commands.append(b'OUT_RT1\r\n')  # Schaltet Regelgrößen auf die Quelle externes Pt 100 T1
             elif regel_quelle == 'Ti (im Vorlauf)':
-                ser.write(
-                    b'OUT_RTi\r\n')  # Schaltet Regelgrößen auf die Quelle externes Ti (Badfühler). Regelung nach Badtemperatur
-                out_rti = ser.readline().decode().strip()
-
-            ser.write(f'OUT_XP{Xp:.2f}\r\n'.encode())  # Einstellung des Regelparameters Xp für den Regler
-            out_xp = ser.readline().decode().strip()
-
-            ser.write(f'OUT_TN{Tn:.2f}\r\n'.encode())  # Einstellung des Regelparameters Tn für den Regler
-            out_tn = ser.readline().decode().strip()
-
-            ser.write(f'OUT_TV{Tv:.2f}\r\n'.encode())  # Einstellung des Regelparameters Tn für den Regler
-            out_tv = ser.readline().decode().strip()
+                commands.append(b'OUT_RTi\r\n')  # Schaltet Regelgrößen auf die Quelle externes Ti (Badfühler). Regelung nach Badtemperatur
+            commands += [
+                f'OUT_XP{Xp:.2f}\r\n'.encode(),  # Einstellung des Regelparameters Xp für den Regler
+                f'OUT_TN{Tn:.2f}\r\n'.encode(),  # Einstellung des Regelparameters Tn für den Regler
+                f'OUT_TV{Tv:.2f}\r\n'.encode(),  # Einstellung des Regelparameters Tv für den Regler
+            ]
+
+            self.enter_button.setEnabled(False)
+            self.watcher = FutureWatcher([self.devices.submit(command) for command in commands],
+                                         self.parametersEntered)
+        else:
+            self.display_message("No connection to LAUDA Thermostat")
 
-            out_all = [out, out_l, out_h, out_rt1, out_rti, out_xp, out_tn, out_tv]
-            out_ok = [out for out in out_all if out == 'OK']
+    def parametersEntered(self, out_all):
+        self.enter_button.setEnabled(True)
+        out_ok = [out for out in out_all if out == 'OK']
 
-            if not out_ok:
-                self.display_message("Error: Not entered")
-            else:
-                self.display_message("New Values entered")
-                self.accept()
+        if not out_ok:
+            self.display_message("Error: Not entered")
         else:
-            self.display_message("No connection to LAUDA Thermostat")
+            self.display_message("New Values entered")
+            self.accept()
 
 
 class NewProgramEnterDialog(QDialog):
-    def __init__(self, parent=None):
+    def __init__(self, devices, parent=None):
         super().__init__(parent)
+        self.devices = devices
 
         self.setWindowTitle("Enter New Program")
         self.setFixedSize(QSize(400, 600))
@@ -1136,10 +1839,10 @@ class NewProgramEnterDialog(QDialog):
         main_layout.addWidget(tolerance_cycles_groupbox)
 
         # Create the Enter Button
-        enter_button = QPushButton("Enter")
-        enter_button.clicked.connect(self.enter_button_clicked)
+        self.enter_button = QPushButton("Enter")
+        self.enter_button.clicked.connect(self.enter_button_clicked)
 
-        main_layout.addWidget(enter_button)
+        main_layout.addWidget(self.enter_button)
 
         # Close button
         close_button = QPushButton("Close")
@@ -1149,16 +1852,12 @@ class NewProgramEnterDialog(QDialog):
         self.setLayout(main_layout)
 
     def enter_button_clicked(self):
-        global ser
-        if not ser:
+        if not self.devices.is_connected(LAUDA):
             self.display_message("No connection to LAUDA Thermostat!")
         # Sollwertübergabe
         else:
-           #
-
             Ts = self.start_temperature_spinbox.value()
-            ser.write(f'OUT_{Ts:.2f}\r\n'.encode())
-            out = ser.readline().decode().strip()
+            self.devices.submit(f'OUT_{Ts:.2f}\r\n'.encode())
 
             # Eingabewerte aus den Textfeldern lesen
             segment_temperature_inputs = [self.segment_temperature_inputs[i] for i in range(5)]
@@ -1177,14 +1876,12 @@ class NewProgramEnterDialog(QDialog):
 
             programm_ok = []
 
-            # Befehle erstellen und an das Serielle Interface senden
+            # Befehle erstellen und in die Warteschlange des Thermostats stellen.
+            # Die Pause von 1 s nach jedem Befehl wartet im Geräte-Thread, nicht in der GUI.
             for i, (temperature, hours, minutes) in enumerate(valid_segments, start=0):
                 segment_command = f'SEG_({i:02d})_{temperature:03d}.{hours:02d}:{minutes:02d}\r\n'
-                ser.write(segment_command.encode())
-                sign = ser.readline().decode().strip()
-                programm_ok.append(sign)
-                #print(segment_command.encode())
-                time.sleep(1)
+                programm_ok.append(self.devices.submit(segment_command.encode()))
+                self.devices.pause(1)
 
             # Toleranzband und Zyklenzahl
             tolerance_band = self.tolerance_band_spinbox.value()
@@ -1192,26 +1889,25 @@ class NewProgramEnterDialog(QDialog):
 
             if tolerance_band != 0:
                 tolerance_band_command = f'OUT_TB{tolerance_band}\r\n'
-                ser.write(tolerance_band_command.encode())
-                sign = ser.readline().decode().strip()
-                programm_ok.append(sign)
-                #print(tolerance_band_command.encode())
-                time.sleep(1)
+                programm_ok.append(self.devices.submit(tolerance_band_command.encode()))
+                self.devices.pause(1)
 
             if cycles != 0:
                 cycles_command = f'OUT_CY{cycles}\r\n'
-                ser.write(cycles_command.encode())
-                sign = ser.readline().decode().strip()
-                programm_ok.append(sign)
-                #print(cycles_command.encode())
-                time.sleep(1)
-
-            if len(programm_ok) > 2:
-                self.saveLastentered() #saves last entered program
-                self.display_message('New Program entered!')
-                self.accept()
-            else:
-                self.display_message('No new Program entered!')
+                programm_ok.append(self.devices.submit(cycles_command.encode()))
+                self.devices.pause(1)
+
+            self.enter_button.setEnabled(False)
+            self.watcher = FutureWatcher(programm_ok, self.programEntered)
+
+    def programEntered(self, programm_ok):
+        self.enter_button.setEnabled(True)
+        if len(programm_ok) > 2:
+            self.saveLastentered() #saves last entered program
+            self.display_message('New Program entered!')
+            self.accept()
+        else:
+            self.display_message('No new Program entered!')
 
     def saveLastentered(self):
 
@@ -1233,6 +1929,9 @@ class NewProgramEnterDialog(QDialog):
             segment_key = f"Segment {i}"
             entered_data[segment_key] = f"Temp: {segment_data[1]}, Hours: {segment_data[2]}, minutes: {segment_data[3]}"
 
+        # Toleranzband für die Zeit im Band im Lauf-Katalog
+        entered_data['Tolerance Band'] = self.tolerance_band_spinbox.value()
+
 
         programm_data_path = resource_path(r'res\programm_data.csv')
         # print(programm_data_path)
@@ -1331,118 +2030,142 @@ class HelpWindow(QDialog):
 
 
 
-class SerialThread(QThread):
-    dataReceived = pyqtSignal(float, float, float, float, str, float, float, float, float, float)
+class RunsBrowser(QDialog):
+    COLUMNS = ("Start", "Stop", "Duration [h]", "T1 min [°C]", "T1 max [°C]", "p max [bar]", "In band [min]",
+               "Program", "File")
 
-    def __init__(self):
+    def __init__(self, mainWindow, catalog_path=CATALOG_PATH):
         super().__init__()
+        self.mainWindow = mainWindow
+        self.catalog = RunCatalog(catalog_path)
+        self.catalog_path = catalog_path
+        self.indexer = None
+        self.runs = []
 
-        global ser
-        global ser_p
-        self.running = False
-
-    def run(self):
-
-        self.running = True
-
-        if not ser:
-            self.display_message("Not connected.")
-            self.running = False
-
-        while self.running:
-            try:
-                ser.write(b'IN_1\r\n')
-                Ti = ser.readline().strip().decode()
-                ser.write(b'IN_2\r\n')
-                T1 = ser.readline().strip().decode()
-                ser.write(b'IN_3\r\n')
-                Ts = ser.readline().strip().decode()
-                ser_p.write(b'P')
-                p = ser_p.readline().strip().decode('ISO-8859-1', errors='replace')
-
-                ser.write(b'IN_4\r\n')
-                status_sign = ser.readline().decode().strip()
-                ser.write(b'IN_8\r\n')
-                Tu = float(ser.readline().strip().decode())
-                ser.write(b'IN_9\r\n')
-                To = float(ser.readline().strip().decode())
-                ser.write(b'IN_A\r\n')
-                Xp = float(ser.readline().strip().decode())
-                ser.write(b'IN_B\r\n')
-                Tn = float(ser.readline().strip().decode())
-                ser.write(b'IN_C\r\n')
-                Tv = float(ser.readline().strip().decode())
-            except:
-                pass
-
-            try:
-                Ti = float(Ti)
-            except ValueError:
-                pass
-            try:
-                T1 = float(T1)
-            except ValueError:
-                pass
-
-            try:
-                Ts = float(Ts)
-            except ValueError:
-                pass
-
-            try:
-                p = float(p)
-            except ValueError:
-                pass
-            try:
-                status_sign = str(status_sign)
-            except ValueError:
-                pass
-            try:
-                Tu = float(Tu)
-            except ValueError:
-                pass
-            try:
-                To = float(To)
-            except ValueError:
-                pass
-            try:
-                Xp = float(Xp)
-            except ValueError:
-                pass
-            try:
-                Tn = float(Tn)
-            except ValueError:
-                pass
-            try:
-                Tv = float(Tv)
-            except ValueError:
-                pass
-
-            except (ValueError, serial.SerialException) as e:
-                print(f"Error updating status information: {e}")
-
-
-            if type(Ti) == float and type(T1) == float and type(Ts) == float and type(p) == float:
-
-                    self.dataReceived.emit(Ti, T1, Ts, p, status_sign, Tu, To, Xp, Tn, Tv)
+        self.setWindowTitle("Runs")
+        self.resize(1000, 500)
+        self.initUI()
+        self.refresh()
 
+    def initUI(self):
+        layout = QVBoxLayout()
 
+        filter_layout = QHBoxLayout()
+        self.text_edit = QLineEdit()
+        self.text_edit.setPlaceholderText("File or program")
+        self.text_edit.textChanged.connect(self.refresh)
+        filter_layout.addWidget(self.text_edit)
+
+        # 0 = keine Einschränkung
+        self.t1_spinbox = QDoubleSpinBox()
+        self.t1_spinbox.setRange(0, 400)
+        self.t1_spinbox.setSpecialValueText("any")
+        self.t1_spinbox.valueChanged.connect(self.refresh)
+        filter_layout.addWidget(QLabel("T1 max ≥"))
+        filter_layout.addWidget(self.t1_spinbox)
+
+        self.p_spinbox = QDoubleSpinBox()
+        self.p_spinbox.setRange(0, 400)
+        self.p_spinbox.setSpecialValueText("any")
+        self.p_spinbox.valueChanged.connect(self.refresh)
+        filter_layout.addWidget(QLabel("p max ≥"))
+        filter_layout.addWidget(self.p_spinbox)
+
+        self.order_combo = QComboBox()
+        self.order_combo.addItems(ORDERS)
+        self.order_combo.currentTextChanged.connect(self.refresh)
+        filter_layout.addWidget(QLabel("Sort by"))
+        filter_layout.addWidget(self.order_combo)
+        layout.addLayout(filter_layout)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        self.table.cellDoubleClicked.connect(self.openSelected)
+        layout.addWidget(self.table)
 
+        self.progressBar = QProgressBar()
+        self.progressBar.hide()
+        layout.addWidget(self.progressBar)
 
-    def stop(self):
-        self.running = False
+        button_layout = QHBoxLayout()
+        self.index_button = QPushButton("Index folder...")
+        self.index_button.clicked.connect(self.indexFolder)
+        open_button = QPushButton("Open")
+        open_button.clicked.connect(self.openSelected)
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.close)
+        button_layout.addWidget(self.index_button)
+        button_layout.addStretch(1)
+        button_layout.addWidget(open_button)
+        button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
 
-    def display_message(self, message):
-        msg_box = QMessageBox()
-        msg_box.setWindowFlag(Qt.WindowType.FramelessWindowHint)
-        msg_box.setStyleSheet('QDialog{border: 1px solid #888888;}')
-        msg_box.setText(message)
-        msg_box.exec()
+        self.setLayout(layout)
 
+    def refresh(self):
+        self.runs = self.catalog.search(self.text_edit.text(),
+                                        self.t1_spinbox.value() or None,
+                                        self.p_spinbox.value() or None,
+                                        self.order_combo.currentText())
+        self.table.setRowCount(len(self.runs))
+        for i, run in enumerate(self.runs):
+            duration = (run['stopped'] - run['started']) / 3600 if run['started'] is not None else None
+            cells = (self.formatTime(run['started']), self.formatTime(run['stopped']), self.formatNumber(duration),
+                     self.formatNumber(run['min_T1']), self.formatNumber(run['max_T1']),
+                     self.formatNumber(run['max_p']), self.formatNumber((run['in_band_s'] or 0) / 60, 0),
+                     run['program'] or '', run['filepath'])
+            for j, text in enumerate(cells):
+                self.table.setItem(i, j, QTableWidgetItem(text))
+
+    @staticmethod
+    def formatTime(t):
+        return datetime.fromtimestamp(t).strftime("%Y-%m-%d %H:%M") if t is not None else ''
+
+    @staticmethod
+    def formatNumber(value, digits=1):
+        return f"{value:.{digits}f}" if value is not None else ''
+
+    def openSelected(self, *args):
+        row = self.table.currentRow()
+        if 0 <= row < len(self.runs):
+            self.mainWindow.loadRun(self.runs[row]['filepath'])
+
+    def indexFolder(self):
+        directory = QFileDialog.getExistingDirectory(self, 'Select the folder with the runs',
+                                                     r'C:\Users\Ivet17\OneDrive\Desktop\HTC_Process_Data')
+        if not directory:
+            return
+        # Indizieren mit Prozesspool im Hintergrund
+        self.index_button.setEnabled(False)
+        self.progressBar.setValue(0)
+        self.progressBar.show()
+        self.indexer = CatalogIndexer(directory, self.catalog_path, self)
+        self.indexer.progressChanged.connect(self.indexProgress)
+        self.indexer.indexed.connect(self.indexFinished)
+        self.indexer.start()
+
+    def indexProgress(self, done, total):
+        self.progressBar.setMaximum(total)
+        self.progressBar.setValue(done)
+
+    def indexFinished(self, count):
+        self.index_button.setEnabled(True)
+        self.progressBar.hide()
+        self.refresh()
+
+    def closeEvent(self, event):
+        if self.indexer is not None:
+            self.indexer.cancel()
+            self.indexer.wait()
+        self.catalog.close()
+        super().closeEvent(event)
 
 
 class StatusWindow(QDialog):
-    def __init__(self):
+    def __init__(self, model=None):
         super().__init__()
 
         #self.running = False
@@ -1450,6 +2173,32 @@ class StatusWindow(QDialog):
         self.setFixedSize(600, 600)
         self.initUI()
 
+        self.model = model
+        if model is not None:
+            model.statusChanged.connect(self.showStatus)
+            model.parametersChanged.connect(self.showParameters)
+
+    def showEvent(self, event):
+        # Änderungen, die eingetroffen sind, während das Fenster verborgen war, nachholen
+        super().showEvent(event)
+        if self.model is not None:
+            self.showStatus(self.model.status)
+            self.showParameters(self.model.parameters)
+
+    def showStatus(self, status):
+        if self.isVisible():
+            self.setTexts(self.status_edits, status)
+
+    def showParameters(self, parameters):
+        if self.isVisible():
+            self.setTexts(self.parameter_edits, [str(value) for value in parameters])
+
+    @staticmethod
+    def setTexts(edits, texts):
+        for edit, text in zip(edits, texts):
+            if edit.text() != text:
+                edit.setText(text)
+
 
     def initUI(self):
         layout = QVBoxLayout()
@@ -0,0 +1,10 @@
+# -*- coding :utf-8 -*-
+#LaudaRegler/lauda_daemon.py
+
+'''This module provides the entry point script of the headless acquisition daemon'''
+import sys
+
+import lauda.daemon
+
+if __name__ == "__main__":
+    sys.exit(lauda.daemon.main())
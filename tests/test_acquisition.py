@@ -0,0 +1,32 @@
+import pytest
+from PyQt6.QtCore import QCoreApplication
+
+from lauda.acquisition import Acquisition
+from lauda.devices import DeviceManager
+from lauda.parser import FRESH
+
+THERMOSTAT = {'Ti': 25.0, 'T1': 24.0, 'Ts': 30.0, 'status_sign': '0010010',
+              'Tu': -10.0, 'To': 280.0, 'Xp': 2.0, 'Tn': 25.0, 'Tv': 5.0}
+
+
+@pytest.fixture
+def acquisition():
+    app = QCoreApplication.instance() or QCoreApplication([])
+    acquisition = Acquisition(DeviceManager())
+    yield acquisition
+    acquisition.devices.disconnect()
+
+
+def test_samples_stay_ordered_when_readings_arrive_out_of_order(acquisition):
+    samples = []
+    acquisition.sampleReceived.connect(samples.append)
+    states = {name: FRESH for name in THERMOSTAT}
+    # Reihenfolge der Zustellung, nicht der Messung: der Druckwert von 10.2 kommt nach dem Thermostat von 10.4
+    acquisition.onPressure(1.0, FRESH, 10.0)
+    acquisition.onThermostatValues(THERMOSTAT, states, 10.1)
+    acquisition.onThermostatValues(THERMOSTAT, states, 10.4)
+    acquisition.onPressure(1.1, FRESH, 10.2)
+    acquisition.onPressure(1.2, FRESH, 10.5)
+    t = [sample.t for sample in samples]
+    assert t == sorted(t)
+    assert t == [10.1, 10.4, 10.4, 10.5]
@@ -0,0 +1,19 @@
+import numpy as np
+
+from lauda.buffers import RingBuffer
+
+
+def columns(start, n):
+    t = np.arange(start, start + n, dtype=np.float64)
+    return {name: t for name in RingBuffer.COLUMNS}
+
+
+def test_resize_keeps_the_newest_values():
+    buffer = RingBuffer(10)
+    buffer.extend_columns(columns(0, 15))
+    buffer.resize(20)
+    np.testing.assert_array_equal(buffer.view('t'), np.arange(5, 15))
+    buffer.extend_columns(columns(15, 12))
+    np.testing.assert_array_equal(buffer.view('t'), np.arange(7, 27))
+    buffer.resize(4)
+    np.testing.assert_array_equal(buffer.view('Ti'), np.arange(23, 27))
@@ -0,0 +1,32 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from lauda.loader import _parse_slow, parse_csv_chunk
+
+ROWS = (b"2024-01-15 14:12:07,25.3,24.1,30.0,1.013\n"   # Normalzeit
+        b"2024-07-03 14:12:07,25.3,24.1,30.0,1.013\n"   # Sommerzeit
+        b"2024-10-27 01:30:00,25.3,,30.0,1.013\n")
+
+
+@pytest.fixture
+def vienna():
+    previous = os.environ.get('TZ')
+    os.environ['TZ'] = 'Europe/Vienna'
+    time.tzset()
+    yield
+    if previous is None:
+        del os.environ['TZ']
+    else:
+        os.environ['TZ'] = previous
+    time.tzset()
+
+
+def test_fast_and_slow_path_agree_across_dst(vienna):
+    t, values = parse_csv_chunk(ROWS)
+    slow_t, slow_values = _parse_slow(ROWS.splitlines())
+    np.testing.assert_array_equal(t, slow_t)
+    np.testing.assert_array_equal(values, slow_values)
+    assert time.strftime("%H:%M:%S", time.localtime(t[1])) == "14:12:07"
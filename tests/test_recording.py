@@ -0,0 +1,26 @@
+import time
+
+from lauda.acquisition import Sample
+from lauda.recording import open_run, pack_status, recorder_for, unpack_status
+
+
+def sample(status_sign):
+    return Sample(time.time(), 25.0, 24.0, 30.0, 1.013, status_sign, -10.0, 280.0, 2.0, 25.0, 5.0)
+
+
+def test_missing_status_packs_as_zero():
+    assert pack_status(None) == 0
+    assert unpack_status(pack_status('0010010')) == '0010010'
+
+
+def test_recorder_survives_a_bad_block(tmp_path):
+    errors = []
+    recorder = recorder_for(str(tmp_path / 'run.lrun'), on_error=errors.append)
+    recorder.write([sample(None)])
+    recorder.write([object()])
+    recorder.write([sample('0010010')])
+    recorder.close()
+    recorder.join()
+    _, records = open_run(str(tmp_path / 'run.lrun'))
+    assert len(records) == 2
+    assert len(errors) == 1